@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+Benchmark the calendar and contacts tools against a local DAV stand-in.
+
+Starts an in-process CalDAV/CardDAV server seeded with synthetic calendars and
+address books, runs the main CLI modes of fetch-events.py and fetch-contacts.py
+against it as subprocesses, and reports for each mode:
+
+    latency     wall time of the whole command, median of --repeat runs
+    requests    HTTP requests the tool made
+    down / up   bytes received from / sent to the server (headers included)
+    output      bytes the command printed
+    peak RSS    maximum resident memory of the tool process
+
+A second table times parsing and lookup stages on their own (VEVENT
+extraction, local recurrence expansion, vCard parsing, contact search) over
+the seeded data, in this process.
+
+Nothing touches Fastmail or the real event store: the tools are pointed at the
+stand-in with FASTMAIL_CALDAV_SERVER / FASTMAIL_CARDDAV_SERVER and at scratch
+stores with CLERK_EVENTS_DB / CLERK_CONTACTS_DB.
+
+Usage:
+    python bench.py                              # default sizes, 3 runs per mode
+    python bench.py --events 20000 --contacts 10000
+    python bench.py --latency 40                 # add 40 ms per request, like a real network
+    python bench.py --only contacts --repeat 5
+    python bench.py --json > before.json         # machine-readable, for comparing runs
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from dav_standin import DAVStandIn
+from synthetic import mutate_addressbooks, mutate_calendars, seed_addressbooks, seed_calendars
+
+TOOLS_DIR = Path(__file__).resolve().parent.parent
+CALENDAR_SCRIPT = TOOLS_DIR / "calendar" / "fetch-events.py"
+CONTACTS_SCRIPT = TOOLS_DIR / "contacts" / "fetch-contacts.py"
+
+# Events / vCards edited per collection before each "incremental sync" run
+CHANGES_PER_RUN = 20
+
+# Names looked up in one contacts --resolve call
+RESOLVE_QUERIES = 50
+
+# A cheap run that syncs every collection, used to warm the local stores
+PRIME_ARGS = {
+    "calendar": ["--all", "--start", "today", "--end", "+1d"],
+    "contacts": ["--upcoming", "0"],
+}
+
+
+def scenarios() -> list[dict]:
+    """
+    The CLI modes to measure, in run order.
+
+    setup is "cold" (empty store before every run), "warm" (store primed once,
+    then left alone) or "changed" (a few server-side edits before every run).
+    needs lists other tools whose stores are primed first.
+    """
+    month = ["--start", "today", "--end", "+30d"]
+    return [
+        {"name": "cal --list (cold)", "tool": "calendar", "setup": "cold", "args": ["--list"]},
+        {"name": "cal 30d (cold store)", "tool": "calendar", "setup": "cold", "args": ["--all", *month]},
+        {"name": "cal 30d (no changes)", "tool": "calendar", "setup": "warm", "args": ["--all", *month]},
+        {"name": "cal 30d (incremental sync)", "tool": "calendar", "setup": "changed", "args": ["--all", *month]},
+        {"name": "cal 30d --offline", "tool": "calendar", "setup": "warm", "args": ["--all", "--offline", *month]},
+        {"name": "cal 30d --no-cache", "tool": "calendar", "setup": "warm", "args": ["--all", "--no-cache", *month]},
+        {"name": "cal 30d --no-cache --expand server", "tool": "calendar", "setup": "warm",
+         "args": ["--all", "--no-cache", "--expand", "server", *month]},
+        {"name": "cal 365d", "tool": "calendar", "setup": "warm",
+         "args": ["--all", "--start", "today", "--end", "+365d"]},
+        {"name": "cal 90d --stream", "tool": "calendar", "setup": "warm",
+         "args": ["--all", "--stream", "--start", "today", "--end", "+90d"]},
+        {"name": "cal availability 7d", "tool": "calendar", "setup": "warm",
+         "args": ["availability", "--all", "--start", "today", "--end", "+7d"]},
+        {"name": "cal classify 28d", "tool": "calendar", "setup": "warm",
+         "args": ["classify", "--all", "--start", "today", "--end", "+28d"]},
+        {"name": "cal --batch (3 planning queries)", "tool": "calendar", "setup": "warm",
+         "args": ["--batch", "{batch}"]},
+        {"name": "cal 7d --attendees", "tool": "calendar", "setup": "warm", "needs": ["contacts"],
+         "args": ["--all", "--attendees", "--start", "today", "--end", "+7d"]},
+        {"name": "contacts --list", "tool": "contacts", "setup": "warm", "args": ["--list"]},
+        {"name": "contacts (cold index)", "tool": "contacts", "setup": "cold", "args": []},
+        {"name": "contacts (no changes)", "tool": "contacts", "setup": "warm", "args": []},
+        {"name": "contacts (incremental sync)", "tool": "contacts", "setup": "changed", "args": []},
+        {"name": "contacts --offline", "tool": "contacts", "setup": "warm", "args": ["--offline"]},
+        {"name": "contacts --no-cache", "tool": "contacts", "setup": "warm", "args": ["--no-cache"]},
+        {"name": "contacts --birthdays", "tool": "contacts", "setup": "warm", "args": ["--birthdays"]},
+        {"name": "contacts --upcoming 30", "tool": "contacts", "setup": "warm", "args": ["--upcoming", "30"]},
+        {"name": "contacts --between (90 days)", "tool": "contacts", "setup": "warm",
+         "args": ["--between", "today", "+90d"]},
+        {"name": "contacts --search", "tool": "contacts", "setup": "warm", "args": ["--search", "adam"]},
+        {"name": f"contacts --resolve ({RESOLVE_QUERIES} queries)", "tool": "contacts", "setup": "warm",
+         "args": ["--resolve", "{queries}"]},
+    ]
+
+
+def run_tool(script: Path, args: list[str], env: dict) -> dict:
+    """Run one tool invocation and return its latency, exit code, output size and peak RSS."""
+    with tempfile.TemporaryFile() as stdout, tempfile.TemporaryFile() as stderr:
+        started = time.perf_counter()
+        proc = subprocess.Popen([sys.executable, str(script), *args], env=env,
+                                stdout=stdout, stderr=stderr)
+        # wait4 gives this child's own resource usage, including its peak RSS
+        _, status, usage = os.wait4(proc.pid, 0)
+        elapsed = time.perf_counter() - started
+        proc.returncode = os.waitstatus_to_exitcode(status)
+
+        peak_rss = usage.ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+        stdout.seek(0, os.SEEK_END)
+        stderr.seek(0)
+        return {
+            "latency": elapsed,
+            "code": proc.returncode,
+            "output": stdout.tell(),
+            "peak_rss": peak_rss,
+            "stderr": stderr.read().decode("utf-8", "replace"),
+        }
+
+
+def run_scenarios(standin: DAVStandIn, calendars: list, addressbooks: list, args, workdir: Path) -> list[dict]:
+    """Run every selected scenario --repeat times and summarize each."""
+    store = workdir / "events.db"
+    env = dict(
+        os.environ,
+        FASTMAIL_USERNAME=standin.username,
+        FASTMAIL_CALDAV_PASSWORD="benchmark",
+        FASTMAIL_CARDDAV_PASSWORD="benchmark",
+        FASTMAIL_CALDAV_SERVER=standin.url,
+        FASTMAIL_CARDDAV_SERVER=standin.url,
+        CLERK_EVENTS_DB=str(store),
+        CLERK_CONTACTS_DB=str(workdir / "contacts.db"),
+        NO_PROXY="127.0.0.1,localhost",
+    )
+    scripts = {"calendar": CALENDAR_SCRIPT, "contacts": CONTACTS_SCRIPT}
+
+    # Every 20th contact's name, as a meeting's attendee list would be
+    queries = workdir / "queries.txt"
+    names = [line[3:] for book in addressbooks for r in book.resources.values()
+             for line in r.data.splitlines() if line.startswith("FN:")]
+    queries.write_text("\n".join(names[::20][:RESOLVE_QUERIES]) + "\n")
+
+    # A planning run's calendar questions: today, this week's shape, the next 7 days
+    batch = workdir / "batch.json"
+    batch.write_text(json.dumps([
+        {"calendars": ["Work"], "start": "today", "end": "+1d"},
+        {"mode": "classify", "calendars": ["Work"], "start": "today", "end": "+7d"},
+        {"calendars": "all", "start": "today", "end": "+7d"},
+    ]))
+
+    def reset_store(tool):
+        for path in workdir.glob("events.db*" if tool == "calendar" else "contacts.db*"):
+            path.unlink()
+
+    results = []
+    mutations = 0
+    for scenario in scenarios():
+        if args.only and args.only not in scenario["name"]:
+            continue
+        script = scripts[scenario["tool"]]
+
+        if scenario["setup"] == "warm":
+            # Prime the store (and discovery cache) so timed runs see steady state
+            run_tool(script, PRIME_ARGS[scenario["tool"]], env)
+        for tool in scenario.get("needs", []):
+            # Other tools' stores the scenario reads (e.g. the contact index)
+            run_tool(scripts[tool], PRIME_ARGS[tool], env)
+
+        runs = []
+        for _ in range(args.repeat):
+            if scenario["setup"] == "cold":
+                reset_store(scenario["tool"])
+            elif scenario["setup"] == "changed":
+                run_tool(script, PRIME_ARGS[scenario["tool"]], env)
+                mutations += 1
+                if scenario["tool"] == "calendar":
+                    mutate_calendars(calendars, CHANGES_PER_RUN, seed=mutations)
+                else:
+                    mutate_addressbooks(addressbooks, CHANGES_PER_RUN, seed=mutations)
+
+            standin.reset_stats()
+            run = run_tool(script, [arg.format(queries=queries, batch=batch) for arg in scenario["args"]], env)
+            run.update(standin.stats())
+            runs.append(run)
+
+        failed = [run for run in runs if run["code"] != 0]
+        if failed:
+            print(f"Warning: '{scenario['name']}' exited with {failed[0]['code']}: "
+                  f"{failed[0]['stderr'].strip()[-500:]}", file=sys.stderr)
+        elif any("Warning:" in run["stderr"] for run in runs):
+            warning = next(run["stderr"] for run in runs if "Warning:" in run["stderr"])
+            print(f"Warning: '{scenario['name']}' reported: {warning.strip()[-500:]}", file=sys.stderr)
+
+        results.append({
+            "name": scenario["name"],
+            "args": scenario["args"],
+            "latency": statistics.median(run["latency"] for run in runs),
+            "latency_min": min(run["latency"] for run in runs),
+            "requests": statistics.median(run["requests"] for run in runs),
+            "bytes_down": statistics.median(run["bytes_out"] for run in runs),
+            "bytes_up": statistics.median(run["bytes_in"] for run in runs),
+            "output": statistics.median(run["output"] for run in runs),
+            "peak_rss": max(run["peak_rss"] for run in runs),
+            "failed": len(failed),
+        })
+    return results
+
+
+def _timed(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return statistics.median(times)
+
+
+def run_parse_benchmarks(calendars: list, addressbooks: list, args) -> list[dict]:
+    """Time the parsing stages in-process over the seeded data."""
+    sys.path.insert(0, str(CALENDAR_SCRIPT.parent))
+    from icalendar import Calendar
+    import recurrence
+    import vevent
+
+    objects = [r.data for calendar in calendars for r in calendar.resources.values()]
+    series = [r.data for calendar in calendars for r in calendar.resources.values() if r.recurring]
+    start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    end = start + timedelta(days=30)
+
+    def parse_uncached(batch):
+        # A fresh CLI process starts with an empty expansion memo
+        recurrence._memo.clear()
+        vevent.parse_objects(batch, "bench", start, end)
+
+    results = [
+        {"name": "icalendar full parse", "items": len(objects),
+         "seconds": _timed(lambda: [Calendar.from_ical(data) for data in objects], args.repeat)},
+        {"name": "VEVENT fast path (vevent_records)", "items": len(objects),
+         "seconds": _timed(lambda: [vevent.vevent_records(data) for data in objects], args.repeat)},
+        {"name": "parse_objects 30d (all objects)", "items": len(objects),
+         "seconds": _timed(lambda: parse_uncached(objects), args.repeat)},
+        {"name": "recurrence expansion 30d (uncached)", "items": len(series),
+         "seconds": _timed(lambda: parse_uncached(series), args.repeat)},
+    ]
+
+    sys.path.insert(0, str(CONTACTS_SCRIPT.parent))
+    import vobject
+    from vcard import parse_vcard
+    vcards = [r.data for book in addressbooks for r in book.resources.values()]
+    results.append({
+        "name": "vCard parse (vobject + parse_vcard)", "items": len(vcards),
+        "seconds": _timed(lambda: [parse_vcard(vobject.readOne(data)) for data in vcards], args.repeat),
+    })
+
+    from contact_search import ContactIndex
+    parsed = [c for c in (parse_vcard(vobject.readOne(data)) for data in vcards) if c]
+    results.append({"name": "contact search index build", "items": len(parsed),
+                    "seconds": _timed(lambda: ContactIndex(parsed), args.repeat)})
+    index = ContactIndex(parsed)
+    sample = parsed[::max(1, len(parsed) // 50)]
+    queries = [c["name"] for c in sample] + [c["name"].split()[0][:3] for c in sample]
+    queries += [c["name"][:-2] + c["name"][-1] + c["name"][-2] for c in sample]  # typos
+    results.append({"name": "contact search (per query)", "items": len(queries),
+                    "seconds": _timed(lambda: [index.search(q, limit=10) for q in queries], args.repeat)})
+    return results
+
+
+def _kb(value: float) -> str:
+    return f"{value / 1024:,.1f}"
+
+
+def print_report(results: list[dict], parse_results: list[dict], args, seeded: dict) -> None:
+    print(f"Data: {seeded['objects']:,} calendar objects in {seeded['calendars']} calendars "
+          f"({args.events:,} timed, {args.all_day:,} all-day, {args.recurring:,} recurring), "
+          f"{seeded['contacts']:,} vCards; latency {args.latency:g} ms/request; "
+          f"median of {args.repeat} runs")
+    print()
+    header = f"{'mode':<36} {'latency s':>9} {'reqs':>5} {'down KB':>9} {'up KB':>8} {'out KB':>8} {'peak MB':>8}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        flag = "  FAILED" if r["failed"] else ""
+        print(f"{r['name']:<36} {r['latency']:>9.3f} {r['requests']:>5g} {_kb(r['bytes_down']):>9} "
+              f"{_kb(r['bytes_up']):>8} {_kb(r['output']):>8} {r['peak_rss'] / 2**20:>8.1f}{flag}")
+
+    if parse_results:
+        print()
+        header = f"{'parse stage':<40} {'items':>7} {'total ms':>9} {'µs/item':>9}"
+        print(header)
+        print("-" * len(header))
+        for r in parse_results:
+            per_item = r["seconds"] / r["items"] * 1e6 if r["items"] else 0
+            print(f"{r['name']:<40} {r['items']:>7,} {r['seconds'] * 1000:>9.1f} {per_item:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cal and contacts against a local DAV stand-in")
+    parser.add_argument("--events", type=int, default=5000, help="Timed single events (default: 5000)")
+    parser.add_argument("--recurring", type=int, default=300, help="Recurring series (default: 300)")
+    parser.add_argument("--all-day", type=int, default=500, help="All-day events (default: 500)")
+    parser.add_argument("--contacts", type=int, default=3000, help="vCards (default: 3000)")
+    parser.add_argument("--latency", type=float, default=0, help="Added delay per request, in ms (default: 0)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per mode (default: 3)")
+    parser.add_argument("--only", help="Only run modes whose name contains this text (e.g. 'contacts')")
+    parser.add_argument("--no-parse", action="store_true", help="Skip the in-process parse timings")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for the synthetic data")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    standin = DAVStandIn(latency=args.latency / 1000).start()
+    try:
+        calendars = seed_calendars(standin, args.events, args.recurring, args.all_day, seed=args.seed)
+        addressbooks = seed_addressbooks(standin, args.contacts, seed=args.seed)
+        seeded = {
+            "calendars": len(calendars),
+            "objects": sum(len(c.resources) for c in calendars),
+            "contacts": sum(len(b.resources) for b in addressbooks),
+        }
+
+        with tempfile.TemporaryDirectory(prefix="clerk-bench-") as workdir:
+            results = run_scenarios(standin, calendars, addressbooks, args, Path(workdir))
+        parse_results = [] if args.no_parse else run_parse_benchmarks(calendars, addressbooks, args)
+    finally:
+        standin.stop()
+
+    if args.json:
+        print(json.dumps({"data": seeded, "latency_ms": args.latency, "repeat": args.repeat,
+                          "modes": results, "parse": parse_results}, indent=2))
+    else:
+        print_report(results, parse_results, args, seeded)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,509 @@
+"""
+Local CalDAV/CardDAV stand-in for the benchmark.
+
+Serves just enough of WebDAV, CalDAV and CardDAV for fetch-events.py and
+fetch-contacts.py to run unchanged against it: principal and home-set
+discovery, PROPFIND (displayname, resourcetype, getctag, sync-token, getetag),
+calendar-query with time-range and server-side expand, addressbook-query with
+an FN text-match, the two multiget REPORTs and sync-collection. Like a
+production server it gzips larger responses for clients that accept it and
+answers a matching If-None-Match with 304.
+
+Every request and response is counted, so a run can report how many round
+trips it made and how many bytes went over the wire. An optional per-request
+delay stands in for network latency.
+"""
+
+import gzip
+import hashlib
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import unquote, urlparse
+from xml.etree import ElementTree as ET
+from xml.sax.saxutils import escape
+
+DAV = "DAV:"
+CALDAV = "urn:ietf:params:xml:ns:caldav"
+CARDDAV = "urn:ietf:params:xml:ns:carddav"
+CALSERVER = "http://calendarserver.org/ns/"
+
+XML_HEADER = '<?xml version="1.0" encoding="utf-8"?>\n'
+NAMESPACE_DECLS = f'xmlns:D="{DAV}" xmlns:C="{CALDAV}" xmlns:CR="{CARDDAV}" xmlns:CS="{CALSERVER}"'
+
+SYNC_TOKEN_PREFIX = "http://clerk.invalid/sync/"
+
+
+class Resource:
+    """One calendar object or vCard."""
+
+    def __init__(self, href: str, data: str, version: int,
+                 start: Optional[float] = None, end: Optional[float] = None,
+                 recurring: bool = False):
+        self.href = href
+        self.data = data
+        self.version = version
+        self.etag = f'"{hashlib.sha1(data.encode("utf-8")).hexdigest()[:16]}"'
+        # Epoch range the object can produce events in (calendar objects only)
+        self.start = start
+        self.end = end
+        self.recurring = recurring
+
+
+class Collection:
+    """A calendar or address book with a change log for sync-collection."""
+
+    def __init__(self, href: str, name: str, kind: str):
+        self.href = href
+        self.name = name
+        self.kind = kind  # "calendar" or "addressbook"
+        self.version = 0
+        self.resources: dict[str, Resource] = {}
+        self.tombstones: dict[str, int] = {}
+        self.lock = threading.Lock()
+
+    @property
+    def ctag(self) -> str:
+        return str(self.version)
+
+    @property
+    def sync_token(self) -> str:
+        return f"{SYNC_TOKEN_PREFIX}{self.version}"
+
+    def put(self, name: str, data: str, start: Optional[float] = None,
+            end: Optional[float] = None, recurring: bool = False) -> None:
+        """Create or replace a resource; start/end bound calendar objects for time-range queries."""
+        with self.lock:
+            self.version += 1
+            href = self.href + name
+            self.resources[href] = Resource(href, data, self.version, start, end, recurring)
+            self.tombstones.pop(href, None)
+
+    def delete(self, name: str) -> None:
+        with self.lock:
+            href = self.href + name
+            if self.resources.pop(href, None):
+                self.version += 1
+                self.tombstones[href] = self.version
+
+    def changes_since(self, token: Optional[str]) -> Optional[tuple[list, list]]:
+        """Return (changed resources, deleted hrefs) since a sync token, or None if the token is invalid."""
+        if not token:
+            return list(self.resources.values()), []
+        if not token.startswith(SYNC_TOKEN_PREFIX):
+            return None
+        try:
+            since = int(token[len(SYNC_TOKEN_PREFIX):])
+        except ValueError:
+            return None
+        if since > self.version:
+            return None
+        changed = [r for r in self.resources.values() if r.version > since]
+        deleted = [href for href, version in self.tombstones.items() if version > since]
+        return changed, deleted
+
+
+class _Counting:
+    """File wrapper that counts the bytes passing through it."""
+
+    def __init__(self, stream, counter: list):
+        self._stream = stream
+        self._counter = counter
+
+    def read(self, *args):
+        data = self._stream.read(*args)
+        self._counter[0] += len(data)
+        return data
+
+    def readline(self, *args):
+        data = self._stream.readline(*args)
+        self._counter[0] += len(data)
+        return data
+
+    def write(self, data):
+        self._counter[0] += len(data)
+        return self._stream.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+def _parse_utc(value: str) -> float:
+    return datetime.strptime(value, "%Y%m%dT%H%M%SZ").replace(tzinfo=timezone.utc).timestamp()
+
+
+def _requested_props(root: ET.Element) -> Optional[list[str]]:
+    """Clark-notation names under the request's <D:prop>, or None for allprop."""
+    prop = root.find(f"{{{DAV}}}prop")
+    if prop is None:
+        return None
+    return [child.tag for child in prop]
+
+
+def _qname(tag: str) -> str:
+    """Turn a Clark-notation tag into a prefixed name for the response."""
+    namespace, _, local = tag[1:].partition("}")
+    prefix = {DAV: "D", CALDAV: "C", CARDDAV: "CR", CALSERVER: "CS"}.get(namespace)
+    return f"{prefix}:{local}" if prefix else local
+
+
+def _response(href: str, found: dict, missing: list[str] = ()) -> str:
+    parts = [f"<D:response><D:href>{escape(href)}</D:href>"]
+    if found:
+        props = "".join(f"<{_qname(tag)}>{value}</{_qname(tag)}>" for tag, value in found.items())
+        parts.append(f"<D:propstat><D:prop>{props}</D:prop><D:status>HTTP/1.1 200 OK</D:status></D:propstat>")
+    if missing:
+        props = "".join(f"<{_qname(tag)}/>" for tag in missing)
+        parts.append(f"<D:propstat><D:prop>{props}</D:prop><D:status>HTTP/1.1 404 Not Found</D:status></D:propstat>")
+    parts.append("</D:response>")
+    return "".join(parts)
+
+
+def _multistatus(responses: list[str], sync_token: Optional[str] = None) -> bytes:
+    token = f"<D:sync-token>{escape(sync_token)}</D:sync-token>" if sync_token else ""
+    body = f"{XML_HEADER}<D:multistatus {NAMESPACE_DECLS}>{''.join(responses)}{token}</D:multistatus>"
+    return body.encode("utf-8")
+
+
+def _expand(data: str, start: float, end: float) -> list[str]:
+    """Server-side expansion: one VCALENDAR per occurrence in [start, end)."""
+    import recurring_ical_events
+    from icalendar import Calendar
+
+    window = (datetime.fromtimestamp(start, timezone.utc), datetime.fromtimestamp(end, timezone.utc))
+    expanded = []
+    for component in recurring_ical_events.of(Calendar.from_ical(data)).between(*window):
+        for prop in ("RRULE", "RDATE", "EXDATE"):
+            component.pop(prop, None)
+        expanded.append(
+            "BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//Clerk//DAV stand-in//EN\r\n"
+            + component.to_ical().decode("utf-8")
+            + "END:VCALENDAR\r\n"
+        )
+    return expanded
+
+
+class DAVStandIn:
+    """
+    In-process CalDAV/CardDAV server on 127.0.0.1.
+
+    Collections live under the same paths Fastmail uses, so the tools only need
+    their server root pointed here (FASTMAIL_CALDAV_SERVER / FASTMAIL_CARDDAV_SERVER).
+    """
+
+    def __init__(self, username: str = "bench@example.com", latency: float = 0.0):
+        self.username = username
+        self.latency = latency
+        self.principal = f"/dav/principals/user/{username}/"
+        self.calendar_home = f"/dav/calendars/user/{username}/"
+        self.addressbook_home = f"/dav/addressbooks/user/{username}/"
+        self.collections: dict[str, Collection] = {}
+        self._stats_lock = threading.Lock()
+        self.reset_stats()
+        self._server = None
+        self._thread = None
+
+    # -- data --------------------------------------------------------------
+
+    def add_calendar(self, slug: str, name: str) -> Collection:
+        collection = Collection(f"{self.calendar_home}{slug}/", name, "calendar")
+        self.collections[collection.href] = collection
+        return collection
+
+    def add_addressbook(self, slug: str, name: str) -> Collection:
+        collection = Collection(f"{self.addressbook_home}{slug}/", name, "addressbook")
+        self.collections[collection.href] = collection
+        return collection
+
+    def children(self, home: str) -> list[Collection]:
+        return [c for href, c in self.collections.items() if href.startswith(home)]
+
+    # -- stats -------------------------------------------------------------
+
+    def reset_stats(self) -> None:
+        with self._stats_lock:
+            self.requests = 0
+            self.bytes_in = 0
+            self.bytes_out = 0
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {"requests": self.requests, "bytes_in": self.bytes_in, "bytes_out": self.bytes_out}
+
+    def _record(self, bytes_in: int, bytes_out: int) -> None:
+        with self._stats_lock:
+            self.requests += 1
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+
+    # -- lifecycle ---------------------------------------------------------
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "DAVStandIn":
+        handler = type("Handler", (_Handler,), {"standin": self})
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    standin: DAVStandIn
+
+    def setup(self):
+        super().setup()
+        self._in = [0]
+        self._out = [0]
+        self.rfile = _Counting(self.rfile, self._in)
+        self.wfile = _Counting(self.wfile, self._out)
+
+    def log_message(self, format, *args):
+        pass
+
+    def handle_one_request(self):
+        self._in[0] = self._out[0] = 0
+        super().handle_one_request()
+        if self._in[0] or self._out[0]:
+            self.standin._record(self._in[0], self._out[0])
+
+    # -- helpers -----------------------------------------------------------
+
+    def _body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _send(self, status: int, body: bytes = b"", content_type: str = "application/xml; charset=utf-8",
+              headers: Optional[dict] = None) -> None:
+        headers = dict(headers or {})
+        if len(body) > 1024 and "gzip" in self.headers.get("Accept-Encoding", ""):
+            # Like production servers: compress larger bodies when the client accepts it
+            body = gzip.compress(body, compresslevel=5)
+            headers["Content-Encoding"] = "gzip"
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("DAV", "1, 2, 3, calendar-access, addressbook")
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        if body and self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _begin(self) -> Optional[str]:
+        """Common request preamble: latency, auth. Returns the decoded path, or None if answered."""
+        body = self._body()
+        self._request_body = body
+        if self.standin.latency:
+            time.sleep(self.standin.latency)
+        if "Authorization" not in self.headers:
+            self._send(401, b"", "text/plain", {"WWW-Authenticate": 'Basic realm="stand-in"'})
+            return None
+        return unquote(urlparse(self.path).path)
+
+    def _xml(self) -> Optional[ET.Element]:
+        if not self._request_body.strip():
+            return None
+        return ET.fromstring(self._request_body)
+
+    # -- properties --------------------------------------------------------
+
+    def _props_for(self, path: str) -> Optional[dict]:
+        """All properties of a path, as tag -> inner XML."""
+        s = self.standin
+        href = lambda value: f"<D:href>{escape(value)}</D:href>"  # noqa: E731
+        common = {
+            f"{{{DAV}}}current-user-principal": href(s.principal),
+            f"{{{DAV}}}principal-URL": href(s.principal),
+        }
+        if path == s.principal:
+            return {
+                **common,
+                f"{{{DAV}}}resourcetype": "<D:collection/><D:principal/>",
+                f"{{{CALDAV}}}calendar-home-set": href(s.calendar_home),
+                f"{{{CARDDAV}}}addressbook-home-set": href(s.addressbook_home),
+                f"{{{DAV}}}displayname": escape(s.username),
+            }
+        if path in (s.calendar_home, s.addressbook_home, "/"):
+            return {**common, f"{{{DAV}}}resourcetype": "<D:collection/>"}
+
+        collection = s.collections.get(path)
+        if collection:
+            kind = "<C:calendar/>" if collection.kind == "calendar" else "<CR:addressbook/>"
+            props = {
+                **common,
+                f"{{{DAV}}}resourcetype": f"<D:collection/>{kind}",
+                f"{{{DAV}}}displayname": escape(collection.name),
+                f"{{{CALSERVER}}}getctag": collection.ctag,
+                f"{{{DAV}}}sync-token": escape(collection.sync_token),
+            }
+            if collection.kind == "calendar":
+                props[f"{{{CALDAV}}}supported-calendar-component-set"] = '<C:comp name="VEVENT"/>'
+            return props
+
+        resource = self._resource(path)
+        if resource:
+            return {
+                f"{{{DAV}}}resourcetype": "",
+                f"{{{DAV}}}getetag": escape(resource.etag),
+                f"{{{DAV}}}getcontenttype": "text/calendar" if path.endswith(".ics") else "text/vcard",
+            }
+        return None
+
+    def _resource(self, path: str) -> Optional[Resource]:
+        collection = self.standin.collections.get(path.rsplit("/", 1)[0] + "/")
+        return collection.resources.get(path) if collection else None
+
+    def _resource_response(self, resource: Resource, wanted: Optional[list[str]], data: Optional[str] = None) -> str:
+        found, missing = {}, []
+        for tag in wanted or [f"{{{DAV}}}getetag"]:
+            if tag == f"{{{DAV}}}getetag":
+                found[tag] = escape(resource.etag)
+            elif tag in (f"{{{CALDAV}}}calendar-data", f"{{{CARDDAV}}}address-data"):
+                found[tag] = escape(data if data is not None else resource.data)
+            elif tag == f"{{{DAV}}}getcontenttype":
+                found[tag] = "text/calendar" if resource.href.endswith(".ics") else "text/vcard"
+            else:
+                missing.append(tag)
+        return _response(resource.href, found, missing)
+
+    # -- methods -----------------------------------------------------------
+
+    def do_OPTIONS(self):
+        if self._begin() is None:
+            return
+        self._send(200, b"", "text/plain", {"Allow": "OPTIONS, GET, PROPFIND, REPORT"})
+
+    def do_GET(self):
+        path = self._begin()
+        if path is None:
+            return
+        resource = self._resource(path)
+        if not resource:
+            self._send(404, b"", "text/plain")
+            return
+        if self.headers.get("If-None-Match") == resource.etag:
+            self._send(304, b"", "text/plain", {"ETag": resource.etag})
+            return
+        content_type = "text/calendar" if path.endswith(".ics") else "text/vcard"
+        self._send(200, resource.data.encode("utf-8"), f"{content_type}; charset=utf-8", {"ETag": resource.etag})
+
+    def do_PROPFIND(self):
+        path = self._begin()
+        if path is None:
+            return
+        root = self._xml()
+        wanted = _requested_props(root) if root is not None else None
+
+        props = self._props_for(path)
+        if props is None:
+            self._send(404, b"", "text/plain")
+            return
+        targets = [(path, props)]
+        if self.headers.get("Depth", "0") != "0":
+            s = self.standin
+            if path in (s.calendar_home, s.addressbook_home):
+                targets += [(c.href, self._props_for(c.href)) for c in s.children(path)]
+            elif path in s.collections:
+                targets += [(href, self._props_for(href)) for href in list(s.collections[path].resources)]
+
+        responses = []
+        for href, available in targets:
+            if wanted is None:
+                responses.append(_response(href, available))
+            else:
+                found = {tag: available[tag] for tag in wanted if tag in available}
+                responses.append(_response(href, found, [tag for tag in wanted if tag not in available]))
+        self._send(207, _multistatus(responses))
+
+    def do_REPORT(self):
+        path = self._begin()
+        if path is None:
+            return
+        collection = self.standin.collections.get(path)
+        root = self._xml()
+        if collection is None or root is None:
+            self._send(404, b"", "text/plain")
+            return
+
+        wanted = _requested_props(root)
+        if root.tag == f"{{{DAV}}}sync-collection":
+            self._sync_collection(collection, root, wanted)
+        elif root.tag in (f"{{{CALDAV}}}calendar-multiget", f"{{{CARDDAV}}}addressbook-multiget"):
+            responses = []
+            for href_elem in root.findall(f"{{{DAV}}}href"):
+                href = unquote(urlparse(href_elem.text.strip()).path)
+                resource = collection.resources.get(href)
+                if resource:
+                    responses.append(self._resource_response(resource, wanted))
+                else:
+                    responses.append(f"<D:response><D:href>{escape(href)}</D:href>"
+                                     "<D:status>HTTP/1.1 404 Not Found</D:status></D:response>")
+            self._send(207, _multistatus(responses))
+        elif root.tag == f"{{{CALDAV}}}calendar-query":
+            self._calendar_query(collection, root, wanted)
+        elif root.tag == f"{{{CARDDAV}}}addressbook-query":
+            self._addressbook_query(collection, root, wanted)
+        else:
+            self._send(400, b"", "text/plain")
+
+    def _sync_collection(self, collection: Collection, root: ET.Element, wanted: Optional[list[str]]) -> None:
+        token_elem = root.find(f"{{{DAV}}}sync-token")
+        token = token_elem.text.strip() if token_elem is not None and token_elem.text else None
+        with collection.lock:
+            changes = collection.changes_since(token)
+            current = collection.sync_token
+        if changes is None:
+            body = (f"{XML_HEADER}<D:error xmlns:D=\"{DAV}\"><D:valid-sync-token/></D:error>").encode("utf-8")
+            self._send(403, body)
+            return
+        changed, deleted = changes
+        responses = [self._resource_response(r, wanted) for r in changed]
+        responses += [f"<D:response><D:href>{escape(href)}</D:href>"
+                      "<D:status>HTTP/1.1 404 Not Found</D:status></D:response>" for href in deleted]
+        self._send(207, _multistatus(responses, current))
+
+    def _calendar_query(self, collection: Collection, root: ET.Element, wanted: Optional[list[str]]) -> None:
+        time_range = root.find(f".//{{{CALDAV}}}time-range")
+        start = _parse_utc(time_range.get("start")) if time_range is not None and time_range.get("start") else None
+        end = _parse_utc(time_range.get("end")) if time_range is not None and time_range.get("end") else None
+        expand = root.find(f".//{{{CALDAV}}}expand")
+
+        responses = []
+        for resource in list(collection.resources.values()):
+            if end is not None and resource.start is not None and resource.start >= end:
+                continue
+            if start is not None and resource.end is not None and resource.end <= start:
+                continue
+            if expand is not None and resource.recurring and start is not None and end is not None:
+                for occurrence in _expand(resource.data, start, end):
+                    responses.append(self._resource_response(resource, wanted, occurrence))
+            else:
+                responses.append(self._resource_response(resource, wanted))
+        self._send(207, _multistatus(responses))
+
+    def _addressbook_query(self, collection: Collection, root: ET.Element, wanted: Optional[list[str]]) -> None:
+        text_match = root.find(f".//{{{CARDDAV}}}text-match")
+        needle = text_match.text.strip().lower() if text_match is not None and text_match.text else None
+
+        responses = []
+        for resource in list(collection.resources.values()):
+            if needle:
+                fn = next((line[3:] for line in resource.data.splitlines() if line.upper().startswith("FN:")), "")
+                if needle not in fn.lower():
+                    continue
+            responses.append(self._resource_response(resource, wanted))
+        self._send(207, _multistatus(responses))
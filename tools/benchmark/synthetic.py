@@ -0,0 +1,268 @@
+"""
+Synthetic calendars and address books for the benchmark.
+
+Data is generated from a seeded RNG around today's date, so repeated runs
+against the same sizes see the same shape of data: timed events in several
+timezones, all-day and multi-day events, weekly and daily recurring series
+(some with EXDATEs and moved occurrences), and vCards with the mix of
+fields Fastmail returns, including the odd embedded photo.
+"""
+
+import base64
+import random
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Optional
+from zoneinfo import ZoneInfo
+
+from dav_standin import Collection, DAVStandIn
+
+TIMEZONES = ["America/New_York", "Europe/Paris", "UTC"]
+
+TITLES = [
+    "1:1", "Standup", "Planning", "Design review", "Customer call", "Lunch",
+    "Interview", "Roadmap sync", "Retro", "Focus time", "Dentist", "Gym",
+    "All hands", "Office hours", "Board prep", "Coffee chat",
+]
+ALL_DAY_TITLES = ["Vacation", "PTO", "Holiday", "Off-site", "Conference", "Travel", "Parental leave"]
+LOCATIONS = ["Zoom", "Room 4A", "Google Meet", "Café", "HQ, Floor 3", ""]
+
+FIRST_NAMES = [
+    "Adam", "Alice", "Bruno", "Chloé", "Dmitri", "Elena", "Farah", "Gustav", "Hana", "Ines",
+    "Jonas", "Kenji", "Lea", "Mateo", "Nadia", "Omar", "Priya", "Quentin", "Rosa", "Sven",
+]
+LAST_NAMES = [
+    "Anders", "Bernard", "Costa", "Dubois", "Eriksen", "Fischer", "García", "Haddad", "Ito", "Jensen",
+    "Kowalski", "Laurent", "Moreau", "Nakamura", "O'Brien", "Petit", "Rossi", "Silva", "Tanaka", "Weber",
+]
+ORGANIZATIONS = ["Acme", "Globex", "Initech", "Umbrella", "Hooli", "Stark Industries", ""]
+
+CALENDARS = [("work", "Work"), ("personal", "Personal"), ("team", "Team")]
+
+PRODID = "-//Clerk//Benchmark//EN"
+
+
+def _utc(dt: datetime) -> str:
+    return dt.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def _local(dt: datetime) -> str:
+    return dt.strftime("%Y%m%dT%H%M%S")
+
+
+def _vtimezone(tzid: str) -> str:
+    # Enough of a VTIMEZONE to make payload sizes realistic; clients resolve the TZID by name
+    return (
+        f"BEGIN:VTIMEZONE\r\nTZID:{tzid}\r\n"
+        "BEGIN:STANDARD\r\nDTSTART:19701101T020000\r\nRRULE:FREQ=YEARLY;BYMONTH=11;BYDAY=1SU\r\n"
+        "TZOFFSETFROM:-0400\r\nTZOFFSETTO:-0500\r\nEND:STANDARD\r\n"
+        "BEGIN:DAYLIGHT\r\nDTSTART:19700308T020000\r\nRRULE:FREQ=YEARLY;BYMONTH=3;BYDAY=2SU\r\n"
+        "TZOFFSETFROM:-0500\r\nTZOFFSETTO:-0400\r\nEND:DAYLIGHT\r\nEND:VTIMEZONE\r\n"
+    )
+
+
+def _dtprop(name: str, dt: datetime, tzid: str) -> str:
+    if tzid == "UTC":
+        return f"{name}:{_utc(dt)}\r\n"
+    return f"{name};TZID={tzid}:{_local(dt)}\r\n"
+
+
+def _vevent(uid: str, stamp: str, body: str) -> str:
+    return f"BEGIN:VEVENT\r\nUID:{uid}\r\nDTSTAMP:{stamp}\r\n{body}END:VEVENT\r\n"
+
+
+def _vcalendar(components: str, tzid: Optional[str] = None) -> str:
+    tz = _vtimezone(tzid) if tzid and tzid != "UTC" else ""
+    return f"BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:{PRODID}\r\n{tz}{components}END:VCALENDAR\r\n"
+
+
+def _alarm() -> str:
+    return "BEGIN:VALARM\r\nACTION:DISPLAY\r\nTRIGGER:-PT10M\r\nDESCRIPTION:Reminder\r\nEND:VALARM\r\n"
+
+
+def _people(uid: str) -> str:
+    """ORGANIZER and ATTENDEE lines for most meetings, addressed like vcard() contacts."""
+    # Own generator, so adding people left every other generated value as it was
+    rng = random.Random(uid)
+    if rng.random() < 0.4:
+        return ""
+
+    def address(prop: str, params: str = "") -> str:
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        email = f"{first.lower()}.{last.lower()}{rng.randint(1, 99)}@example.com"
+        return f'{prop};CN="{first} {last}"{params}:mailto:{email}\r\n'
+
+    lines = address("ORGANIZER")
+    for _ in range(rng.randint(1, 6)):
+        status = rng.choice(["ACCEPTED", "ACCEPTED", "TENTATIVE", "DECLINED", "NEEDS-ACTION"])
+        lines += address("ATTENDEE", f";ROLE=REQ-PARTICIPANT;PARTSTAT={status}")
+    return lines
+
+
+def timed_event(rng: random.Random, uid: str, day: date, revision: int = 0) -> tuple[str, float, float]:
+    """A single timed event; returns (ics, start_epoch, end_epoch)."""
+    tzid = rng.choice(TIMEZONES)
+    tz = ZoneInfo(tzid)
+    start = datetime.combine(day, time(rng.randint(7, 18), rng.choice([0, 15, 30, 45])), tz)
+    end = start + timedelta(minutes=rng.choice([15, 30, 30, 45, 60, 60, 90, 120]))
+    title = rng.choice(TITLES) + (f" (rev {revision})" if revision else "")
+    location = rng.choice(LOCATIONS)
+    body = (
+        _dtprop("DTSTART", start, tzid) + _dtprop("DTEND", end, tzid)
+        + f"SUMMARY:{title}\r\n"
+        + (f"LOCATION:{location.replace(',', chr(92) + ',')}\r\n" if location else "")
+        + "DESCRIPTION:Agenda\\n- item one\\n- item two\r\n"
+        + _people(uid)
+        + (_alarm() if rng.random() < 0.3 else "")
+    )
+    stamp = _utc(datetime.now(timezone.utc))
+    return _vcalendar(_vevent(uid, stamp, body), tzid), start.timestamp(), end.timestamp()
+
+
+def all_day_event(rng: random.Random, uid: str, day: date) -> tuple[str, float, float]:
+    """An all-day event, sometimes spanning several days."""
+    days = rng.choice([1, 1, 1, 2, 5])
+    end_day = day + timedelta(days=days)
+    body = (
+        f"DTSTART;VALUE=DATE:{day:%Y%m%d}\r\nDTEND;VALUE=DATE:{end_day:%Y%m%d}\r\n"
+        f"SUMMARY:{rng.choice(ALL_DAY_TITLES)}\r\nTRANSP:TRANSPARENT\r\n"
+    )
+    stamp = _utc(datetime.now(timezone.utc))
+    start = datetime.combine(day, time.min).timestamp()
+    end = datetime.combine(end_day, time.min).timestamp()
+    return _vcalendar(_vevent(uid, stamp, body)), start, end
+
+
+def recurring_event(rng: random.Random, uid: str, day: date) -> tuple[str, float, float]:
+    """A daily or weekly series with an EXDATE and sometimes a moved occurrence."""
+    tzid = rng.choice(TIMEZONES[:2])
+    tz = ZoneInfo(tzid)
+    start = datetime.combine(day, time(rng.randint(8, 16), rng.choice([0, 30])), tz)
+    duration = timedelta(minutes=rng.choice([15, 30, 60]))
+    daily = rng.random() < 0.3
+    count = rng.randint(20, 120)
+    step = timedelta(days=1 if daily else 7)
+    rule = "FREQ=DAILY;BYDAY=MO,TU,WE,TH,FR" if daily else "FREQ=WEEKLY"
+    stamp = _utc(datetime.now(timezone.utc))
+
+    body = (
+        _dtprop("DTSTART", start, tzid) + _dtprop("DTEND", start + duration, tzid)
+        + f"RRULE:{rule};COUNT={count}\r\nSUMMARY:{rng.choice(TITLES)} (recurring)\r\n"
+        + _dtprop("EXDATE", start + 2 * step, tzid)
+    )
+    components = _vevent(uid, stamp, body)
+    if rng.random() < 0.4:
+        # Move the fourth occurrence by an hour
+        original = start + 3 * step
+        moved = original + timedelta(hours=1)
+        override = (
+            _dtprop("RECURRENCE-ID", original, tzid)
+            + _dtprop("DTSTART", moved, tzid) + _dtprop("DTEND", moved + duration, tzid)
+            + "SUMMARY:Moved occurrence\r\n"
+        )
+        components += _vevent(uid, stamp, override)
+
+    # Weekday-only daily series cover at most 7/5 of count days
+    span = step * count * (2 if daily else 1)
+    return _vcalendar(components, tzid), start.timestamp(), (start + span + duration).timestamp()
+
+
+def seed_calendars(
+    standin: DAVStandIn,
+    events: int,
+    recurring: int,
+    all_day: int,
+    seed: int = 42,
+    span_days: int = 365,
+) -> list[Collection]:
+    """Create the benchmark calendars, spreading events over today ± span_days."""
+    rng = random.Random(seed)
+    today = date.today()
+    calendars = [standin.add_calendar(slug, name) for slug, name in CALENDARS]
+
+    def random_day() -> date:
+        return today + timedelta(days=rng.randint(-span_days, span_days))
+
+    for i in range(events):
+        start_ics, start, end = timed_event(rng, f"timed-{i}@bench", random_day())
+        rng.choice(calendars).put(f"timed-{i}.ics", start_ics, start, end)
+    for i in range(all_day):
+        ics, start, end = all_day_event(rng, f"allday-{i}@bench", random_day())
+        rng.choice(calendars).put(f"allday-{i}.ics", ics, start, end)
+    for i in range(recurring):
+        ics, start, end = recurring_event(rng, f"series-{i}@bench", random_day())
+        rng.choice(calendars).put(f"series-{i}.ics", ics, start, end, recurring=True)
+    return calendars
+
+
+def mutate_calendars(calendars: list[Collection], changes: int, seed: int) -> None:
+    """Edit, add and delete a few events per calendar, as a day of normal use would."""
+    rng = random.Random(seed)
+    today = date.today()
+    for calendar in calendars:
+        timed = [href.rsplit("/", 1)[1] for href in calendar.resources if "/timed-" in href]
+        for name in rng.sample(timed, min(changes, len(timed))):
+            ics, start, end = timed_event(rng, name[:-4] + "@bench", today + timedelta(days=rng.randint(0, 30)),
+                                          revision=seed)
+            calendar.put(name, ics, start, end)
+        for j in range(max(1, changes // 4)):
+            name = f"new-{seed}-{j}.ics"
+            ics, start, end = timed_event(rng, f"new-{seed}-{j}@bench", today + timedelta(days=rng.randint(0, 30)))
+            calendar.put(name, ics, start, end)
+        for name in rng.sample(timed, min(max(1, changes // 4), len(timed))):
+            calendar.delete(name)
+
+
+def vcard(rng: random.Random, uid: str) -> str:
+    """A vCard 3.0 with a realistic mix of fields."""
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    lines = [
+        "BEGIN:VCARD", "VERSION:3.0", f"UID:{uid}",
+        f"FN:{first} {last}", f"N:{last};{first};;;",
+    ]
+    for k in range(rng.choice([0, 1, 1, 2])):
+        domain = ["example.com", "mail.test", "corp.example"][k % 3]
+        lines.append(f"EMAIL;TYPE=INTERNET:{first.lower()}.{last.lower()}{rng.randint(1, 99)}@{domain}")
+    for _ in range(rng.choice([0, 1, 1, 2])):
+        lines.append(f"TEL;TYPE=CELL:+1 {rng.randint(200, 999)} {rng.randint(200, 999)} {rng.randint(1000, 9999)}")
+    organization = rng.choice(ORGANIZATIONS)
+    if organization:
+        lines.append(f"ORG:{organization};")
+    roll = rng.random()
+    if roll < 0.03:
+        lines.append(f"BDAY:{rng.randint(1960, 2000)}-02-29")
+    elif roll < 0.35:
+        lines.append(f"BDAY:{rng.randint(1950, 2005)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}")
+    elif roll < 0.45:
+        lines.append(f"BDAY:--{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}")
+    if rng.random() < 0.2:
+        lines.append("NOTE:Met at the conference\\, follow up about the pilot.")
+    if rng.random() < 0.05:
+        photo = base64.b64encode(rng.randbytes(3000)).decode("ascii")
+        # Fold at 75 octets like real servers do
+        folded = "\r\n ".join(photo[i:i + 74] for i in range(0, len(photo), 74))
+        lines.append(f"PHOTO;ENCODING=b;TYPE=JPEG:{folded}")
+    lines.append("END:VCARD")
+    return "\r\n".join(lines) + "\r\n"
+
+
+def seed_addressbooks(standin: DAVStandIn, contacts: int, seed: int = 42) -> list[Collection]:
+    """Create a main address book with most contacts and a small shared one."""
+    rng = random.Random(seed + 1)
+    books = [standin.add_addressbook("Default", "Personal"), standin.add_addressbook("Shared", "Shared")]
+    for i in range(contacts):
+        book = books[0] if rng.random() < 0.9 else books[1]
+        book.put(f"contact-{i}.vcf", vcard(rng, f"contact-{i}@bench"))
+    return books
+
+
+def mutate_addressbooks(addressbooks: list[Collection], changes: int, seed: int) -> None:
+    """Edit, add and delete a few vCards per address book."""
+    rng = random.Random(seed)
+    for book in addressbooks:
+        names = [href.rsplit("/", 1)[1] for href in book.resources if "/contact-" in href]
+        for name in rng.sample(names, min(changes, len(names))):
+            book.put(name, vcard(rng, name[:-4] + "@bench"))
+        for j in range(max(1, changes // 4)):
+            book.put(f"new-{seed}-{j}.vcf", vcard(rng, f"new-{seed}-{j}@bench"))
+        for name in rng.sample(names, min(max(1, changes // 4), len(names))):
+            book.delete(name)
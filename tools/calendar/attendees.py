@@ -0,0 +1,54 @@
+"""
+Attendee enrichment for fetch-events.py --attendees.
+
+Every organizer and attendee address in a result set is looked up in the
+local contact index (tools/contacts, kept current by the contacts tool) with
+one batched query, and matches get the contact's name and organization:
+
+    {"email": "adam@example.com", "name": "Adam Bernard",
+     "organization": "Initech", "status": "ACCEPTED", "in_contacts": true}
+
+Addresses without a contact keep the name the invitation gave (CN), if any.
+Nothing goes over the network and the index is opened read-only; without a
+contact index, events are returned with the invitation's names only.
+"""
+
+import sqlite3
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "contacts"))
+from contact_store import STORE_PATH, ContactStore, normalize_email  # noqa: E402
+
+
+def people(event: dict) -> list[dict]:
+    """The organizer (if any) and attendees of an event."""
+    organizer = event.get("organizer")
+    return ([organizer] if organizer else []) + event.get("attendees", [])
+
+
+def enrich(events: list[dict], store_path: Path = STORE_PATH) -> list[dict]:
+    """Attach contact names and organizations to every organizer and attendee, in place."""
+    addresses = [person for event in events for person in people(event)]
+    if not addresses:
+        return events
+
+    if not store_path.exists():
+        print("Warning: No contact index yet (run contacts once); "
+              "attendees keep the names from the invitation", file=sys.stderr)
+        return events
+    try:
+        contacts = ContactStore(store_path, readonly=True).by_email(person["email"] for person in addresses)
+    except sqlite3.Error as e:
+        # Locked, or written by an older contacts tool (run contacts once to upgrade it)
+        print(f"Warning: Could not read the contact index ({e}); "
+              "attendees keep the names from the invitation", file=sys.stderr)
+        return events
+
+    for person in addresses:
+        contact = contacts.get(normalize_email(person["email"]))
+        person["in_contacts"] = contact is not None
+        person["organization"] = contact.get("organization") if contact else None
+        if contact:
+            person["name"] = contact.get("name") or person["name"]
+    return events
@@ -0,0 +1,127 @@
+"""
+Availability and fragmentation for fetch-events.py.
+
+Implements the get-available-time contract (procedures/get-available-time.md)
+for many days at once: timed events are merged into busy intervals with one
+sorted sweep, clipped to each day's work window, and the gaps between them
+are measured.
+"""
+
+from datetime import date, datetime, time, timedelta
+
+# Typical work day: 9 AM to 5 PM
+WORK_START = time(9, 0)
+WORK_END = time(17, 0)
+
+PROTECTED_BLOCK_HOURS = 2.0
+
+
+def to_local(value: str) -> datetime:
+    """Parse an event timestamp into a naive local datetime."""
+    dt = datetime.fromisoformat(value)
+    if dt.tzinfo:
+        dt = dt.astimezone().replace(tzinfo=None)
+    return dt
+
+
+def merge_intervals(intervals: list[tuple]) -> list[tuple]:
+    """Merge overlapping or touching (start, end) intervals. Input need not be sorted."""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def busy_intervals(events: list[dict]) -> list[tuple]:
+    """Merged busy intervals for the timed events in a fetch_events() result."""
+    intervals = []
+    for event in events:
+        if event["all_day"] or not event["end"]:
+            continue
+        start, end = to_local(event["start"]), to_local(event["end"])
+        if start < end:
+            intervals.append((start, end))
+    return merge_intervals(intervals)
+
+
+def _hours(delta: timedelta) -> float:
+    return delta.total_seconds() / 3600
+
+
+def classify_fragmentation(gaps: list[float], longest_block: float) -> str:
+    """Fragmentation based on number and size of gaps."""
+    if len(gaps) <= 2 and longest_block >= 2:
+        return "low"     # Few gaps, good focus blocks
+    if len(gaps) <= 4 and longest_block >= 1:
+        return "medium"  # Some gaps, can do medium tasks
+    return "high"        # Many small gaps, quick tasks only
+
+
+def availability(
+    events: list[dict],
+    start: date,
+    end: date,
+    work_start: time = WORK_START,
+    work_end: time = WORK_END,
+    weekdays_only: bool = False,
+) -> list[dict]:
+    """
+    Return the get-available-time breakdown for every day in [start, end).
+
+    Overlapping meetings are counted once. Busy intervals are swept in order,
+    so the whole range costs one sort plus one pass.
+    """
+    merged = busy_intervals(events)
+    total_work_hours = _hours(datetime.combine(start, work_end) - datetime.combine(start, work_start))
+
+    days = []
+    first = 0
+    day = start
+    while day < end:
+        window_start = datetime.combine(day, work_start)
+        window_end = datetime.combine(day, work_end)
+
+        # Intervals are sorted and merged, so anything that ended before this
+        # window also ended before every later one
+        while first < len(merged) and merged[first][1] <= window_start:
+            first += 1
+
+        if weekdays_only and day.weekday() >= 5:
+            day += timedelta(days=1)
+            continue
+
+        meeting_hours = 0.0
+        gaps = []
+        current = window_start
+        i = first
+        while i < len(merged) and merged[i][0] < window_end:
+            block_start = max(merged[i][0], window_start)
+            block_end = min(merged[i][1], window_end)
+            if block_start > current:
+                gaps.append(_hours(block_start - current))
+            meeting_hours += _hours(block_end - block_start)
+            current = max(current, block_end)
+            i += 1
+        if current < window_end:
+            gaps.append(_hours(window_end - current))
+
+        available_hours = total_work_hours - meeting_hours
+        longest_block = max(gaps) if gaps else available_hours
+
+        days.append({
+            "date": day.isoformat(),
+            "total_work_hours": round(total_work_hours, 1),
+            "meeting_hours": round(meeting_hours, 1),
+            "available_hours": round(available_hours, 1),
+            "has_protected_block": longest_block >= PROTECTED_BLOCK_HOURS,
+            "longest_block": round(longest_block, 1),
+            "fragmentation": classify_fragmentation(gaps, longest_block),
+            "gap_count": len(gaps),
+        })
+        day += timedelta(days=1)
+
+    return days
@@ -0,0 +1,139 @@
+"""
+Day-type and week-shape classification for fetch-events.py.
+
+Implements procedures/analyze-day-type.md and procedures/analyze-week-shape.md
+over a whole range of events at once: events are bucketed by day in a single
+pass, each day is classified, and each Monday-to-Sunday week gets a shape.
+"""
+
+from collections import defaultdict
+from datetime import date, timedelta
+
+from availability import merge_intervals, to_local
+
+HOLIDAY_KEYWORDS = ["holiday", "jour férié", "statutory"]
+LEAVE_KEYWORDS = ["vacation", "pto", "leave", "off", "congé", "vacances"]
+PARENTAL_KEYWORDS = ["parental", "paternity", "maternity"]
+OFF_SITE_KEYWORDS = ["off-site", "offsite", "retreat", "travel"]
+
+LEAVE_TYPES = ["leave", "parental_leave", "holiday"]
+
+
+def week_bounds(start: date, end: date) -> tuple[date, date]:
+    """Widen [start, end) to whole Monday-to-Sunday weeks."""
+    week_start = start - timedelta(days=start.weekday())
+    last_day = max(end - timedelta(days=1), start)
+    week_end = last_day + timedelta(days=7 - last_day.weekday())
+    return week_start, week_end
+
+
+def bucket_by_day(events: list[dict]) -> dict:
+    """
+    Map each date to its (all_day_events, timed_intervals) in one pass.
+
+    Multi-day all-day events (a week of vacation) land on every day they cover;
+    timed events land on the day they start.
+    """
+    all_day = defaultdict(list)
+    timed = defaultdict(list)
+    for event in events:
+        start = to_local(event["start"])
+        if event["all_day"]:
+            end = to_local(event["end"]) if event["end"] else start + timedelta(days=1)
+            day = start.date()
+            while True:
+                all_day[day].append(event)
+                day += timedelta(days=1)
+                if day >= end.date():
+                    break
+        elif event["end"]:
+            timed[start.date()].append((start, to_local(event["end"])))
+    return {day: (all_day.get(day, []), timed.get(day, [])) for day in set(all_day) | set(timed)}
+
+
+def classify_day(day: date, all_day_events: list[dict], timed_intervals: list[tuple]) -> dict:
+    """Classify one day (see analyze-day-type.md)."""
+    if day.weekday() >= 5:  # Saturday or Sunday
+        return {"type": "weekend", "confidence": "high"}
+
+    for event in all_day_events:
+        title = event["title"].lower()
+
+        # Holiday detection
+        if any(kw in title for kw in HOLIDAY_KEYWORDS):
+            return {"type": "holiday", "confidence": "high"}
+
+        # Off-site detection (before leave: "off-site" also contains "off")
+        if any(kw in title for kw in OFF_SITE_KEYWORDS):
+            return {"type": "off_site", "confidence": "high"}
+
+        # Leave detection
+        if any(kw in title for kw in LEAVE_KEYWORDS):
+            if any(kw in title for kw in PARENTAL_KEYWORDS):
+                return {"type": "parental_leave", "confidence": "high"}
+            return {"type": "leave", "confidence": "high"}
+
+    # Overlapping meetings are counted once
+    meeting_hours = sum(
+        (end - start).total_seconds() / 3600 for start, end in merge_intervals(timed_intervals)
+    )
+    meeting_hours = round(meeting_hours, 1)
+
+    if meeting_hours > 4:
+        return {"type": "work_day_heavy", "confidence": "medium", "meeting_hours": meeting_hours}
+    elif meeting_hours < 2:
+        return {"type": "work_day_light", "confidence": "medium", "meeting_hours": meeting_hours}
+    return {"type": "work_day", "confidence": "medium", "meeting_hours": meeting_hours}
+
+
+def classify_week(day_types: list[dict]) -> dict:
+    """Classify a week from its seven day types (see analyze-week-shape.md)."""
+    leave_days = sum(1 for dt in day_types if dt["type"] in LEAVE_TYPES)
+    parental_days = sum(1 for dt in day_types if dt["type"] == "parental_leave")
+    off_site_days = sum(1 for dt in day_types if dt["type"] == "off_site")
+    work_days = sum(1 for dt in day_types if "work" in dt["type"])
+    total_meeting_hours = sum(dt.get("meeting_hours", 0) for dt in day_types)
+
+    # Priority order: most specific first
+    if parental_days >= 3:
+        return {"shape": "parental_leave", "confidence": "high",
+                "details": f"{parental_days} parental leave days"}
+    if leave_days >= 3:
+        return {"shape": "vacation", "confidence": "high",
+                "details": f"{leave_days} leave days"}
+    if off_site_days >= 2:
+        return {"shape": "off_site", "confidence": "high",
+                "details": f"{off_site_days} off-site days"}
+
+    # Meeting load thresholds (assuming ~20 hrs/week normal)
+    if total_meeting_hours > 30:
+        return {"shape": "heavy_week", "confidence": "medium",
+                "details": f"{total_meeting_hours:.1f} meeting hours"}
+    if total_meeting_hours < 10 and work_days >= 4:
+        return {"shape": "light_week", "confidence": "medium",
+                "details": f"{total_meeting_hours:.1f} meeting hours"}
+    return {"shape": "normal_work", "confidence": "medium",
+            "details": f"{work_days} work days, {total_meeting_hours:.1f} meeting hours"}
+
+
+def classify(events: list[dict], start: date, end: date) -> list[dict]:
+    """
+    Classify every day and week overlapping [start, end).
+
+    The range is widened to whole weeks. Returns one entry per week with its
+    shape and the day types it was derived from.
+    """
+    week_start, week_end = week_bounds(start, end)
+    buckets = bucket_by_day(events)
+
+    weeks = []
+    monday = week_start
+    while monday < week_end:
+        days = []
+        for offset in range(7):
+            day = monday + timedelta(days=offset)
+            all_day_events, timed_intervals = buckets.get(day, ([], []))
+            days.append({"date": day.isoformat(), **classify_day(day, all_day_events, timed_intervals)})
+        weeks.append({"week_start": monday.isoformat(), **classify_week(days), "days": days})
+        monday += timedelta(days=7)
+    return weeks
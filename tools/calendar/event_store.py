@@ -0,0 +1,258 @@
+"""
+Local event store for fetch-events.py.
+
+Keeps a copy of every calendar object (raw iCalendar) in SQLite, together with
+each calendar's ctag and WebDAV sync token. Syncing a calendar costs one
+PROPFIND when nothing changed, and one sync-collection REPORT plus a multiget
+of the changed objects otherwise. Range queries are answered from disk.
+
+The store lives next to this file (events.db) and is never written to the vault.
+"""
+
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from caldav.elements import dav
+from caldav.elements.base import ValuedBaseElement
+
+from vevent import record_end, vevent_records
+
+# CLERK_EVENTS_DB points the store elsewhere (the benchmark uses a scratch copy)
+STORE_PATH = Path(os.environ.get("CLERK_EVENTS_DB") or Path(__file__).parent / "events.db")
+
+# Objects downloaded per calendar-multiget REPORT during a sync
+MULTIGET_BATCH = 200
+
+# How long the discovered calendar list is trusted before asking the server again
+DISCOVERY_TTL = 24 * 3600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS calendars (
+    url TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    ctag TEXT,
+    sync_token TEXT,
+    synced_at REAL
+);
+CREATE TABLE IF NOT EXISTS objects (
+    calendar_url TEXT NOT NULL,
+    href TEXT NOT NULL,
+    etag TEXT,
+    data TEXT NOT NULL,
+    range_start REAL,
+    range_end REAL,
+    PRIMARY KEY (calendar_url, href)
+);
+CREATE INDEX IF NOT EXISTS objects_by_range ON objects (calendar_url, range_start);
+CREATE TABLE IF NOT EXISTS discovered (
+    url TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    ctag TEXT,
+    discovered_at REAL NOT NULL
+);
+"""
+
+
+class GetCTag(ValuedBaseElement):
+    """CalendarServer ctag: changes whenever anything in the calendar changes."""
+    tag = "{http://calendarserver.org/ns/}getctag"
+
+
+def to_epoch(value) -> float:
+    """Convert a date/datetime to epoch seconds. Naive values are local time."""
+    if not isinstance(value, datetime):
+        value = datetime.combine(value, datetime.min.time())
+    return value.timestamp()
+
+
+def object_bounds(data) -> tuple[Optional[float], Optional[float]]:
+    """
+    Return the (start, end) epoch range an object can produce events in.
+
+    end is None for recurring objects, which are always expanded at query time.
+    """
+    starts, ends = [], []
+    recurring = False
+    for record in vevent_records(data):
+        if record["dtstart"] is None:
+            continue
+        starts.append(to_epoch(record["dtstart"]))
+        ends.append(to_epoch(record_end(record)))
+        recurring = recurring or record["recurring"]
+
+    if not starts:
+        return None, None
+    return min(starts), None if recurring else max(ends)
+
+
+class EventStore:
+    """SQLite-backed copy of one or more CalDAV calendars."""
+
+    def __init__(self, path: Path = STORE_PATH):
+        self.path = path
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        # One connection per operation so the store can be shared across threads
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def calendars(self) -> dict:
+        """Return name->url for every calendar that has been synced at least once."""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT name, url FROM calendars WHERE synced_at IS NOT NULL")
+            return {name: url for name, url in rows}
+
+    def discovered_calendars(self, ttl: float = DISCOVERY_TTL) -> Optional[list[tuple]]:
+        """
+        Return the cached calendar list as (name, url, ctag) tuples.
+
+        Returns None when nothing is cached or the cache is older than ttl seconds.
+        """
+        with self._connect() as conn:
+            rows = conn.execute("SELECT name, url, ctag, discovered_at FROM discovered").fetchall()
+        if not rows or min(row[3] for row in rows) < time.time() - ttl:
+            return None
+        return [(name, url, ctag) for name, url, ctag, _ in rows]
+
+    def save_discovery(self, calendars: list[tuple]) -> None:
+        """Replace the cached calendar list with (name, url, ctag) tuples."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("DELETE FROM discovered")
+            conn.executemany(
+                "INSERT OR REPLACE INTO discovered (name, url, ctag, discovered_at) VALUES (?, ?, ?, ?)",
+                [(name, url, ctag, now) for name, url, ctag in calendars],
+            )
+
+    def invalidate_discovery(self) -> None:
+        """Forget the cached calendar list so the next lookup asks the server."""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM discovered")
+
+    def sync(self, calendar, ctag: Optional[str] = None) -> None:
+        """
+        Bring the stored copy of a caldav Calendar up to date with the server.
+
+        Pass a ctag that was just read from the server (e.g. during discovery)
+        to skip the PROPFIND that checks whether anything changed.
+        """
+        url = str(calendar.url)
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT ctag, sync_token FROM calendars WHERE url = ?", (url,)
+            ).fetchone()
+        stored_ctag, token = row if row else (None, None)
+
+        if ctag is None:
+            try:
+                ctag = calendar.get_property(GetCTag())
+            except Exception:
+                ctag = None
+        if row and ctag and ctag == stored_ctag:
+            self._save_calendar(url, calendar.get_display_name(), ctag, token)
+            return
+
+        try:
+            result = calendar.objects_by_sync_token(sync_token=token, load_objects=False)
+        except Exception:
+            if token is None:
+                raise
+            # Token expired or rejected by the server: start over
+            token = None
+            result = calendar.objects_by_sync_token(sync_token=None, load_objects=False)
+
+        new_token = result.sync_token
+        # Servers without sync-collection support get a client-side "fake-" token
+        # and a full listing each time
+        full_listing = token is None or str(new_token).startswith("fake-")
+        if str(new_token).startswith("fake-"):
+            new_token = None
+
+        with self._connect() as conn:
+            known = dict(conn.execute(
+                "SELECT href, etag FROM objects WHERE calendar_url = ?", (url,)
+            ))
+
+        seen, deleted, upserts = set(), [], []
+        changed = {}
+        for obj in result:
+            href = str(obj.url)
+            etag = obj.props.get(dav.GetEtag.tag) if obj.props else None
+            seen.add(href)
+            if obj.data is not None:
+                upserts.append((href, etag, obj.data))
+            elif etag is None:
+                deleted.append(href)
+            elif known.get(href) != etag:
+                changed[href] = (obj.url, etag)
+
+        if full_listing:
+            deleted.extend(href for href in known if href not in seen)
+
+        pending = list(changed.values())
+        for i in range(0, len(pending), MULTIGET_BATCH):
+            batch = pending[i:i + MULTIGET_BATCH]
+            etags = {str(obj_url): etag for obj_url, etag in batch}
+            for obj in calendar.multiget([obj_url for obj_url, _ in batch], raise_notfound=False):
+                href = str(obj.url)
+                upserts.append((href, etags.get(href), obj.data))
+
+        rows = []
+        for href, etag, data in upserts:
+            try:
+                range_start, range_end = object_bounds(data)
+            except Exception:
+                # Keep unparseable objects out of the store; they'd be skipped anyway
+                continue
+            rows.append((url, href, etag, data, range_start, range_end))
+
+        with self._connect() as conn:
+            conn.executemany(
+                "DELETE FROM objects WHERE calendar_url = ? AND href = ?",
+                [(url, href) for href in deleted],
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO objects"
+                " (calendar_url, href, etag, data, range_start, range_end)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+        self._save_calendar(url, calendar.get_display_name(), ctag, new_token)
+
+    def _save_calendar(self, url: str, name: str, ctag: Optional[str], token: Optional[str]) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO calendars (url, name, ctag, sync_token, synced_at)"
+                " VALUES (?, ?, ?, ?, ?)"
+                " ON CONFLICT(url) DO UPDATE SET name = excluded.name, ctag = excluded.ctag,"
+                " sync_token = excluded.sync_token, synced_at = excluded.synced_at",
+                (url, name, ctag, token, time.time()),
+            )
+
+    def query_objects(self, calendar_url: str, start: datetime, end: datetime,
+                      recurring: Optional[bool] = None) -> list[str]:
+        """
+        Return the raw calendar objects stored for a calendar that may overlap [start, end).
+
+        recurring=True returns only recurring series, recurring=False only the rest.
+        """
+        query = ("SELECT data FROM objects WHERE calendar_url = ?"
+                 " AND range_start < ? AND (range_end IS NULL OR range_end >= ?)")
+        if recurring is not None:
+            # Recurring objects are stored without an end (see object_bounds)
+            query += " AND range_end IS NULL" if recurring else " AND range_end IS NOT NULL"
+        with self._connect() as conn:
+            rows = conn.execute(query, (calendar_url, to_epoch(end), to_epoch(start))).fetchall()
+        return [data for (data,) in rows]
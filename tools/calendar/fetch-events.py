@@ -9,24 +9,54 @@ Examples:
     python fetch-events.py --start 2026-01-26 --end 2026-02-01
     python fetch-events.py --start today --end +7d
     python fetch-events.py --calendar work --start today --end +1d
+    python fetch-events.py --offline --start today --end +7d
+    python fetch-events.py --attendees --start today --end +1d
+    python fetch-events.py --query work today +1d --query all today +7d
+    python fetch-events.py --batch - < queries.json   # [{"mode": "classify", ...}, ...]
+    python fetch-events.py availability --start today --end +7d
+    python fetch-events.py classify --start today --end +28d
+
+Events are served from a local store (events.db) that is kept current with
+WebDAV sync tokens, so only changed events are downloaded. Use --offline to
+read the store without contacting the server, or --no-cache to query the
+server directly.
 
 Environment variables:
     FASTMAIL_USERNAME - Fastmail email address
     FASTMAIL_CALDAV_PASSWORD - Fastmail app password with CalDAV (Calendars) access
+    FASTMAIL_CALDAV_SERVER - CalDAV server root (default: https://caldav.fastmail.com)
 """
 
 import argparse
+import hashlib
 import json
 import os
 import sys
-from datetime import datetime, timedelta
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time, timedelta
 from pathlib import Path
-from typing import Optional
+from time import monotonic
+from typing import Iterator, Optional
+from urllib.parse import unquote
 
 import caldav
 import yaml
 from caldav.calendarobjectresource import Event
-from icalendar import Calendar
+from caldav.elements.dav import DisplayName
+from caldav.lib.error import NotFoundError
+
+from availability import availability, merge_intervals, to_local
+from classify import classify, week_bounds
+from event_store import DISCOVERY_TTL, EventStore, GetCTag
+from vevent import is_series, parse_objects, series_events
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "shared"))
+import dav_transport  # noqa: E402
+import resident  # noqa: E402
+
+# Where `cal --serve` listens; the cal wrapper uses it when present
+SOCKET_PATH = Path(__file__).parent / ".cal.sock"
 
 # Load calendar aliases from config file
 def load_calendar_aliases() -> dict:
@@ -43,11 +73,27 @@ def load_calendar_aliases() -> dict:
 
 CALENDAR_ALIASES = load_calendar_aliases()
 
-# Cache for discovered calendars
+# Server root; overridden to point the tool at the benchmark's local stand-in
+CALDAV_SERVER = os.environ.get("FASTMAIL_CALDAV_SERVER", "https://caldav.fastmail.com")
+
+# Calendars fetched in parallel (each one is mostly network wait)
+MAX_WORKERS = 8
+
+# Cache for discovered calendars (backed by the discovery table in events.db)
 _calendar_cache: dict = {}
+_calendar_cache_time = 0.0
+# ctags read from the server during discovery in this process, by calendar URL
+_fresh_ctags: dict = {}
+_discovered_from_server = False
 _client = None
 
 
+def enrich(events: list[dict]) -> list[dict]:
+    """attendees.enrich(), imported on first use so runs without --attendees never load the contact index."""
+    from attendees import enrich as enrich_attendees
+    return enrich_attendees(events)
+
+
 def get_client():
     """Get authenticated CalDAV client."""
     global _client
@@ -61,24 +107,72 @@ def get_client():
         print("Error: FASTMAIL_USERNAME and FASTMAIL_CALDAV_PASSWORD must be set", file=sys.stderr)
         sys.exit(1)
 
-    base_url = f"https://caldav.fastmail.com/dav/calendars/user/{username}/"
-    _client = caldav.DAVClient(url=base_url, username=username, password=password)
+    base_url = f"{CALDAV_SERVER}/dav/calendars/user/{username}/"
+    # Fastmail takes Basic auth: sending it up front saves the 401 round trip, which
+    # concurrent first requests on a shared client would otherwise race over
+    _client = caldav.DAVClient(url=base_url, username=username, password=password, auth_type="basic")
+    # Pooled keep-alive connections, gzip, retries on 5xx/timeouts, on caldav's own
+    # session (niquests, or requests when niquests isn't installed)
+    dav_transport.mount(_client.session, pool_size=MAX_WORKERS)
     return _client
 
 
-def discover_calendars(client) -> dict:
-    """Discover available calendars and return name->calendar mapping."""
-    global _calendar_cache
-    if _calendar_cache:
+def fetch_calendar_list(client) -> list[tuple]:
+    """Ask the server for its calendars and return (name, url, ctag) tuples."""
+    home = client.principal().calendar_home_set
+    calendars = home.get_calendars()
+
+    # One Depth: 1 PROPFIND on the home set returns every calendar's ctag
+    ctags = {}
+    try:
+        response = home._query_properties([GetCTag()], depth=1)
+        for path, props in response.expand_simple_props([GetCTag()]).items():
+            ctags[unquote(path).rstrip("/")] = props.get(GetCTag.tag)
+    except Exception:
+        pass
+
+    return [
+        (cal.get_display_name(), str(cal.url), ctags.get(unquote(cal.url.path).rstrip("/")))
+        for cal in calendars
+    ]
+
+
+def discover_calendars(client, refresh: bool = False) -> dict:
+    """
+    Discover available calendars and return name->calendar mapping.
+
+    The calendar list is cached on disk for DISCOVERY_TTL, so most runs skip the
+    principal lookup and PROPFIND entirely. refresh=True asks the server again.
+    """
+    global _calendar_cache, _calendar_cache_time, _discovered_from_server
+    # A resident server outlives the TTL, so the in-memory copy expires too
+    if _calendar_cache and not refresh and monotonic() - _calendar_cache_time < DISCOVERY_TTL:
         return _calendar_cache
 
-    principal = client.principal()
-    for cal in principal.calendars():
-        _calendar_cache[cal.name] = cal
-
+    store = EventStore()
+    calendars = None if refresh else store.discovered_calendars()
+    if calendars is None:
+        calendars = fetch_calendar_list(client)
+        store.save_discovery(calendars)
+        _discovered_from_server = True
+        _fresh_ctags.update({url: ctag for _, url, ctag in calendars if ctag})
+
+    _calendar_cache = {
+        name: caldav.Calendar(client=client, url=url, props={DisplayName.tag: name})
+        for name, url, _ in calendars
+    }
+    _calendar_cache_time = monotonic()
     return _calendar_cache
 
 
+def begin_request() -> None:
+    """Reset per-call state when running as a resident server (client and caches stay warm)."""
+    global _discovered_from_server
+    _discovered_from_server = False
+    # ctags are only trustworthy right after they were read
+    _fresh_ctags.clear()
+
+
 def parse_date(date_str: str) -> datetime:
     """Parse date string with support for relative dates."""
     if date_str == "today":
@@ -92,26 +186,104 @@ def parse_date(date_str: str) -> datetime:
         return datetime.fromisoformat(date_str)
 
 
-def get_datetime(dt_prop) -> tuple[datetime, bool]:
-    """Extract datetime from icalendar property, handling DATE vs DATE-TIME."""
-    dt = dt_prop.dt
-    is_all_day = not isinstance(dt, datetime)
-    if is_all_day:
-        dt = datetime.combine(dt, datetime.min.time())
-    return dt, is_all_day
-
-
-def fetch_events(
-    calendar_names: list[str],
+def fetch_objects(
+    cal_name: str,
+    calendar,
+    start: datetime,
+    end: datetime,
+    store: Optional[EventStore] = None,
+    offline: bool = False,
+    expand: str = "local",
+    recurring: Optional[bool] = None,
+) -> list:
+    """
+    Fetch the raw calendar objects of one calendar that may overlap [start, end).
+
+    calendar is a caldav Calendar, or a calendar URL when reading the store offline.
+    With a store, the calendar is synced first (unless offline) and read from
+    disk; recurring=True/False keeps only recurring series or only the rest.
+    Without a store, the server is searched, with one object per occurrence when
+    expand="server". Failures are reported as a warning and yield no objects.
+    """
+    if store:
+        try:
+            if offline:
+                calendar_url = calendar
+            else:
+                calendar_url = str(calendar.url)
+                store.sync(calendar, ctag=_fresh_ctags.get(calendar_url))
+            return store.query_objects(calendar_url, start, end, recurring)
+        except NotFoundError as e:
+            # Calendar was removed or moved since discovery: rediscover next time
+            store.invalidate_discovery()
+            print(f"Warning: Failed to fetch calendar '{cal_name}': {e}", file=sys.stderr)
+        except Exception as e:
+            print(f"Warning: Failed to fetch calendar '{cal_name}': {e}", file=sys.stderr)
+        return []
+
+    try:
+        # Use search() with comp_class=Event for server-side filtering
+        # This is much faster than fetching all events and filtering client-side
+        cal_events = calendar.search(
+            start=start,
+            end=end,
+            comp_class=Event,
+            expand=expand == "server",  # Expand recurring events on the server
+        )
+        # With expand="local", masters and overrides arrive once and are expanded by the caller
+        return [event.data for event in cal_events]
+    except Exception as e:
+        print(f"Warning: Failed to fetch calendar '{cal_name}': {e}", file=sys.stderr)
+        return []
+
+
+def fetch_calendar(
+    cal_name: str,
+    calendar,
     start: datetime,
     end: datetime,
+    store: Optional[EventStore] = None,
+    offline: bool = False,
+    expand: str = "local",
+    parse_workers: int = 0,
+    attendees: bool = False,
 ) -> list[dict]:
-    """Fetch events from specified calendars."""
-    client = get_client()
-    available_calendars = discover_calendars(client)
+    """
+    Fetch events from one calendar.
+
+    calendar is a caldav Calendar, or a calendar URL when reading the store offline.
+    Without a store, expand="local" fetches each recurring series once and expands
+    it here; expand="server" asks the server for one object per occurrence.
+    parse_workers > 1 parses large result sets in a process pool.
+    attendees=True keeps each event's organizer and attendees.
+    Failures are reported as a warning and yield no events.
+    """
+    objects = fetch_objects(cal_name, calendar, start, end, store, offline, expand)
+    return parse_objects(objects, cal_name, start, end, "local" if store else expand, parse_workers, attendees)
 
-    events = []
 
+def resolve_calendars(
+    calendar_names: list[str],
+    store: Optional[EventStore] = None,
+    offline: bool = False,
+) -> list[tuple]:
+    """
+    Resolve aliases and return (name, calendar) pairs for the calendars that exist.
+
+    calendar is a caldav Calendar, or a calendar URL when reading the store offline.
+    Missing calendars are reported as warnings, in the order they were requested.
+    """
+    if offline:
+        available_calendars = store.calendars()
+    else:
+        client = get_client()
+        available_calendars = discover_calendars(client)
+        # A miss may just mean the cached calendar list is stale
+        missing = any(CALENDAR_ALIASES.get(n, n) not in available_calendars for n in calendar_names)
+        if missing and not _discovered_from_server:
+            available_calendars = discover_calendars(client, refresh=True)
+
+    targets = []
     for cal_name in calendar_names:
         # Resolve alias to actual calendar name
         actual_name = CALENDAR_ALIASES.get(cal_name, cal_name)
@@ -121,58 +293,239 @@ def fetch_events(
             print(f"Warning: Calendar '{cal_name}' ({actual_name}) not found", file=sys.stderr)
             print(f"Available: {list(available_calendars.keys())}", file=sys.stderr)
             continue
+        targets.append((cal_name, calendar))
 
-        try:
-            # Use search() with comp_class=Event for server-side filtering
-            # This is much faster than fetching all events and filtering client-side
-            cal_events = calendar.search(
-                start=start,
-                end=end,
-                comp_class=Event,
-                expand=True,  # Expand recurring events
-            )
+    return targets
 
-            for event in cal_events:
-                try:
-                    ical = Calendar.from_ical(event.data)
-                    for component in ical.walk():
-                        if component.name == "VEVENT":
-                            dtstart = component.get("dtstart")
-                            dtend = component.get("dtend")
-                            summary = str(component.get("summary", ""))
-                            location = str(component.get("location", "")) if component.get("location") else None
-
-                            if dtstart:
-                                start_dt, is_all_day = get_datetime(dtstart)
-                                end_dt = None
-                                if dtend:
-                                    end_dt, _ = get_datetime(dtend)
-
-                                events.append({
-                                    "calendar": cal_name,
-                                    "title": summary,
-                                    "start": start_dt.isoformat(),
-                                    "end": end_dt.isoformat() if end_dt else None,
-                                    "all_day": is_all_day,
-                                    "location": location,
-                                })
-                except Exception as e:
-                    # Skip problematic events
-                    pass
 
+def fetch_targets(
+    targets: list[tuple],
+    start: datetime,
+    end: datetime,
+    store: Optional[EventStore] = None,
+    offline: bool = False,
+    max_workers: int = MAX_WORKERS,
+    expand: str = "local",
+    parse_workers: int = 0,
+    attendees: bool = False,
+) -> list[dict]:
+    """
+    Fetch resolved (name, calendar) pairs concurrently and return events sorted by start.
+
+    attendees=True adds organizers and attendees, joined against the contact index.
+    """
+    events = []
+    if targets:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(targets)))) as pool:
+            futures = [
+                pool.submit(fetch_calendar, cal_name, calendar, start, end, store, offline,
+                            expand, parse_workers, attendees)
+                for cal_name, calendar in targets
+            ]
+            for future in futures:
+                events.extend(future.result())
+
+    # Sort by start time (as instants: the ISO strings carry different UTC offsets)
+    events.sort(key=event_start_local)
+
+    if attendees:
+        # One contact lookup for every address in the range
+        enrich(events)
+
+    return events
+
+
+def fetch_events(
+    calendar_names: list[str],
+    start: datetime,
+    end: datetime,
+    use_store: bool = True,
+    offline: bool = False,
+    max_workers: int = MAX_WORKERS,
+    expand: str = "local",
+    parse_workers: int = 0,
+    attendees: bool = False,
+) -> list[dict]:
+    """
+    Fetch events from specified calendars.
+
+    Calendars are fetched concurrently (at most max_workers at a time), so the
+    total wait is roughly the slowest calendar rather than the sum of all of them.
+
+    By default each calendar is synced into the local store and the range is
+    answered from disk. offline=True skips the sync entirely; use_store=False
+    queries the server directly, expanding recurrences as chosen by expand.
+    parse_workers > 1 parses very large ranges in a process pool. attendees=True
+    adds each event's organizer and attendees, with names and organizations
+    from the local contact index.
+    """
+    store = EventStore() if use_store or offline else None
+    targets = resolve_calendars(calendar_names, store, offline)
+    return fetch_targets(targets, start, end, store, offline, max_workers, expand, parse_workers, attendees)
+
+
+def sync_targets(targets: list[tuple], store: EventStore, max_workers: int = MAX_WORKERS) -> list[tuple]:
+    """
+    Sync resolved (name, calendar) pairs into the store concurrently.
+
+    Returns (name, calendar URL) pairs for reading the store offline, leaving
+    out calendars that failed to sync (reported as warnings).
+    """
+    def sync(target):
+        cal_name, calendar = target
+        calendar_url = str(calendar.url)
+        try:
+            store.sync(calendar, ctag=_fresh_ctags.get(calendar_url))
         except Exception as e:
             print(f"Warning: Failed to fetch calendar '{cal_name}': {e}", file=sys.stderr)
+            return None
+        return cal_name, calendar_url
 
-    # Sort by start time
-    events.sort(key=lambda e: e["start"])
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(targets) or 1))) as pool:
+        return [t for t in pool.map(sync, targets) if t]
 
-    return events
+
+def split_range(start: datetime, end: datetime, window: str = "week") -> list[tuple]:
+    """Split [start, end) into consecutive day or week windows."""
+    step = timedelta(days=7 if window == "week" else 1)
+    windows = []
+    while start < end:
+        windows.append((start, min(start + step, end)))
+        start += step
+    return windows
 
 
-def list_calendars():
+def event_start_local(event: dict) -> datetime:
+    """Return an event's start as a naive local datetime, comparable to parse_date() values."""
+    start = datetime.fromisoformat(event["start"])
+    if start.tzinfo:
+        start = start.astimezone().replace(tzinfo=None)
+    return start
+
+
+def stream_events(
+    calendar_names: list[str],
+    start: datetime,
+    end: datetime,
+    window: str = "week",
+    use_store: bool = True,
+    offline: bool = False,
+    max_workers: int = MAX_WORKERS,
+    expand: str = "local",
+    attendees: bool = False,
+) -> Iterator[dict]:
+    """
+    Yield events in start-time order, one window at a time.
+
+    The range is split into day or week windows that are fetched concurrently,
+    with at most max_workers windows in flight, so the first events are
+    available before the last window is done. Calendars are resolved (and
+    synced into the store) once, up front.
+
+    Recurring series are expanded once and lazily: each keeps an iterator over
+    its occurrences that the windows pull from in turn, up to their own end.
+    With the store, series are read once up front and windows read only the
+    single events they overlap; without it, a series is picked up from the
+    first window the server returns it in. Memory holds the windows in flight,
+    each series' parsed object and its next occurrence, never a series' whole
+    expansion.
+
+    Each event is owned by the window it starts in, so events spanning a window
+    boundary are emitted once. Because windows are disjoint and ordered, merging
+    the sorted windows reduces to emitting them in order.
+    """
+    store = EventStore() if use_store or offline else None
+    targets = resolve_calendars(calendar_names, store, offline)
+
+    if store and not offline:
+        # Sync each calendar once; the windows then read the store without the network
+        targets = sync_targets(targets, store, max_workers)
+        offline = True
+
+    # [calendar name, occurrence iterator, next occurrence or None] per series
+    series = []
+    seen = set()
+
+    def advance(entry: list) -> None:
+        """Move a series on to its next occurrence."""
+        try:
+            entry[2] = next(entry[1], None)
+        except Exception as e:
+            # Skip problematic series, as parse_objects() skips problematic objects
+            print(f"Warning: Skipping a recurring event in '{entry[0]}': {e}", file=sys.stderr)
+            entry[2] = None
+
+    def add_series(found: list[tuple], window_start: datetime) -> None:
+        """Start expanding the (name, object) series not seen yet, from window_start on."""
+        for cal_name, data in found:
+            key = (cal_name, hashlib.sha1(data.encode("utf-8") if isinstance(data, str) else data).digest())
+            if key not in seen:
+                seen.add(key)
+                series.append([cal_name, series_events(data, cal_name, window_start, attendees), None])
+                advance(series[-1])
+
+    def series_window(window_end: datetime) -> list[dict]:
+        """Occurrences of every series that start before window_end and haven't been emitted."""
+        events = []
+        for entry in series:
+            while entry[2] is not None and event_start_local(entry[2]) < window_end:
+                events.append(entry[2])
+                advance(entry)
+        series[:] = [entry for entry in series if entry[2] is not None]
+        return events
+
+    def fetch_window(window_start: datetime, window_end: datetime) -> tuple[list[dict], list[tuple]]:
+        """The window's single events, and the (name, object) series it overlaps."""
+        events, found = [], []
+        for cal_name, calendar in targets:
+            objects = fetch_objects(cal_name, calendar, window_start, window_end, store, offline, expand,
+                                    recurring=False if store else None)
+            if expand == "local" and not store:
+                found.extend((cal_name, data) for data in objects if is_series(data))
+                objects = [data for data in objects if not is_series(data)]
+            events.extend(parse_objects(objects, cal_name, window_start, window_end,
+                                        "local" if store else expand, 0, attendees))
+        return events, found
+
+    if store:
+        add_series([
+            (cal_name, data)
+            for cal_name, calendar_url in targets
+            for data in fetch_objects(cal_name, calendar_url, start, end, store, offline, recurring=True)
+        ], start)
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        pending = deque()
+        upcoming = iter(split_range(start, end, window))
+
+        def submit_next():
+            for window_start, window_end in upcoming:
+                pending.append((window_start, window_end, pool.submit(fetch_window, window_start, window_end)))
+                return
+
+        for _ in range(max_workers):
+            submit_next()
+
+        first = True
+        while pending:
+            window_start, window_end, future = pending.popleft()
+            window_events, found = future.result()
+            submit_next()
+            add_series(found, start if first else window_start)
+            window_events.extend(series_window(window_end))
+            window_events.sort(key=event_start_local)
+            if attendees:
+                enrich(window_events)
+            for event in window_events:
+                if first or event_start_local(event) >= window_start:
+                    yield event
+            first = False
+
+
+def list_calendars(refresh: bool = False):
     """List available calendars."""
     client = get_client()
-    calendars = discover_calendars(client)
+    calendars = discover_calendars(client, refresh=refresh)
     print("Available calendars:")
     for name in sorted(calendars.keys()):
         alias = next((k for k, v in CALENDAR_ALIASES.items() if v == name), None)
@@ -182,35 +535,323 @@ def list_calendars():
             print(f"  {name}")
 
 
-def main():
-    parser = argparse.ArgumentParser(description="Fetch calendar events from Fastmail")
+def add_fetch_arguments(parser: argparse.ArgumentParser) -> None:
+    """Options shared by plain fetches and subcommands."""
     parser.add_argument("--start", default="today", help="Start date (YYYY-MM-DD, 'today', 'tomorrow', or '+Nd')")
     parser.add_argument("--end", default="+1d", help="End date (YYYY-MM-DD or '+Nd')")
     parser.add_argument("--calendar", "-c", action="append", dest="calendars",
                         help="Calendar to fetch (work, personal, or actual name). Can specify multiple.")
     parser.add_argument("--all", action="store_true", help="Fetch from all calendars")
+    parser.add_argument("--offline", action="store_true",
+                        help="Answer from the local event store only (no network)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Query the server directly, bypassing the local event store")
+    parser.add_argument("--expand", choices=["local", "server"], default="local",
+                        help="With --no-cache: expand recurring events locally (default) or on the server")
+    parser.add_argument("--refresh", action="store_true",
+                        help="Rediscover calendars instead of using the cached list")
+    parser.add_argument("--parse-workers", type=int, default=0,
+                        help="Processes for parsing very large ranges (default: parse in-process)")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS,
+                        help=f"Calendars to fetch in parallel (default: {MAX_WORKERS})")
+
+
+def select_calendars(args, default: list[str]) -> list[str]:
+    """Calendars named by --all / --calendar, or the default set."""
+    if args.all:
+        if args.offline:
+            return list(EventStore().calendars().keys())
+        client = get_client()
+        return list(discover_calendars(client).keys())
+    if args.calendars:
+        return args.calendars
+    return default
+
+
+def fetch_for_args(args, calendars: list[str], start: datetime, end: datetime,
+                   attendees: bool = False) -> list[dict]:
+    """fetch_events() with the options from add_fetch_arguments()."""
+    return fetch_events(calendars, start, end, use_store=not args.no_cache,
+                        offline=args.offline, max_workers=args.workers, expand=args.expand,
+                        parse_workers=args.parse_workers, attendees=attendees)
+
+
+def parse_time(value: str) -> time:
+    """Parse HH:MM."""
+    return datetime.strptime(value, "%H:%M").time()
+
+
+def run_availability(args) -> None:
+    """Print the get-available-time breakdown for each day in the range."""
+    start = parse_date(args.start)
+    end = parse_date(args.end)
+    if args.refresh and not args.offline:
+        discover_calendars(get_client(), refresh=True)
+
+    # Only work events count against availability unless told otherwise
+    calendars = select_calendars(args, ["work"])
+    events = fetch_for_args(args, calendars, start, end)
+    days = availability(
+        events,
+        start.date(),
+        end.date(),
+        work_start=parse_time(args.work_start),
+        work_end=parse_time(args.work_end),
+        weekdays_only=args.weekdays_only,
+    )
+    print(json.dumps(days, indent=2))
+
+
+def run_classify(args) -> None:
+    """Print day types and week shapes for every week overlapping the range."""
+    start = parse_date(args.start)
+    end = parse_date(args.end)
+    if args.refresh and not args.offline:
+        discover_calendars(get_client(), refresh=True)
+
+    # Fetch whole weeks once; day types only look at the work calendar by default
+    week_start, week_end = week_bounds(start.date(), end.date())
+    calendars = select_calendars(args, ["work"])
+    events = fetch_for_args(
+        args, calendars,
+        datetime.combine(week_start, time.min), datetime.combine(week_end, time.min),
+    )
+    print(json.dumps(classify(events, start.date(), end.date()), indent=2))
+
+
+# What a batch query can ask for, and the calendars each uses when it names none
+BATCH_MODES = {"events": ["work", "personal"], "availability": ["work"], "classify": ["work"]}
+
+
+def event_overlaps(event: dict, start: datetime, end: datetime) -> bool:
+    """Whether an event dict overlaps [start, end), by the same rule as the fetch itself."""
+    event_start = to_local(event["start"])
+    event_end = to_local(event["end"]) if event["end"] else event_start
+    # Zero-length events count at their start
+    return event_start < end and (event_end > start or (event_start == event_end and event_start >= start))
+
+
+def read_batch(source: str) -> list[dict]:
+    """Batch queries from a file (or - for stdin): a JSON list of query objects."""
+    text = sys.stdin.read() if source == "-" else Path(source).read_text()
+    try:
+        queries = json.loads(text)
+    except ValueError as e:
+        raise ValueError(f"batch spec is not valid JSON: {e}")
+    if isinstance(queries, dict):
+        queries = queries.get("queries")
+    if not isinstance(queries, list) or not all(isinstance(q, dict) for q in queries):
+        raise ValueError("batch spec must be a JSON list of query objects")
+    return queries
+
+
+def batch_query(query: dict, all_calendars) -> dict:
+    """
+    Normalize one batch query: resolve its mode, calendars and dates.
+
+    all_calendars is called when the query asks for "all" calendars.
+    """
+    mode = query.get("mode", "events")
+    if mode not in BATCH_MODES:
+        raise ValueError(f"unknown mode {mode!r} (choose from {', '.join(BATCH_MODES)})")
+    calendars = query.get("calendars") or BATCH_MODES[mode]
+    if calendars == "all":
+        calendars = all_calendars()
+    elif isinstance(calendars, str):
+        calendars = calendars.split(",")
+    start = parse_date(query.get("start", "today"))
+    end = parse_date(query.get("end", "+1d"))
+
+    # Day types and week shapes need whole weeks of events
+    fetch_start, fetch_end = start, end
+    if mode == "classify":
+        week_start, week_end = week_bounds(start.date(), end.date())
+        fetch_start, fetch_end = datetime.combine(week_start, time.min), datetime.combine(week_end, time.min)
+
+    return {**query, "mode": mode, "calendars": list(calendars), "start": start, "end": end,
+            "fetch": (fetch_start, fetch_end)}
+
+
+def fetch_batch(
+    queries: list[dict],
+    use_store: bool = True,
+    offline: bool = False,
+    max_workers: int = MAX_WORKERS,
+    expand: str = "local",
+    parse_workers: int = 0,
+    attendees: bool = False,
+) -> list[dict]:
+    """
+    Answer several batch_query() queries with one fetch per calendar.
+
+    Calendars are resolved (and synced) once. Each calendar is fetched once for
+    the union of the ranges of the queries that use it (one fetch per disjoint
+    span), and every query is then answered by slicing those events in memory.
+    """
+    calendar_names = list(dict.fromkeys(name for query in queries for name in query["calendars"]))
+    store = EventStore() if use_store or offline else None
+    targets = resolve_calendars(calendar_names, store, offline)
+    if store and not offline:
+        targets = sync_targets(targets, store, max_workers)
+        offline = True
+
+    spans = [
+        (cal_name, calendar, span_start, span_end)
+        for cal_name, calendar in targets
+        for span_start, span_end in merge_intervals(
+            [query["fetch"] for query in queries if cal_name in query["calendars"]])
+    ]
+    fetched = defaultdict(list)
+    if spans:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(spans)))) as pool:
+            futures = [
+                pool.submit(fetch_calendar, cal_name, calendar, span_start, span_end, store, offline,
+                            expand, parse_workers, attendees)
+                for cal_name, calendar, span_start, span_end in spans
+            ]
+            for (cal_name, _, span_start, span_end), future in zip(spans, futures):
+                fetched[cal_name].append((span_start, span_end, future.result()))
+
+    # An event overlapping two of a calendar's spans came back from both: keep the first
+    events_by_calendar = {}
+    for cal_name, parts in fetched.items():
+        events_by_calendar[cal_name] = [
+            event
+            for i, (_, _, events) in enumerate(parts)
+            for event in events
+            if not any(event_overlaps(event, start, end) for start, end, _ in parts[:i])
+        ]
+    if attendees:
+        # One contact lookup for every address in the batch
+        enrich([event for events in events_by_calendar.values() for event in events])
+
+    results = []
+    for query in queries:
+        fetch_start, fetch_end = query["fetch"]
+        events = sorted(
+            (event for name in dict.fromkeys(query["calendars"])
+             for event in events_by_calendar.get(name, [])
+             if event_overlaps(event, fetch_start, fetch_end)),
+            key=event_start_local,
+        )
+        start, end = query["start"], query["end"]
+        if query["mode"] == "availability":
+            result = availability(
+                events,
+                start.date(),
+                end.date(),
+                work_start=parse_time(query.get("work_start", "09:00")),
+                work_end=parse_time(query.get("work_end", "17:00")),
+                weekdays_only=bool(query.get("weekdays_only")),
+            )
+        elif query["mode"] == "classify":
+            result = classify(events, start.date(), end.date())
+        else:
+            result = events
+        summary = {"name": query["name"]} if "name" in query else {}
+        summary.update({"mode": query["mode"], "calendars": query["calendars"],
+                        "start": start.isoformat(), "end": end.isoformat(), "result": result})
+        results.append(summary)
+    return results
+
+
+def batch_queries(args) -> list[dict]:
+    """The --batch and --query queries, normalized, in order. Raises ValueError on a bad spec."""
+    specs = []
+    if args.batch:
+        specs.extend(read_batch(args.batch))
+    for calendars, start, end in args.queries or []:
+        specs.append({"calendars": calendars, "start": start, "end": end})
+
+    def all_calendars() -> list[str]:
+        if args.offline:
+            return list(EventStore().calendars().keys())
+        return list(discover_calendars(get_client()).keys())
+
+    return [batch_query(spec, all_calendars) for spec in specs]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch calendar events from Fastmail")
+    add_fetch_arguments(parser)
     parser.add_argument("--list", action="store_true", help="List available calendars")
+    parser.add_argument("--stream", action="store_true",
+                        help="Emit events as NDJSON, one window at a time")
+    parser.add_argument("--window", choices=["day", "week"], default="week",
+                        help="Window size for --stream (default: week)")
+    parser.add_argument("--attendees", action="store_true",
+                        help="Include organizer and attendees, with names and organizations "
+                             "from the local contact index")
+    parser.add_argument("--batch", metavar="FILE",
+                        help="Answer many queries with one fetch per calendar: a JSON list of "
+                             "{name, mode, calendars, start, end}, from FILE or - for stdin")
+    parser.add_argument("--query", nargs=3, action="append", dest="queries",
+                        metavar=("CALENDARS", "START", "END"),
+                        help="Add an events query to the batch (CALENDARS comma-separated, "
+                             "or all). Can specify multiple.")
+
+    subparsers = parser.add_subparsers(dest="command")
+
+    availability_parser = subparsers.add_parser(
+        "availability", help="Meeting hours, longest free block and fragmentation per day")
+    add_fetch_arguments(availability_parser)
+    availability_parser.add_argument("--work-start", default="09:00", help="Work day start, HH:MM (default: 09:00)")
+    availability_parser.add_argument("--work-end", default="17:00", help="Work day end, HH:MM (default: 17:00)")
+    availability_parser.add_argument("--weekdays-only", action="store_true", help="Skip Saturdays and Sundays")
+
+    classify_parser = subparsers.add_parser(
+        "classify", help="Day types and week shape for every week in the range")
+    add_fetch_arguments(classify_parser)
 
     args = parser.parse_args()
 
+    if args.command == "availability":
+        run_availability(args)
+        return
+
+    if args.command == "classify":
+        run_classify(args)
+        return
+
     if args.list:
-        list_calendars()
+        list_calendars(refresh=args.refresh)
+        return
+
+    if args.batch or args.queries:
+        if args.refresh and not args.offline:
+            discover_calendars(get_client(), refresh=True)
+        try:
+            queries = batch_queries(args)
+        except (OSError, ValueError) as e:
+            parser.error(f"--batch: {e}")
+        results = fetch_batch(queries, use_store=not args.no_cache, offline=args.offline,
+                              max_workers=args.workers, expand=args.expand,
+                              parse_workers=args.parse_workers, attendees=args.attendees)
+        print(json.dumps(results, indent=2))
         return
 
     start = parse_date(args.start)
     end = parse_date(args.end)
 
-    if args.all:
-        client = get_client()
-        calendars = list(discover_calendars(client).keys())
-    elif args.calendars:
-        calendars = args.calendars
-    else:
-        calendars = ["work", "personal"]  # Default
+    if args.refresh and not args.offline:
+        discover_calendars(get_client(), refresh=True)
+
+    calendars = select_calendars(args, ["work", "personal"])  # Default
 
-    events = fetch_events(calendars, start, end)
+    if args.stream:
+        for event in stream_events(calendars, start, end, window=args.window,
+                                   use_store=not args.no_cache, offline=args.offline,
+                                   max_workers=args.workers, expand=args.expand,
+                                   attendees=args.attendees):
+            print(json.dumps(event), flush=True)
+        return
+
+    events = fetch_for_args(args, calendars, start, end, attendees=args.attendees)
     print(json.dumps(events, indent=2))
 
 
 if __name__ == "__main__":
-    main()
+    if sys.argv[1:] == ["--serve"]:
+        resident.serve(SOCKET_PATH, main, before_request=begin_request)
+    else:
+        main()
@@ -0,0 +1,71 @@
+"""
+Local recurrence expansion for fetch-events.py.
+
+Expands RRULE/RDATE/EXDATE and RECURRENCE-ID overrides client-side, so the
+server sends each recurring series once instead of one VCALENDAR per
+occurrence. Expansions are memoized per master UID and range, keyed on a
+digest of the object so an edited series is never served stale.
+"""
+
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Iterator
+
+import recurring_ical_events
+from icalendar import Calendar
+
+# Number of (UID, range) expansions kept in memory
+MEMO_SIZE = 2048
+
+_UID_RE = re.compile(r"^UID:(.*?)\r?$", re.MULTILINE)
+
+_memo: OrderedDict = OrderedDict()
+_memo_lock = threading.Lock()
+
+
+def expand_between(ical: Calendar, start: datetime, end: datetime) -> list:
+    """Return the VEVENT occurrences of a parsed calendar object that overlap [start, end)."""
+    return recurring_ical_events.of(ical).between(start, end)
+
+
+def occurrences_after(data: str, start: datetime) -> Iterator:
+    """
+    Lazily yield the VEVENT occurrences of a raw calendar object that end after start, in start order.
+
+    Nothing is expanded until it is asked for, so callers can walk a long range
+    one window at a time without holding the whole expansion.
+    """
+    if isinstance(data, bytes):
+        data = data.decode("utf-8")
+    return recurring_ical_events.of(Calendar.from_ical(data)).after(start)
+
+
+def expand_object(data: str, start: datetime, end: datetime) -> list:
+    """
+    Return the VEVENT occurrences of a raw calendar object that overlap [start, end).
+
+    The object is only parsed and expanded the first time a given version of a
+    series is asked for a given range.
+    """
+    if isinstance(data, bytes):
+        data = data.decode("utf-8")
+    match = _UID_RE.search(data)
+    uid = match.group(1) if match else None
+    digest = hashlib.sha1(data.encode("utf-8")).hexdigest()
+    key = (uid, digest, start, end)
+
+    with _memo_lock:
+        if key in _memo:
+            _memo.move_to_end(key)
+            return _memo[key]
+
+    components = expand_between(Calendar.from_ical(data), start, end)
+
+    with _memo_lock:
+        _memo[key] = components
+        if len(_memo) > MEMO_SIZE:
+            _memo.popitem(last=False)
+    return components
@@ -0,0 +1,51 @@
+"""Tests for availability.py (run with: python -m pytest tools/calendar)."""
+
+import sys
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from availability import availability, merge_intervals  # noqa: E402
+
+
+def _meeting(start: str, end: str) -> dict:
+    return {"calendar": "Work", "title": "meeting", "start": start, "end": end, "all_day": False}
+
+
+def test_merge_intervals_joins_overlapping_and_touching():
+    assert merge_intervals([(3, 4), (1, 2), (2, 3), (6, 8), (7, 7)]) == [(1, 4), (6, 8)]
+
+
+def test_overlapping_meetings_count_once():
+    events = [
+        _meeting("2026-10-19T10:00:00", "2026-10-19T11:00:00"),
+        _meeting("2026-10-19T10:30:00", "2026-10-19T12:00:00"),
+        _meeting("2026-10-19T14:00:00", "2026-10-19T15:00:00"),
+    ]
+    (day,) = availability(events, date(2026, 10, 19), date(2026, 10, 20))
+
+    assert day["meeting_hours"] == 3.0
+    assert day["available_hours"] == 5.0
+    assert day["gap_count"] == 3
+    assert day["longest_block"] == 2.0
+    assert day["has_protected_block"]
+
+
+def test_all_day_events_are_not_busy():
+    events = [{"calendar": "Work", "title": "Conference", "start": "2026-10-19",
+               "end": "2026-10-21", "all_day": True}]
+    days = availability(events, date(2026, 10, 19), date(2026, 10, 21))
+
+    assert [day["available_hours"] for day in days] == [8.0, 8.0]
+
+
+def test_weekdays_only_skips_weekends():
+    events = [
+        _meeting("2026-10-24T10:00:00", "2026-10-24T12:00:00"),  # Saturday
+        _meeting("2026-10-26T09:00:00", "2026-10-26T10:00:00"),  # Monday
+    ]
+    days = availability(events, date(2026, 10, 23), date(2026, 10, 27), weekdays_only=True)
+
+    assert [day["date"] for day in days] == ["2026-10-23", "2026-10-26"]
+    assert [day["meeting_hours"] for day in days] == [0.0, 1.0]
@@ -0,0 +1,66 @@
+"""Tests for classify.py (run with: python -m pytest tools/calendar)."""
+
+import sys
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from classify import classify  # noqa: E402
+
+MONDAY = date(2026, 10, 19)
+
+
+def _all_day(title: str, start: str, end: str) -> dict:
+    return {"calendar": "Work", "title": title, "start": start, "end": end, "all_day": True}
+
+
+def _meeting(start: str, end: str) -> dict:
+    return {"calendar": "Work", "title": "meeting", "start": start, "end": end, "all_day": False}
+
+
+def _day_types(events: list[dict]) -> dict:
+    (week,) = classify(events, MONDAY, MONDAY)
+    return {day["date"]: day["type"] for day in week["days"]}
+
+
+def test_multi_day_all_day_event_covers_every_day():
+    (week,) = classify([_all_day("Vacation", "2026-10-20", "2026-10-23")], MONDAY, MONDAY)
+    types = {day["date"]: day["type"] for day in week["days"]}
+
+    assert [types[f"2026-10-{d}"] for d in range(19, 24)] == [
+        "work_day_light", "leave", "leave", "leave", "work_day_light"
+    ]
+    assert week["shape"] == "vacation"
+
+
+@pytest.mark.parametrize("title, expected", [
+    ("Team off-site", "off_site"),
+    ("Offsite planning", "off_site"),
+    ("Day off", "leave"),
+    ("Paternity leave", "parental_leave"),
+    ("Statutory holiday", "holiday"),
+])
+def test_all_day_titles(title, expected):
+    types = _day_types([_all_day(title, "2026-10-19", "2026-10-20")])
+
+    assert types["2026-10-19"] == expected
+
+
+def test_weekend_wins_over_all_day_events():
+    types = _day_types([_all_day("Team off-site", "2026-10-24", "2026-10-26")])
+
+    assert types["2026-10-24"] == types["2026-10-25"] == "weekend"
+
+
+def test_overlapping_meetings_count_once():
+    events = [
+        _meeting("2026-10-19T09:00:00", "2026-10-19T11:00:00"),
+        _meeting("2026-10-19T10:00:00", "2026-10-19T12:00:00"),
+    ]
+    (week,) = classify(events, MONDAY, MONDAY)
+
+    assert week["days"][0] == {"date": "2026-10-19", "type": "work_day", "confidence": "medium",
+                               "meeting_hours": 3.0}
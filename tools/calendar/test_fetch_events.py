@@ -0,0 +1,143 @@
+"""Tests for fetch-events.py (run with: python -m pytest tools/calendar)."""
+
+import importlib
+import importlib.util
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE))
+sys.path.insert(0, str(HERE.parent / "shared"))
+
+import dav_transport  # noqa: E402
+
+
+def _load_fetch_events():
+    """Import the hyphenated tool script as a module."""
+    spec = importlib.util.spec_from_file_location("fetch_events", HERE / "fetch-events.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def fetch_events(monkeypatch):
+    monkeypatch.setenv("FASTMAIL_USERNAME", "test@example.com")
+    monkeypatch.setenv("FASTMAIL_CALDAV_PASSWORD", "secret")
+    return _load_fetch_events()
+
+
+def test_client_session_uses_shared_transport(fetch_events):
+    session = fetch_events.get_client().session
+    library = type(session).__module__.partition(".")[0]
+
+    for scheme in ("https://", "http://"):
+        adapter = session.get_adapter(f"{scheme}caldav.example.com/")
+        # dav_transport's adapter, built on the session's own library (niquests, or requests)
+        assert type(adapter).__module__ == dav_transport.__name__
+        assert isinstance(adapter, importlib.import_module(f"{library}.adapters").HTTPAdapter)
+        assert adapter.max_retries.total == dav_transport.RETRIES
+        assert adapter.max_retries.allowed_methods == dav_transport.READ_METHODS
+    assert session.headers["Accept-Encoding"] == "gzip, deflate"
+
+
+def test_client_session_applies_default_timeout(fetch_events, monkeypatch):
+    session = fetch_events.get_client().session
+    adapter = session.get_adapter("https://caldav.example.com/")
+    base = type(adapter).__mro__[1]
+    sent = {}
+    monkeypatch.setattr(base, "send", lambda self, request, **kwargs: sent.update(kwargs))
+
+    adapter.send(object(), timeout=None)
+    assert sent["timeout"] == dav_transport.TIMEOUT
+
+    adapter.send(object(), timeout=5)
+    assert sent["timeout"] == 5
+
+
+def _vcalendar(uid: str, tzid: str, start: str, end: str, rrule: str = "") -> str:
+    return (
+        "BEGIN:VCALENDAR\r\nVERSION:2.0\r\nBEGIN:VEVENT\r\n"
+        f"UID:{uid}\r\nSUMMARY:{uid}\r\n"
+        f"DTSTART;TZID={tzid}:{start}\r\nDTEND;TZID={tzid}:{end}\r\n"
+        + (f"RRULE:{rrule}\r\n" if rrule else "")
+        + "END:VEVENT\r\nEND:VCALENDAR\r\n"
+    )
+
+
+@pytest.fixture
+def mixed_offsets(fetch_events, monkeypatch, tmp_path):
+    """A stored calendar whose events carry different UTC offsets, read in UTC."""
+    monkeypatch.setenv("TZ", "UTC")
+    time.tzset()
+    from event_store import EventStore, object_bounds
+
+    store = EventStore(tmp_path / "events.db")
+    url = "https://caldav.example.com/work/"
+    objects = [
+        _vcalendar("new-york-noon", "America/New_York", "20261019T120000", "20261019T123000"),
+        _vcalendar("berlin-lunch", "Europe/Berlin", "20261019T123000", "20261019T130000"),
+        _vcalendar("new-york-evening", "America/New_York", "20261019T203000", "20261019T210000"),
+        _vcalendar("berlin-after-midnight", "Europe/Berlin", "20261020T003000", "20261020T010000"),
+        _vcalendar("berlin-daily", "Europe/Berlin", "20261001T090000", "20261001T091500", "FREQ=DAILY"),
+    ]
+    with store._connect() as conn:
+        conn.executemany(
+            "INSERT INTO objects (calendar_url, href, etag, data, range_start, range_end)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            [(url, f"{url}{i}.ics", None, data, *object_bounds(data)) for i, data in enumerate(objects)],
+        )
+    store._save_calendar(url, "Work", None, None)
+    monkeypatch.setattr(fetch_events, "EventStore", lambda: store)
+    yield fetch_events
+    monkeypatch.undo()
+    time.tzset()
+
+
+# In UTC instants; string order would put New York's noon (16:00Z) before Berlin's lunch (10:30Z)
+MIXED_OFFSETS_ORDER = [
+    ("berlin-daily", "2026-10-19T09:00:00+02:00"),
+    ("berlin-lunch", "2026-10-19T12:30:00+02:00"),
+    ("new-york-noon", "2026-10-19T12:00:00-04:00"),
+    ("berlin-after-midnight", "2026-10-20T00:30:00+02:00"),
+    ("new-york-evening", "2026-10-19T20:30:00-04:00"),
+    ("berlin-daily", "2026-10-20T09:00:00+02:00"),
+]
+
+
+@pytest.mark.parametrize("window", ["day", "week"])
+def test_stream_orders_mixed_offsets_across_windows(mixed_offsets, window):
+    start, end = datetime(2026, 10, 19), datetime(2026, 10, 21)
+    streamed = list(mixed_offsets.stream_events(["Work"], start, end, window=window, offline=True))
+
+    assert [(event["title"], event["start"]) for event in streamed] == MIXED_OFFSETS_ORDER
+
+
+def test_fetch_orders_mixed_offsets(mixed_offsets):
+    start, end = datetime(2026, 10, 19), datetime(2026, 10, 21)
+    events = mixed_offsets.fetch_events(["Work"], start, end, offline=True)
+
+    assert [(event["title"], event["start"]) for event in events] == MIXED_OFFSETS_ORDER
+
+
+DURATION_EVENT = (
+    "BEGIN:VCALENDAR\r\nVERSION:2.0\r\nBEGIN:VEVENT\r\nUID:standup\r\nSUMMARY:standup\r\n"
+    "DTSTART:20261019T100000Z\r\nDURATION:PT1H\r\nEND:VEVENT\r\nEND:VCALENDAR\r\n"
+)
+
+
+@pytest.mark.parametrize("fast", [True, False], ids=["fast", "icalendar"])
+@pytest.mark.parametrize("expand", ["local", "server"])
+def test_duration_sets_end_on_every_path(expand, fast, monkeypatch):
+    import vevent
+
+    if not fast:
+        monkeypatch.setattr(vevent, "fast_vevents", lambda data: None)
+    start, end = datetime(2026, 10, 18), datetime(2026, 10, 22)
+    events = vevent.object_events(DURATION_EVENT, "Work", start, end, expand=expand)
+
+    assert [event["end"] for event in events] == ["2026-10-19T11:00:00+00:00"]
@@ -0,0 +1,345 @@
+"""
+VEVENT extraction for fetch-events.py.
+
+Turns raw CalDAV payloads into Clerk's event dicts. Most objects are plain,
+single events, so instead of building a full icalendar tree for each one a
+fast path scans the text for the few properties Clerk reads (DTSTART, DTEND,
+DURATION, SUMMARY, LOCATION, ORGANIZER, ATTENDEE) and decodes dates with icalendar's own value
+parsers, so DATE vs DATE-TIME and TZID handling match get_datetime(). Anything
+unusual (unknown TZIDs, malformed lines, recurrence that needs expanding)
+falls back to the full icalendar parse.
+
+parse_objects() can spread the work over a process pool for very large ranges.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Iterator, Optional
+
+from icalendar import Calendar, vDDDTypes, vDuration
+
+from recurrence import expand_object, occurrences_after
+
+# Below this many objects a process pool costs more than it saves
+PARALLEL_THRESHOLD = 500
+
+RECURRENCE_PROPS = {"RRULE", "RDATE", "EXDATE", "RECURRENCE-ID"}
+
+
+def address(value, params) -> dict:
+    """An ORGANIZER/ATTENDEE as {email, name, status}; params are the property's parameters."""
+    value = str(value).strip()
+    if value[:7].lower() == "mailto:":
+        value = value[7:]
+    return {
+        "email": value,
+        "name": params.get("CN") or None,
+        "status": params.get("PARTSTAT") or None,
+    }
+
+
+def _people(component) -> tuple[Optional[dict], list[dict]]:
+    """(organizer, attendees) of a parsed icalendar VEVENT."""
+    organizer = component.get("organizer")
+    attendees = component.get("attendee") or []
+    if not isinstance(attendees, list):
+        attendees = [attendees]
+    return (
+        address(organizer, organizer.params) if organizer else None,
+        [address(attendee, attendee.params) for attendee in attendees],
+    )
+
+
+def _with_people(event: dict, organizer: Optional[dict], attendees: list[dict]) -> dict:
+    # Copies, so callers can annotate them without touching cached records
+    event["organizer"] = dict(organizer) if organizer else None
+    event["attendees"] = [dict(attendee) for attendee in attendees]
+    return event
+
+
+def get_datetime(dt_prop) -> tuple[datetime, bool]:
+    """Extract datetime from icalendar property, handling DATE vs DATE-TIME."""
+    dt = dt_prop.dt if hasattr(dt_prop, "dt") else dt_prop
+    is_all_day = not isinstance(dt, datetime)
+    if is_all_day:
+        dt = datetime.combine(dt, datetime.min.time())
+    return dt, is_all_day
+
+
+def event_to_dict(component, cal_name: str, people: bool = False) -> Optional[dict]:
+    """
+    Convert a VEVENT component into Clerk's event dict (None if it has no start).
+
+    The end follows record_end(), like the fast path. people=True adds the
+    organizer and attendees.
+    """
+    record = component_record(component)
+    if record["dtstart"] is None:
+        return None
+    return _record_to_dict(record, cal_name, record_end(record), people)
+
+
+def _split_property(line: str) -> tuple[str, dict, str]:
+    """Split a content line into (NAME, {PARAM: value}, value), honouring quoted params."""
+    in_quotes = False
+    parts, current = [], []
+    for i, char in enumerate(line):
+        if char == '"':
+            in_quotes = not in_quotes
+        elif not in_quotes and char in ";:":
+            parts.append("".join(current))
+            current = []
+            if char == ":":
+                value = line[i + 1:]
+                break
+            continue
+        current.append(char)
+    else:
+        raise ValueError(f"Malformed content line: {line[:40]!r}")
+
+    name, params = parts[0].upper(), {}
+    for param in parts[1:]:
+        key, _, param_value = param.partition("=")
+        params[key.upper()] = param_value.strip('"')
+    return name, params, value
+
+
+def _unescape_text(value: str) -> str:
+    """Undo RFC 5545 TEXT escaping (same order as icalendar's parser)."""
+    return (value.replace("\\N", "\\n")
+                 .replace("\\n", "\n")
+                 .replace("\\,", ",")
+                 .replace("\\;", ";")
+                 .replace("\\\\", "\\"))
+
+
+def _decode_date(params: dict, value: str):
+    """Decode a DTSTART/DTEND value. Raises ValueError when the TZID can't be resolved."""
+    tzid = params.get("TZID")
+    decoded = vDDDTypes.from_ical(value, timezone=tzid) if tzid else vDDDTypes.from_ical(value)
+    if tzid and isinstance(decoded, datetime) and decoded.tzinfo is None:
+        # Custom VTIMEZONE definitions need the full parser
+        raise ValueError(f"Unknown TZID {tzid}")
+    return decoded
+
+
+def fast_vevents(data) -> Optional[list[dict]]:
+    """
+    Extract the fields Clerk needs from every VEVENT in a payload.
+
+    Returns a list of records with dtstart, dtend, duration, summary, location,
+    organizer, attendees and recurring, or None when the payload needs the full icalendar parser.
+    """
+    try:
+        if isinstance(data, bytes):
+            data = data.decode("utf-8")
+        # Unfold continuation lines (RFC 5545 3.1)
+        text = data.replace("\r\n", "\n").replace("\n ", "").replace("\n\t", "")
+
+        records = []
+        record = None
+        nested = 0
+        for line in text.split("\n"):
+            if not line:
+                continue
+            upper = line.upper()
+            if upper == "BEGIN:VEVENT":
+                if record is not None:
+                    return None
+                record = {"dtstart": None, "dtend": None, "duration": None,
+                          "summary": "", "location": None, "recurring": False,
+                          "organizer": None, "attendees": []}
+                continue
+            if record is None:
+                continue
+            if upper.startswith("BEGIN:"):
+                nested += 1  # VALARM and friends: nothing Clerk reads
+                continue
+            if upper.startswith("END:"):
+                if nested:
+                    nested -= 1
+                elif upper == "END:VEVENT":
+                    records.append(record)
+                    record = None
+                else:
+                    return None
+                continue
+            if nested:
+                continue
+
+            name, params, value = _split_property(line)
+            if name == "DTSTART":
+                record["dtstart"] = _decode_date(params, value)
+            elif name == "DTEND":
+                record["dtend"] = _decode_date(params, value)
+            elif name == "DURATION":
+                record["duration"] = vDuration.from_ical(value)
+            elif name == "SUMMARY":
+                record["summary"] = _unescape_text(value)
+            elif name == "LOCATION":
+                location = _unescape_text(value)
+                record["location"] = location or None
+            elif name == "ORGANIZER":
+                record["organizer"] = address(value, params)
+            elif name == "ATTENDEE":
+                record["attendees"].append(address(value, params))
+            elif name in RECURRENCE_PROPS:
+                record["recurring"] = True
+
+        if record is not None or nested:
+            return None
+        return records
+    except Exception:
+        return None
+
+
+def component_record(component) -> dict:
+    """Build a fast_vevents()-style record from a parsed icalendar VEVENT."""
+    dtstart, dtend, duration = component.get("dtstart"), component.get("dtend"), component.get("duration")
+    organizer, attendees = _people(component)
+    return {
+        "dtstart": dtstart.dt if dtstart else None,
+        "dtend": dtend.dt if dtend else None,
+        "duration": duration.dt if duration else None,
+        "summary": str(component.get("summary", "")),
+        "location": str(component.get("location", "")) if component.get("location") else None,
+        "recurring": any(component.get(prop) for prop in RECURRENCE_PROPS),
+        "organizer": organizer,
+        "attendees": attendees,
+    }
+
+
+def vevent_records(data) -> list[dict]:
+    """Return a record per VEVENT, using the fast path when the payload allows it."""
+    records = fast_vevents(data)
+    if records is None:
+        records = [component_record(c) for c in Calendar.from_ical(data).walk("VEVENT")]
+    return records
+
+
+def is_series(data) -> bool:
+    """Whether an object needs recurrence expansion (or the full parser) rather than the fast path."""
+    records = fast_vevents(data)
+    return records is None or any(r["recurring"] for r in records)
+
+
+def record_end(record: dict):
+    """Effective end of a record: DTEND, else DTSTART + DURATION, else a zero/one-day event."""
+    if record["dtend"] is not None:
+        return record["dtend"]
+    if record["duration"] is not None:
+        return record["dtstart"] + record["duration"]
+    if isinstance(record["dtstart"], datetime):
+        return record["dtstart"]
+    return record["dtstart"] + timedelta(days=1)
+
+
+def _local(value) -> datetime:
+    """Naive local datetime for comparisons with parse_date() values."""
+    value, _ = get_datetime(value)
+    if value.tzinfo:
+        value = value.astimezone().replace(tzinfo=None)
+    return value
+
+
+def _record_to_dict(record: dict, cal_name: str, end, people: bool = False) -> dict:
+    start_dt, is_all_day = get_datetime(record["dtstart"])
+    end_dt = get_datetime(end)[0] if end is not None else None
+    event = {
+        "calendar": cal_name,
+        "title": record["summary"],
+        "start": start_dt.isoformat(),
+        "end": end_dt.isoformat() if end_dt else None,
+        "all_day": is_all_day,
+        "location": record["location"],
+    }
+    if people:
+        return _with_people(event, record["organizer"], record["attendees"])
+    return event
+
+
+def object_events(
+    data,
+    cal_name: str,
+    start: datetime,
+    end: datetime,
+    expand: str = "local",
+    people: bool = False,
+) -> list[dict]:
+    """
+    Turn one calendar object into event dicts.
+
+    expand="local" returns the occurrences overlapping [start, end), expanding
+    recurring series; expand="server" treats the object as already expanded
+    (one occurrence per object) and returns its VEVENTs as-is. people=True
+    adds each event's organizer and attendees.
+    """
+    records = fast_vevents(data)
+
+    if expand == "server":
+        if records is None:
+            return [e for e in (event_to_dict(c, cal_name, people) for c in Calendar.from_ical(data).walk("VEVENT"))
+                    if e]
+        return [_record_to_dict(r, cal_name, record_end(r), people) for r in records if r["dtstart"] is not None]
+
+    if records is None or any(r["recurring"] for r in records):
+        return [e for e in (event_to_dict(c, cal_name, people) for c in expand_object(data, start, end)) if e]
+
+    events = []
+    for record in records:
+        if record["dtstart"] is None:
+            continue
+        event_end = record_end(record)
+        local_start, local_end = _local(record["dtstart"]), _local(event_end)
+        # Same overlap rule as the recurrence expansion: zero-length events count at their start
+        if local_start < end and (local_end > start or (local_start == local_end and local_start >= start)):
+            events.append(_record_to_dict(record, cal_name, event_end, people))
+    return events
+
+
+def series_events(data, cal_name: str, start: datetime, people: bool = False) -> Iterator[dict]:
+    """Event dicts for the occurrences of an object that end after start, in start order, expanded lazily."""
+    for component in occurrences_after(data, start):
+        event = event_to_dict(component, cal_name, people)
+        if event:
+            yield event
+
+
+def _parse_chunk(args) -> list[dict]:
+    objects, cal_name, start, end, expand, people = args
+    events = []
+    for data in objects:
+        try:
+            events.extend(object_events(data, cal_name, start, end, expand, people))
+        except Exception:
+            # Skip problematic events
+            pass
+    return events
+
+
+def parse_objects(
+    objects: list,
+    cal_name: str,
+    start: datetime,
+    end: datetime,
+    expand: str = "local",
+    workers: int = 0,
+    people: bool = False,
+) -> list[dict]:
+    """
+    Turn many calendar objects into event dicts, skipping ones that fail to parse.
+
+    With workers > 1 and enough objects, parsing is spread over a process pool.
+    people=True adds each event's organizer and attendees.
+    """
+    if workers <= 1 or len(objects) < PARALLEL_THRESHOLD:
+        return _parse_chunk((objects, cal_name, start, end, expand, people))
+
+    size = -(-len(objects) // (workers * 4))
+    chunks = [(objects[i:i + size], cal_name, start, end, expand, people)
+              for i in range(0, len(objects), size)]
+    events = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for chunk_events in pool.map(_parse_chunk, chunks):
+            events.extend(chunk_events)
+    return events
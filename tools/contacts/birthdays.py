@@ -0,0 +1,129 @@
+"""
+Birthday index for fetch-contacts.py.
+
+Birthdays are normalized once, when a card is stored, to a day of the year on
+a leap-year calendar (Jan 1 = 1, Feb 29 = 60, Dec 31 = 366), so every
+birthday, including Feb 29 and year-less vCard values like "--05-17", gets
+one fixed slot. The index keeps contacts sorted by that slot and answers any
+date window with a bisect per calendar year it covers:
+
+    upcoming(today, 30)              next 30 days, soonest first
+    between(date(2026, 12, 20),      any window, even across New Year
+            date(2027, 1, 10))
+
+In years without Feb 29, those birthdays fall on Feb 28.
+"""
+
+import re
+from bisect import bisect_left, bisect_right
+from datetime import date, timedelta
+from typing import Optional
+
+# Leap year used to place month/day pairs on one calendar
+_LEAP_YEAR = 2000
+
+_BIRTHDAY_RE = re.compile(
+    r"^(?:(?P<year>\d{4})-?|--)(?P<month>\d{2})-?(?P<day>\d{2})(?:$|T)"
+    r"|^(?P<bare_month>\d{2})-(?P<bare_day>\d{2})$"
+)
+
+
+def parse_birthday(value: str) -> Optional[tuple[Optional[int], int, int]]:
+    """
+    Parse a vCard BDAY into (year or None, month, day).
+
+    Accepts 1990-05-17, 19900517, --05-17, --0517 and 05-17, with or without
+    a time part. Returns None for anything else, or for a month/day that never
+    exists; the year isn't checked, so a mistyped 1990-02-29 still counts as Feb 29.
+    """
+    match = _BIRTHDAY_RE.match((value or "").strip())
+    if not match:
+        return None
+    year = int(match["year"]) if match["year"] else None
+    month = int(match["month"] or match["bare_month"])
+    day = int(match["day"] or match["bare_day"])
+    try:
+        date(_LEAP_YEAR, month, day)
+    except ValueError:
+        return None
+    return year, month, day
+
+
+def day_of_year(month: int, day: int) -> int:
+    """Slot of a month/day on the leap-year calendar (1-366)."""
+    return date(_LEAP_YEAR, month, day).timetuple().tm_yday
+
+
+def birthday_day(value: str) -> Optional[int]:
+    """day_of_year() of a vCard BDAY, or None when it doesn't parse."""
+    parsed = parse_birthday(value)
+    return day_of_year(parsed[1], parsed[2]) if parsed else None
+
+
+def _is_leap(year: int) -> bool:
+    return year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+
+
+def _occurrence(year: int, slot: int) -> date:
+    """Date a birthday slot falls on in a given year."""
+    yday = slot - 1 if slot >= 60 and not _is_leap(year) else slot
+    return date(year, 1, 1) + timedelta(days=yday - 1)
+
+
+def _slot(when: date, end: bool = False) -> int:
+    """Slot of a date; a window ending on Feb 28 of a common year also takes in Feb 29."""
+    slot = day_of_year(when.month, when.day)
+    if end and slot == 59 and not _is_leap(when.year):
+        return 60
+    return slot
+
+
+class BirthdayIndex:
+    """Contacts sorted by birthday slot, for date-window queries."""
+
+    def __init__(self, entries: list[tuple[int, dict]]):
+        """entries are (day_of_year, contact) pairs, already sorted by day (then name)."""
+        self.days = [day for day, _ in entries]
+        self.contacts = [contact for _, contact in entries]
+
+    @classmethod
+    def from_contacts(cls, contacts: list[dict]) -> "BirthdayIndex":
+        entries = []
+        for contact in contacts:
+            day = birthday_day(contact.get("birthday") or "")
+            if day is not None:
+                entries.append((day, contact))
+        entries.sort(key=lambda entry: (entry[0], (entry[1].get("name") or "").lower()))
+        return cls(entries)
+
+    def between(self, start: date, end: date, today: Optional[date] = None) -> list[dict]:
+        """
+        Contacts whose birthday falls between start and end (both inclusive), in
+        date order, each with next_birthday and days_until_birthday (from today)
+        added. A window longer than a year lists a contact once per occurrence.
+        """
+        today = today or date.today()
+        results = []
+        for year in range(start.year, end.year + 1):
+            first = max(start, date(year, 1, 1))
+            last = min(end, date(year, 12, 31))
+            lo = bisect_left(self.days, _slot(first))
+            hi = bisect_right(self.days, _slot(last, end=True))
+            for i in range(lo, hi):
+                when = _occurrence(year, self.days[i])
+                results.append({
+                    **self.contacts[i],
+                    "days_until_birthday": (when - today).days,
+                    "next_birthday": when.isoformat(),
+                })
+        return results
+
+    def upcoming(self, today: date, days: int) -> list[dict]:
+        """Birthdays from today through today + days, soonest first, each contact at most once."""
+        # Every birthday comes round within a year, so that is as far as it needs to look
+        try:
+            year_later = today.replace(year=today.year + 1)
+        except ValueError:
+            year_later = date(today.year + 1, 3, 1)
+        end = min(today + timedelta(days=days), year_later - timedelta(days=1))
+        return self.between(today, end, today=today)
@@ -0,0 +1,183 @@
+"""
+Ranked, typo-tolerant contact search for fetch-contacts.py.
+
+Builds an in-memory index over parsed contacts: every word of the name,
+email addresses and organization, plus phone numbers as bare digits. Each
+distinct word is indexed by its trigrams, and the vocabulary is kept sorted
+for prefix lookups, so a query word only ever touches the handful of words
+that could match it:
+
+    exact word          "adam"      -> Adam Bernard
+    prefix              "ber"       -> Bernard
+    typo (edit distance, found through shared trigrams)
+                        "bernadr"   -> Bernard
+    email               "adam.bernard26@example.com"
+    phone digits        "585 7441"  -> +1 670 585 7441
+
+Accents and case are ignored. Results are ranked by how well every query
+word matched, weighted by the field it matched in.
+"""
+
+import re
+import unicodedata
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from heapq import nsmallest
+from typing import Optional
+
+# Contacts scoring below this are not returned
+MIN_SCORE = 0.5
+
+# How much a match counts, by the field it was found in
+FIELD_WEIGHTS = {
+    "name": 1.0,
+    "email": 0.9,
+    "phone": 0.9,
+    "organization": 0.6,
+}
+
+# Shortest digit run treated as a phone number lookup
+MIN_PHONE_DIGITS = 4
+
+_WORD_RE = re.compile(r"[^\W_]+")
+_NON_DIGIT_RE = re.compile(r"\D")
+_LETTER_RE = re.compile(r"[^\W\d_]")
+
+
+def normalize(text: str) -> str:
+    """Casefold and strip accents ("Chloé" -> "chloe")."""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+def words(text: str) -> list[str]:
+    return _WORD_RE.findall(normalize(text))
+
+
+def trigrams(word: str) -> set[str]:
+    padded = f"${word}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance (a swap counts once), or limit + 1 when larger."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class ContactIndex:
+    """Search index over a list of contact dicts (as returned by parse_vcard)."""
+
+    def __init__(self, contacts: list[dict]):
+        self.contacts = contacts
+        # word -> [(contact id, field)]
+        self.postings: dict[str, list[tuple[int, str]]] = defaultdict(list)
+        self.emails: dict[str, list[int]] = defaultdict(list)
+        self.phones: list[tuple[str, int]] = []
+
+        for i, contact in enumerate(contacts):
+            seen = set()
+            fields = [("name", contact.get("name") or ""), ("organization", contact.get("organization") or "")]
+            for email in contact.get("emails") or []:
+                fields.append(("email", email))
+                self.emails[normalize(email.strip())].append(i)
+            for field, text in fields:
+                for word in words(text):
+                    if (word, field) not in seen:
+                        seen.add((word, field))
+                        self.postings[word].append((i, field))
+            for phone in contact.get("phones") or []:
+                digits = _NON_DIGIT_RE.sub("", phone)
+                if digits:
+                    self.phones.append((digits, i))
+
+        self.vocabulary = sorted(self.postings)
+        self._matches: dict[str, dict[str, float]] = {}
+        self.by_trigram: dict[str, set[str]] = defaultdict(set)
+        for word in self.vocabulary:
+            for gram in trigrams(word):
+                self.by_trigram[gram].add(word)
+
+    def _word_matches(self, query_word: str) -> dict[str, float]:
+        """Score every indexed word that matches one query word."""
+        if query_word in self._matches:
+            return self._matches[query_word]
+        matches = self._matches[query_word] = {}
+        if query_word in self.postings:
+            matches[query_word] = 1.0
+
+        # Prefixes: the sorted vocabulary puts them in one contiguous run
+        i = bisect_left(self.vocabulary, query_word)
+        while i < len(self.vocabulary) and self.vocabulary[i].startswith(query_word):
+            word = self.vocabulary[i]
+            if word != query_word:
+                matches[word] = 0.7 + 0.2 * len(query_word) / len(word)
+            i += 1
+
+        # Typos: each edit destroys at most three trigrams, so a word within the
+        # edit budget shares at least len(grams) - 3 * limit of them with the query
+        if len(query_word) >= 3:
+            limit = 1 if len(query_word) < 7 else 2
+            grams = trigrams(query_word)
+            shared = Counter()
+            for gram in grams:
+                shared.update(self.by_trigram.get(gram, ()))
+            needed = max(1, len(grams) - 3 * limit)
+            for word, count in shared.items():
+                if count < needed or word in matches:
+                    continue
+                distance = edit_distance(query_word, word, limit)
+                if distance <= limit:
+                    matches[word] = 0.8 - 0.15 * (distance - 1)
+        return matches
+
+    def search(self, query: str, limit: Optional[int] = None, min_score: float = MIN_SCORE) -> list[tuple[float, dict]]:
+        """Return (score, contact) pairs for a query, best first."""
+        scores: dict[int, float] = {}
+
+        # Whole email addresses match exactly, and nothing else needs checking
+        for i in self.emails.get(normalize(query.strip()), []):
+            scores[i] = 1.0
+        if scores:
+            return [(1.0, self.contacts[i]) for i in scores][:limit]
+
+        # Phone numbers match on their digits, wherever they appear
+        digits = _NON_DIGIT_RE.sub("", query)
+        if len(digits) >= MIN_PHONE_DIGITS and not _LETTER_RE.search(query):
+            for phone, i in self.phones:
+                if digits in phone:
+                    score = FIELD_WEIGHTS["phone"] * (1.0 if phone.endswith(digits) else 0.9)
+                    scores[i] = max(scores.get(i, 0), score)
+
+        query_words = words(query)
+        if query_words:
+            totals: dict[int, float] = defaultdict(float)
+            for query_word in query_words:
+                best: dict[int, float] = {}
+                for word, word_score in self._word_matches(query_word).items():
+                    for i, field in self.postings[word]:
+                        score = word_score * FIELD_WEIGHTS[field]
+                        if score > best.get(i, 0):
+                            best[i] = score
+                for i, score in best.items():
+                    totals[i] += score
+            for i, total in totals.items():
+                scores[i] = max(scores.get(i, 0), total / len(query_words))
+
+        candidates = ((score, i) for i, score in scores.items() if score >= min_score)
+        rank = lambda item: (-item[0], (self.contacts[item[1]].get("name") or "").lower())  # noqa: E731
+        ranked = nsmallest(limit, candidates, key=rank) if limit is not None else sorted(candidates, key=rank)
+        return [(score, self.contacts[i]) for score, i in ranked]
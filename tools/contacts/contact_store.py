@@ -0,0 +1,498 @@
+"""
+Local contact index for fetch-contacts.py.
+
+Keeps every vCard in SQLite, raw and as a parsed contact dict, together with
+each address book's ctag and WebDAV sync token. Syncing an address book costs
+nothing when the ctag read during discovery is unchanged, and one
+sync-collection REPORT plus a multiget of the changed cards otherwise.
+Servers without sync-collection get an ETag listing that is diffed against
+the index instead. Only new or changed vCards are downloaded and parsed;
+every query is answered from disk. Each birthday is normalized to a day of the
+year when its card is stored, giving birthday queries a ready-sorted index,
+and email addresses are indexed for lookups by address (fetch-events.py
+--attendees reads them too). Multi-status responses are parsed as they
+stream in, one <D:response> at a time, so large address books never sit in
+memory whole.
+
+The index lives next to this file (contacts.db) and is never written to the vault.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import sys
+import time
+from contextlib import contextmanager
+from itertools import chain
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+from xml.etree import ElementTree as ET
+from xml.sax.saxutils import escape
+
+from birthdays import birthday_day
+from vcard import card_to_contact
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "shared"))
+import dav_transport  # noqa: E402
+
+if TYPE_CHECKING:
+    # Sessions come from the caller; fetch-events.py --attendees reads the index without requests
+    import requests
+
+# CLERK_CONTACTS_DB points the index elsewhere (the benchmark uses a scratch copy)
+STORE_PATH = Path(os.environ.get("CLERK_CONTACTS_DB") or Path(__file__).parent / "contacts.db")
+
+# vCards downloaded per addressbook-multiget REPORT during a sync
+MULTIGET_BATCH = 200
+
+NAMESPACES = {
+    'D': 'DAV:',
+    'C': 'urn:ietf:params:xml:ns:carddav',
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS addressbooks (
+    href TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    ctag TEXT,
+    sync_token TEXT,
+    synced_at REAL
+);
+CREATE TABLE IF NOT EXISTS cards (
+    addressbook_href TEXT NOT NULL,
+    href TEXT NOT NULL,
+    etag TEXT,
+    data TEXT NOT NULL,
+    contact TEXT,
+    PRIMARY KEY (addressbook_href, href)
+);
+CREATE TABLE IF NOT EXISTS birthdays (
+    addressbook_href TEXT NOT NULL,
+    href TEXT NOT NULL,
+    day INTEGER NOT NULL,
+    PRIMARY KEY (addressbook_href, href)
+);
+CREATE INDEX IF NOT EXISTS birthdays_by_day ON birthdays (day);
+CREATE TABLE IF NOT EXISTS emails (
+    addressbook_href TEXT NOT NULL,
+    href TEXT NOT NULL,
+    email TEXT NOT NULL,
+    PRIMARY KEY (addressbook_href, href, email)
+);
+CREATE INDEX IF NOT EXISTS emails_by_email ON emails (email);
+CREATE TABLE IF NOT EXISTS generation (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO generation (id, value) VALUES (0, 0);
+CREATE TRIGGER IF NOT EXISTS cards_inserted AFTER INSERT ON cards
+BEGIN UPDATE generation SET value = value + 1; END;
+CREATE TRIGGER IF NOT EXISTS cards_updated AFTER UPDATE ON cards
+BEGIN UPDATE generation SET value = value + 1; END;
+CREATE TRIGGER IF NOT EXISTS cards_deleted AFTER DELETE ON cards
+BEGIN UPDATE generation SET value = value + 1; END;
+CREATE TRIGGER IF NOT EXISTS addressbook_renamed AFTER UPDATE OF name ON addressbooks
+WHEN old.name IS NOT new.name
+BEGIN UPDATE generation SET value = value + 1; END;
+"""
+
+# Tables derived from cards.contact, rebuilt whenever their card changes
+DERIVED_TABLES = ("birthdays", "emails")
+
+# Bumped when derived tables need rebuilding from the stored cards
+SCHEMA_VERSION = 2
+
+# Emails per query in by_email() (well under SQLite's bound-parameter limit)
+EMAIL_BATCH = 500
+
+
+def normalize_email(email: str) -> str:
+    """Compare addresses case-insensitively, with or without a mailto: prefix."""
+    email = email.strip()
+    if email[:7].lower() == 'mailto:':
+        email = email[7:]
+    return email.lower()
+
+
+class SyncTokenRejected(Exception):
+    """The server no longer accepts the stored sync token."""
+
+
+# Bytes read from the network per step of the streaming multistatus parser
+CHUNK_SIZE = 64 * 1024
+
+_RESPONSE_TAG = '{DAV:}response'
+_SYNC_TOKEN_TAG = '{DAV:}sync-token'
+
+
+def _report(session: requests.Session, url: str, body: str, depth: str = '1') -> requests.Response:
+    return session.request(
+        'REPORT', url,
+        headers={'Content-Type': 'application/xml', 'Depth': depth},
+        data=body.encode('utf-8'),
+        stream=True,
+    )
+
+
+class Multistatus:
+    """
+    Streaming reader for a 207 Multi-Status body.
+
+    Iterating yields (href, status, etag, address_data) for each <D:response>
+    as soon as it has arrived, then drops it from the tree, so memory stays at
+    one response however large the address book. The top-level sync-token is
+    available as .sync_token once iteration has finished.
+    """
+
+    def __init__(self, response: requests.Response):
+        self.response = response
+        self.sync_token = None
+
+    def __iter__(self):
+        try:
+            for elem in self._top_level():
+                if elem.tag == _RESPONSE_TAG:
+                    yield (
+                        elem.findtext('D:href', namespaces=NAMESPACES),
+                        elem.findtext('D:status', namespaces=NAMESPACES) or '',
+                        elem.findtext('.//D:getetag', namespaces=NAMESPACES),
+                        elem.findtext('.//C:address-data', namespaces=NAMESPACES),
+                    )
+                elif elem.tag == _SYNC_TOKEN_TAG:
+                    self.sync_token = elem.text
+        finally:
+            self.response.close()
+
+    def _top_level(self):
+        """Yield each complete child of <D:multistatus>, then free it."""
+        parser = ET.XMLPullParser(events=('start', 'end'))
+        root = None
+        depth = 0
+
+        def completed():
+            nonlocal root, depth
+            for event, elem in parser.read_events():
+                if event == 'start':
+                    root = root if root is not None else elem
+                    depth += 1
+                    continue
+                depth -= 1
+                if depth == 1:
+                    yield elem
+                    root.remove(elem)
+
+        for chunk in self.response.iter_content(CHUNK_SIZE):
+            parser.feed(chunk)
+            yield from completed()
+        parser.close()
+        yield from completed()
+
+
+def sync_collection(session: requests.Session, url: str, token: Optional[str]):
+    """
+    Ask for everything that changed since token (or everything, with no token).
+
+    Returns (new_token, {href: etag} for changed cards, [deleted hrefs]), or None
+    when the server doesn't support sync-collection. Raises SyncTokenRejected
+    when the token has expired.
+    """
+    body = f'''<?xml version="1.0" encoding="UTF-8"?>
+    <D:sync-collection xmlns:D="DAV:">
+        <D:sync-token>{escape(token or '')}</D:sync-token>
+        <D:sync-level>1</D:sync-level>
+        <D:prop>
+            <D:getetag/>
+        </D:prop>
+    </D:sync-collection>'''
+    response = _report(session, url, body)
+
+    if response.status_code in (403, 409) and token and b'valid-sync-token' in response.content:
+        raise SyncTokenRejected(token)
+    if response.status_code != 207:
+        response.close()
+        return None
+
+    changed, deleted = {}, []
+    multistatus = Multistatus(response)
+    for href, status, etag, _ in multistatus:
+        if ' 404' in status:
+            deleted.append(href)
+        elif href and not href.endswith('/'):
+            changed[href] = etag
+    return multistatus.sync_token, changed, deleted
+
+
+def list_etags(session: requests.Session, url: str) -> dict:
+    """ETag of every card in an address book, from one Depth: 1 PROPFIND."""
+    body = '''<?xml version="1.0" encoding="UTF-8"?>
+    <D:propfind xmlns:D="DAV:">
+        <D:prop>
+            <D:getetag/>
+        </D:prop>
+    </D:propfind>'''
+    response = session.request(
+        'PROPFIND', url,
+        headers={'Content-Type': 'application/xml', 'Depth': '1'},
+        data=body.encode('utf-8'),
+        stream=True,
+    )
+    if response.status_code not in (200, 207):
+        response.close()
+        response.raise_for_status()
+    return {
+        href: etag
+        for href, _, etag, _ in Multistatus(response)
+        if href and not href.endswith('/')
+    }
+
+
+def multiget(session: requests.Session, url: str, hrefs: list[str]):
+    """Yield (href, etag, vCard text) for the given cards, MULTIGET_BATCH at a time."""
+    for i in range(0, len(hrefs), MULTIGET_BATCH):
+        batch = hrefs[i:i + MULTIGET_BATCH]
+        href_elems = ''.join(f'<D:href>{escape(href)}</D:href>' for href in batch)
+        body = f'''<?xml version="1.0" encoding="UTF-8"?>
+        <C:addressbook-multiget xmlns:D="DAV:" xmlns:C="urn:ietf:params:xml:ns:carddav">
+            <D:prop>
+                <D:getetag/>
+                <C:address-data/>
+            </D:prop>
+            {href_elems}
+        </C:addressbook-multiget>'''
+        response = _report(session, url, body)
+        if response.status_code not in (200, 207):
+            response.close()
+            response.raise_for_status()
+        for href, _, etag, address_data in Multistatus(response):
+            if address_data:
+                yield href, etag, address_data
+
+
+def revalidate(session: requests.Session, server: str, cards: dict):
+    """
+    Conditionally GET cards we hold a copy of ({href: stored etag}).
+
+    Yields (href, etag, vCard text) only for cards that changed; unchanged ones
+    cost a bodiless 304.
+    """
+    for href, etag in cards.items():
+        response = dav_transport.get(session, f"{server}{href}", etag=etag)
+        if response is not None and response.status_code == 200:
+            yield href, response.headers.get('ETag'), response.text
+
+
+class ContactStore:
+    """SQLite-backed copy of one or more CardDAV address books."""
+
+    def __init__(self, path: Path = STORE_PATH, readonly: bool = False):
+        """readonly=True opens an existing index for queries only, without creating or upgrading it."""
+        self.path = path
+        self.readonly = readonly
+        if readonly:
+            return
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            if conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+                # Rebuild derived tables for cards stored before they existed
+                rows = conn.execute(
+                    "SELECT addressbook_href, href, contact FROM cards WHERE contact IS NOT NULL"
+                ).fetchall()
+                self._index_cards(conn, [(book, card, json.loads(contact)) for book, card, contact in rows])
+                conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    @contextmanager
+    def _connect(self):
+        if self.readonly:
+            conn = sqlite3.connect(f"{Path(self.path).resolve().as_uri()}?mode=ro", uri=True, timeout=30)
+        else:
+            conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def addressbooks(self) -> list[dict]:
+        """Return {'name', 'href'} for every address book that has been synced at least once."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT name, href FROM addressbooks WHERE synced_at IS NOT NULL ORDER BY name"
+            ).fetchall()
+        return [{'name': name, 'href': href} for name, href in rows]
+
+    def sync(self, session: requests.Session, server: str, addressbook: dict) -> None:
+        """
+        Bring the stored copy of an address book up to date with the server.
+
+        addressbook is a list_addressbooks() entry; its ctag, when present, was
+        just read from the server and lets an unchanged address book skip the
+        REPORT entirely.
+        """
+        href = addressbook['href']
+        url = f"{server}{href}"
+        ctag = addressbook.get('ctag')
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT ctag, sync_token FROM addressbooks WHERE href = ?", (href,)
+            ).fetchone()
+        stored_ctag, token = row if row else (None, None)
+
+        if row and ctag and ctag == stored_ctag:
+            self._save_addressbook(href, addressbook['name'], ctag, token)
+            return
+
+        try:
+            result = sync_collection(session, url, token)
+        except SyncTokenRejected:
+            # Token expired: start over with a full listing
+            token = None
+            result = sync_collection(session, url, None)
+
+        with self._connect() as conn:
+            known = dict(conn.execute(
+                "SELECT href, etag FROM cards WHERE addressbook_href = ?", (href,)
+            ))
+
+        if result is None:
+            # No sync-collection support: diff a full ETag listing instead
+            new_token = None
+            changed, deleted = list_etags(session, url), []
+            full_listing = True
+        else:
+            new_token, changed, deleted = result
+            full_listing = token is None
+
+        if full_listing:
+            deleted.extend(card for card in known if card not in changed)
+        pending = [card for card, etag in changed.items() if etag is None or known.get(card) != etag]
+        # Reported without an ETag: cards we already hold are only downloaded if they changed
+        unsure = {card: known[card] for card in pending if changed[card] is None and known.get(card)}
+        pending = [card for card in pending if card not in unsure]
+
+        with self._connect() as conn:
+            for table in ("cards",) + DERIVED_TABLES:
+                conn.executemany(
+                    f"DELETE FROM {table} WHERE addressbook_href = ? AND href = ?",
+                    [(href, card) for card in deleted],
+                )
+
+        # Cards are parsed as they stream in and written a batch at a time
+        rows = []
+        for card, etag, data in chain(multiget(session, url, pending), revalidate(session, server, unsure)):
+            contact = card_to_contact(data)
+            rows.append((href, card, etag, data, contact))
+            if len(rows) >= MULTIGET_BATCH:
+                self._save_cards(rows)
+                rows = []
+        self._save_cards(rows)
+        self._save_addressbook(href, addressbook['name'], ctag, new_token)
+
+    def _save_cards(self, rows: list[tuple]) -> None:
+        """Store (addressbook_href, href, etag, data, contact or None) rows."""
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO cards (addressbook_href, href, etag, data, contact)"
+                " VALUES (?, ?, ?, ?, ?)",
+                [(book, card, etag, data, json.dumps(contact) if contact else None)
+                 for book, card, etag, data, contact in rows],
+            )
+            self._index_cards(conn, [(book, card, contact) for book, card, _, _, contact in rows])
+
+    @staticmethod
+    def _index_cards(conn: sqlite3.Connection, cards: list[tuple]) -> None:
+        """Replace the derived-table rows of each (addressbook_href, href, contact or None)."""
+        for table in DERIVED_TABLES:
+            conn.executemany(
+                f"DELETE FROM {table} WHERE addressbook_href = ? AND href = ?",
+                [(book, card) for book, card, _ in cards],
+            )
+        birthdays, emails = [], set()
+        for book, card, contact in cards:
+            if not contact:
+                continue
+            day = birthday_day(contact.get('birthday') or '')
+            if day is not None:
+                birthdays.append((book, card, day))
+            emails.update((book, card, normalize_email(email)) for email in contact.get('emails') or [])
+        conn.executemany("INSERT INTO birthdays (addressbook_href, href, day) VALUES (?, ?, ?)", birthdays)
+        conn.executemany("INSERT INTO emails (addressbook_href, href, email) VALUES (?, ?, ?)", emails)
+
+    def _save_addressbook(self, href: str, name: str, ctag: Optional[str], token: Optional[str]) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO addressbooks (href, name, ctag, sync_token, synced_at)"
+                " VALUES (?, ?, ?, ?, ?)"
+                " ON CONFLICT(href) DO UPDATE SET name = excluded.name, ctag = excluded.ctag,"
+                " sync_token = excluded.sync_token, synced_at = excluded.synced_at",
+                (href, name, ctag, token, time.time()),
+            )
+
+    def revision(self) -> int:
+        """Changes whenever any stored card does (for caching derived indexes)."""
+        with self._connect() as conn:
+            # Bumped by triggers, in the same transaction as every write to cards
+            return conn.execute("SELECT value FROM generation").fetchone()[0]
+
+    def contacts(self, addressbook_hrefs: Optional[list[str]] = None) -> list[dict]:
+        """Return the parsed contacts, each tagged with its address book name."""
+        query = (
+            "SELECT addressbooks.name, cards.contact FROM cards"
+            " JOIN addressbooks ON addressbooks.href = cards.addressbook_href"
+            " WHERE cards.contact IS NOT NULL"
+        )
+        query, params = self._in_addressbooks(query, addressbook_hrefs)
+        with self._connect() as conn:
+            rows = conn.execute(query, params).fetchall()
+        return [self._tagged(contact_json, addressbook) for addressbook, contact_json in rows]
+
+    def birthdays(self, addressbook_hrefs: Optional[list[str]] = None) -> list[tuple[int, dict]]:
+        """(day of year, contact) for every contact with a birthday, sorted by day."""
+        query = (
+            "SELECT birthdays.day, addressbooks.name, cards.contact FROM birthdays"
+            " JOIN cards USING (addressbook_href, href)"
+            " JOIN addressbooks ON addressbooks.href = birthdays.addressbook_href"
+            " WHERE cards.contact IS NOT NULL"
+        )
+        query, params = self._in_addressbooks(query, addressbook_hrefs, column="birthdays.addressbook_href")
+        with self._connect() as conn:
+            rows = conn.execute(query + " ORDER BY birthdays.day", params).fetchall()
+        entries = [(day, self._tagged(contact_json, addressbook)) for day, addressbook, contact_json in rows]
+        # Same-day birthdays in name order
+        entries.sort(key=lambda entry: (entry[0], (entry[1].get('name') or '').lower()))
+        return entries
+
+    def by_email(self, emails) -> dict[str, dict]:
+        """Map each given email address (any case) that belongs to a stored contact to that contact."""
+        wanted = sorted({normalize_email(email) for email in emails if email})
+        found = {}
+        with self._connect() as conn:
+            for i in range(0, len(wanted), EMAIL_BATCH):
+                batch = wanted[i:i + EMAIL_BATCH]
+                rows = conn.execute(
+                    "SELECT emails.email, addressbooks.name, cards.contact FROM emails"
+                    " JOIN cards USING (addressbook_href, href)"
+                    " JOIN addressbooks ON addressbooks.href = emails.addressbook_href"
+                    f" WHERE cards.contact IS NOT NULL AND emails.email IN ({', '.join('?' * len(batch))})"
+                    " ORDER BY addressbooks.name",
+                    batch,
+                ).fetchall()
+                for email, addressbook, contact_json in rows:
+                    if email not in found:
+                        found[email] = self._tagged(contact_json, addressbook)
+        return found
+
+    @staticmethod
+    def _in_addressbooks(query: str, addressbook_hrefs: Optional[list[str]],
+                         column: str = "cards.addressbook_href") -> tuple[str, tuple]:
+        if addressbook_hrefs is None:
+            return query, ()
+        return (query + f" AND {column} IN ({', '.join('?' * len(addressbook_hrefs))})",
+                tuple(addressbook_hrefs))
+
+    @staticmethod
+    def _tagged(contact_json: str, addressbook: str) -> dict:
+        contact = json.loads(contact_json)
+        contact['addressbook'] = addressbook
+        return contact
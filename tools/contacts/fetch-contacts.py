@@ -5,29 +5,73 @@ Fetch contacts from Fastmail via CardDAV.
 Usage:
     python fetch-contacts.py                    # All contacts
     python fetch-contacts.py --birthdays        # Only contacts with birthdays
-    python fetch-contacts.py --search "Adam"    # Search by name
+    python fetch-contacts.py --search "Adam"    # Search name, email, phone, organization
+    python fetch-contacts.py --upcoming 30      # Birthdays in the next 30 days
+    python fetch-contacts.py --between 2026-12-20 2027-01-10  # Birthdays in a window
     python fetch-contacts.py --list             # List address books
+    python fetch-contacts.py --offline          # Local index only, no network
+    python fetch-contacts.py --resolve names.txt  # One match set per line (- for stdin)
+    python fetch-contacts.py --serve            # Stay resident; the wrapper hands calls to it
+
+Contacts are answered from a local index (contacts.db) that is kept current with
+WebDAV sync tokens, so only new or changed vCards are downloaded and parsed.
+Use --offline to read the index without contacting the server, or --no-cache to
+query the server directly.
 
 Environment variables:
     FASTMAIL_USERNAME - Fastmail email address
     FASTMAIL_CARDDAV_PASSWORD - Fastmail app password with CardDAV (Contacts) access
+    FASTMAIL_CARDDAV_SERVER - CardDAV server root (default: https://carddav.fastmail.com)
 """
 
 import argparse
 import json
 import os
 import sys
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from pathlib import Path
 from typing import Optional
 from xml.etree import ElementTree as ET
 
 import requests
-import vobject
+
+from birthdays import BirthdayIndex
+from contact_search import ContactIndex
+from contact_store import ContactStore, Multistatus
+from vcard import card_to_contact
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "shared"))
+import dav_transport  # noqa: E402
+import resident  # noqa: E402
+
+# Where `contacts --serve` listens; the contacts wrapper uses it when present
+SOCKET_PATH = Path(__file__).parent / ".contacts.sock"
+
+# Search index over the local contacts, reused while they don't change
+# (across calls when running resident)
+_search_index: Optional[ContactIndex] = None
+_search_index_key = None
+_birthday_index: Optional[BirthdayIndex] = None
+_birthday_index_key = None
+
+# Pooled CardDAV session, kept (with its open connections) across calls when running resident
+_session: Optional[requests.Session] = None
+
+# Matches returned per query by --resolve unless --limit says otherwise
+RESOLVE_LIMIT = 5
+
+# Address books synced or fetched in parallel (each one is mostly network wait)
+MAX_WORKERS = 8
+
+# Server root; overridden to point the tool at the benchmark's local stand-in
+CARDDAV_SERVER = os.environ.get("FASTMAIL_CARDDAV_SERVER", "https://carddav.fastmail.com")
 
 # Namespaces for CardDAV XML
 NAMESPACES = {
     'D': 'DAV:',
     'C': 'urn:ietf:params:xml:ns:carddav',
+    'CS': 'http://calendarserver.org/ns/',
 }
 
 
@@ -54,26 +98,35 @@ def get_credentials() -> tuple[str, str]:
 
 def get_base_url(username: str) -> str:
     """Get CardDAV base URL for user."""
-    return f"https://carddav.fastmail.com/dav/addressbooks/user/{username}/"
+    return f"{CARDDAV_SERVER}/dav/addressbooks/user/{username}/"
+
 
+def get_session(username: str, password: str) -> requests.Session:
+    """Shared pooled session for all CardDAV requests."""
+    global _session
+    if _session is None or _session.auth != (username, password):
+        _session = dav_transport.session(auth=(username, password), pool_size=MAX_WORKERS)
+    return _session
 
-def list_addressbooks(username: str, password: str) -> list[dict]:
+
+def list_addressbooks(session: requests.Session, username: str) -> list[dict]:
     """List available address books."""
     base_url = get_base_url(username)
 
     # PROPFIND to discover address books
     propfind_body = '''<?xml version="1.0" encoding="UTF-8"?>
-    <D:propfind xmlns:D="DAV:" xmlns:C="urn:ietf:params:xml:ns:carddav">
+    <D:propfind xmlns:D="DAV:" xmlns:C="urn:ietf:params:xml:ns:carddav"
+                xmlns:CS="http://calendarserver.org/ns/">
         <D:prop>
             <D:displayname/>
             <D:resourcetype/>
+            <CS:getctag/>
         </D:prop>
     </D:propfind>'''
 
-    response = requests.request(
+    response = session.request(
         'PROPFIND',
         base_url,
-        auth=(username, password),
         headers={
             'Content-Type': 'application/xml',
             'Depth': '1',
@@ -94,6 +147,7 @@ def list_addressbooks(username: str, password: str) -> list[dict]:
         href = response_elem.find('D:href', NAMESPACES)
         displayname = response_elem.find('.//D:displayname', NAMESPACES)
         resourcetype = response_elem.find('.//D:resourcetype', NAMESPACES)
+        ctag = response_elem.find('.//CS:getctag', NAMESPACES)
 
         # Check if it's an address book (has addressbook resourcetype)
         is_addressbook = resourcetype is not None and \
@@ -104,19 +158,20 @@ def list_addressbooks(username: str, password: str) -> list[dict]:
             addressbooks.append({
                 'name': name,
                 'href': href.text,
+                # Changes whenever a card does; lets sync skip unchanged address books
+                'ctag': ctag.text if ctag is not None else None,
             })
 
     return addressbooks
 
 
 def fetch_contacts_from_addressbook(
-    username: str,
-    password: str,
+    session: requests.Session,
     addressbook_href: str,
     search_term: Optional[str] = None,
 ) -> list[dict]:
     """Fetch all contacts from an address book."""
-    base_url = f"https://carddav.fastmail.com{addressbook_href}"
+    base_url = f"{CARDDAV_SERVER}{addressbook_href}"
 
     # REPORT query to get all vcards
     if search_term:
@@ -142,84 +197,87 @@ def fetch_contacts_from_addressbook(
             </D:prop>
         </C:addressbook-query>'''
 
-    response = requests.request(
+    response = session.request(
         'REPORT',
         base_url,
-        auth=(username, password),
         headers={
             'Content-Type': 'application/xml',
             'Depth': '1',
         },
         data=report_body,
+        stream=True,
     )
 
     if response.status_code not in (200, 207):
+        response.close()
         print(f"Error: Failed to fetch contacts: {response.status_code}", file=sys.stderr)
         return []
 
-    # Parse response
-    root = ET.fromstring(response.content)
+    # Parse each vCard as its <D:response> arrives
     contacts = []
-
-    for response_elem in root.findall('.//D:response', NAMESPACES):
-        address_data = response_elem.find('.//C:address-data', NAMESPACES)
-
-        if address_data is not None and address_data.text:
-            try:
-                vcard = vobject.readOne(address_data.text)
-                contact = parse_vcard(vcard)
-                if contact:
-                    contacts.append(contact)
-            except Exception as e:
-                # Skip problematic vcards
-                pass
+    for _, _, _, address_data in Multistatus(response):
+        if address_data:
+            contact = card_to_contact(address_data)
+            if contact:
+                contacts.append(contact)
 
     return contacts
 
 
-def parse_vcard(vcard) -> Optional[dict]:
-    """Parse a vCard into a contact dict."""
-    contact = {}
-
-    # Full name
-    if hasattr(vcard, 'fn'):
-        contact['name'] = vcard.fn.value
-    elif hasattr(vcard, 'n'):
-        n = vcard.n.value
-        parts = [n.prefix, n.given, n.additional, n.family, n.suffix]
-        contact['name'] = ' '.join(p for p in parts if p).strip()
-
-    if not contact.get('name'):
-        return None
-
-    # Birthday
-    if hasattr(vcard, 'bday'):
-        bday = vcard.bday.value
-        if isinstance(bday, str):
-            contact['birthday'] = bday
-        else:
-            # It's a date object
-            contact['birthday'] = bday.isoformat() if hasattr(bday, 'isoformat') else str(bday)
-
-    # Email
-    if hasattr(vcard, 'email'):
-        emails = vcard.contents.get('email', [])
-        contact['emails'] = [e.value for e in emails]
+def search_index(store: ContactStore, addressbook_hrefs: list[str]) -> ContactIndex:
+    """Search index over the stored contacts of the given address books."""
+    global _search_index, _search_index_key
+    key = (store.path, store.revision(), tuple(addressbook_hrefs))
+    if _search_index is None or key != _search_index_key:
+        _search_index = ContactIndex(store.contacts(addressbook_hrefs))
+        _search_index_key = key
+    return _search_index
+
+
+def birthday_index(store: ContactStore, addressbook_hrefs: list[str]) -> BirthdayIndex:
+    """Birthday index over the stored contacts of the given address books."""
+    global _birthday_index, _birthday_index_key
+    key = (store.path, store.revision(), tuple(addressbook_hrefs))
+    if _birthday_index is None or key != _birthday_index_key:
+        _birthday_index = BirthdayIndex(store.birthdays(addressbook_hrefs))
+        _birthday_index_key = key
+    return _birthday_index
+
+
+def parse_date(date_str: str) -> date:
+    """Parse a date: ISO (2026-01-24) or relative (today, tomorrow, +7d)."""
+    today = datetime.now().date()
+    if date_str == "today":
+        return today
+    elif date_str == "tomorrow":
+        return today + timedelta(days=1)
+    elif date_str.startswith("+") and date_str.endswith("d"):
+        return today + timedelta(days=int(date_str[1:-1]))
+    else:
+        return date.fromisoformat(date_str)
 
-    # Phone
-    if hasattr(vcard, 'tel'):
-        phones = vcard.contents.get('tel', [])
-        contact['phones'] = [p.value for p in phones]
 
-    # Organization
-    if hasattr(vcard, 'org'):
-        contact['organization'] = vcard.org.value[0] if vcard.org.value else None
+def read_queries(source: str) -> list[str]:
+    """Queries from a file (or - for stdin): a JSON list of strings, or one per line."""
+    text = sys.stdin.read() if source == "-" else Path(source).read_text()
+    if text.lstrip().startswith("["):
+        try:
+            return [str(q).strip() for q in json.loads(text) if str(q).strip()]
+        except ValueError:
+            pass
+    return [line.strip() for line in text.splitlines() if line.strip()]
 
-    # Note
-    if hasattr(vcard, 'note'):
-        contact['note'] = vcard.note.value
 
-    return contact
+def resolve(index: ContactIndex, queries: list[str], limit: int) -> list[dict]:
+    """One ranked match set per query, in input order (repeated queries are searched once)."""
+    results = {}
+    for query in queries:
+        if query not in results:
+            results[query] = [
+                {**contact, 'score': round(score, 2)}
+                for score, contact in index.search(query, limit=limit)
+            ]
+    return [{'query': query, 'matches': results[query]} for query in queries]
 
 
 def main():
@@ -227,89 +285,116 @@ def main():
     parser.add_argument("--list", action="store_true", help="List available address books")
     parser.add_argument("--addressbook", "-a", help="Address book to fetch from (default: all)")
     parser.add_argument("--birthdays", "-b", action="store_true", help="Only show contacts with birthdays")
-    parser.add_argument("--search", "-s", help="Search contacts by name")
+    parser.add_argument("--search", "-s",
+                        help="Search by name, email, phone or organization (ranked, typo-tolerant)")
+    parser.add_argument("--resolve", metavar="FILE",
+                        help="Resolve many names/emails at once: one query per line, or a JSON "
+                             "list of strings, from FILE or - for stdin")
+    parser.add_argument("--limit", type=int,
+                        help=f"With --search/--resolve: at most N matches (--resolve default: {RESOLVE_LIMIT})")
     parser.add_argument("--upcoming", "-u", type=int, metavar="DAYS",
-                        help="Show birthdays in the next N days")
+                        help="Show birthdays in the next N days (0 = today)")
+    parser.add_argument("--between", nargs=2, metavar=("START", "END"),
+                        help="Show birthdays from START through END (YYYY-MM-DD, today, tomorrow, +7d)")
 
-    args = parser.parse_args()
+    parser.add_argument("--offline", action="store_true",
+                        help="Answer from the local contact index only (no network)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Query the server directly, bypassing the local contact index")
 
-    username, password = get_credentials()
+    args = parser.parse_args()
+    if args.resolve and args.no_cache:
+        parser.error("--resolve answers from the local index; drop --no-cache")
+    if args.upcoming is not None and args.between:
+        parser.error("use either --upcoming or --between")
+    by_birthday = args.upcoming is not None or args.between is not None
+    if args.between:
+        try:
+            window = parse_date(args.between[0]), parse_date(args.between[1])
+        except ValueError as e:
+            parser.error(f"--between: {e}")
+
+    store = ContactStore()
+    if args.offline:
+        addressbooks = store.addressbooks()
+    else:
+        username, password = get_credentials()
+        session = get_session(username, password)
+        addressbooks = list_addressbooks(session, username)
 
     if args.list:
-        addressbooks = list_addressbooks(username, password)
         print("Available address books:")
         for ab in addressbooks:
             print(f"  {ab['name']}")
         return
 
-    # Get address books
-    addressbooks = list_addressbooks(username, password)
-
     if args.addressbook:
         addressbooks = [ab for ab in addressbooks if ab['name'] == args.addressbook]
         if not addressbooks:
             print(f"Error: Address book '{args.addressbook}' not found", file=sys.stderr)
             sys.exit(1)
 
-    # Fetch contacts
+    # Fetch contacts: address books in parallel, so the wait is the slowest one
     all_contacts = []
-    for ab in addressbooks:
-        contacts = fetch_contacts_from_addressbook(
-            username, password, ab['href'],
-            search_term=args.search
-        )
-        for c in contacts:
-            c['addressbook'] = ab['name']
-        all_contacts.extend(contacts)
+    workers = max(1, min(MAX_WORKERS, len(addressbooks)))
+    if args.no_cache and not args.offline:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(fetch_contacts_from_addressbook, session, ab['href'], search_term=args.search)
+                for ab in addressbooks
+            ]
+            for ab, future in zip(addressbooks, futures):
+                contacts = future.result()
+                for c in contacts:
+                    c['addressbook'] = ab['name']
+                all_contacts.extend(contacts)
+    else:
+        if not args.offline:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(store.sync, session, CARDDAV_SERVER, ab) for ab in addressbooks]
+                for ab, future in zip(addressbooks, futures):
+                    try:
+                        future.result()
+                    except Exception as e:
+                        print(f"Warning: Failed to sync address book '{ab['name']}', "
+                              f"using the local index: {e}", file=sys.stderr)
+        hrefs = [ab['href'] for ab in addressbooks]
+        if args.resolve:
+            limit = args.limit if args.limit is not None else RESOLVE_LIMIT
+            print(json.dumps(resolve(search_index(store, hrefs), read_queries(args.resolve), limit), indent=2))
+            return
+        if args.search:
+            all_contacts = [
+                {**contact, 'score': round(score, 2)}
+                for score, contact in search_index(store, hrefs).search(args.search, limit=args.limit)
+            ]
+        elif not by_birthday:
+            all_contacts = store.contacts(hrefs)
 
     # Filter by birthdays if requested
     if args.birthdays:
         all_contacts = [c for c in all_contacts if c.get('birthday')]
 
-    # Filter by upcoming birthdays
-    if args.upcoming:
-        today = datetime.now().date()
-        upcoming = []
-        for c in all_contacts:
-            if c.get('birthday'):
-                try:
-                    # Parse birthday (handle various formats)
-                    bday_str = c['birthday']
-                    # Try different formats
-                    for fmt in ['%Y-%m-%d', '%Y%m%d', '--%m-%d', '%m-%d']:
-                        try:
-                            if fmt == '--%m-%d':
-                                bday = datetime.strptime(bday_str, fmt).date()
-                            else:
-                                bday = datetime.strptime(bday_str[:len('YYYY-MM-DD')], fmt).date()
-                            break
-                        except:
-                            continue
-                    else:
-                        continue
-
-                    # Calculate next occurrence this year
-                    this_year_bday = bday.replace(year=today.year)
-                    if this_year_bday < today:
-                        this_year_bday = this_year_bday.replace(year=today.year + 1)
-
-                    days_until = (this_year_bday - today).days
-                    if days_until <= args.upcoming:
-                        c['days_until_birthday'] = days_until
-                        c['next_birthday'] = this_year_bday.isoformat()
-                        upcoming.append(c)
-                except:
-                    pass
-
-        # Sort by days until birthday
-        upcoming.sort(key=lambda c: c.get('days_until_birthday', 999))
-        all_contacts = upcoming
-
-    # Sort by name
-    all_contacts.sort(key=lambda c: c.get('name', '').lower())
+    # Birthday windows: the stored, presorted index unless the contacts came from elsewhere
+    if by_birthday:
+        if args.search or (args.no_cache and not args.offline):
+            index = BirthdayIndex.from_contacts(all_contacts)
+        else:
+            index = birthday_index(store, hrefs)
+        if args.between:
+            all_contacts = index.between(*window)
+        else:
+            all_contacts = index.upcoming(datetime.now().date(), args.upcoming)
+
+    # Sort by name (search results keep their ranking, birthdays their date order)
+    elif not args.search or args.no_cache:
+        all_contacts.sort(key=lambda c: c.get('name', '').lower())
 
     print(json.dumps(all_contacts, indent=2))
 
 
 if __name__ == "__main__":
-    main()
+    if sys.argv[1:] == ["--serve"]:
+        resident.serve(SOCKET_PATH, main)
+    else:
+        main()
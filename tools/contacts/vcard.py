@@ -0,0 +1,65 @@
+"""
+vCard parsing for fetch-contacts.py.
+
+Turns raw vCards into Clerk's contact dicts. Shared by the direct REPORT path
+and the local contact index, which stores the parsed dict next to each card.
+"""
+
+from typing import Optional
+
+
+def parse_vcard(vcard) -> Optional[dict]:
+    """Parse a vCard into a contact dict."""
+    contact = {}
+
+    # Full name
+    if hasattr(vcard, 'fn'):
+        contact['name'] = vcard.fn.value
+    elif hasattr(vcard, 'n'):
+        n = vcard.n.value
+        parts = [n.prefix, n.given, n.additional, n.family, n.suffix]
+        contact['name'] = ' '.join(p for p in parts if p).strip()
+
+    if not contact.get('name'):
+        return None
+
+    # Birthday
+    if hasattr(vcard, 'bday'):
+        bday = vcard.bday.value
+        if isinstance(bday, str):
+            contact['birthday'] = bday
+        else:
+            # It's a date object
+            contact['birthday'] = bday.isoformat() if hasattr(bday, 'isoformat') else str(bday)
+
+    # Email
+    if hasattr(vcard, 'email'):
+        emails = vcard.contents.get('email', [])
+        contact['emails'] = [e.value for e in emails]
+
+    # Phone
+    if hasattr(vcard, 'tel'):
+        phones = vcard.contents.get('tel', [])
+        contact['phones'] = [p.value for p in phones]
+
+    # Organization
+    if hasattr(vcard, 'org'):
+        contact['organization'] = vcard.org.value[0] if vcard.org.value else None
+
+    # Note
+    if hasattr(vcard, 'note'):
+        contact['note'] = vcard.note.value
+
+    return contact
+
+
+def card_to_contact(data: str) -> Optional[dict]:
+    """Parse raw vCard text into a contact dict (None if it has no name or doesn't parse)."""
+    # Imported here so readers of the index (fetch-events.py --attendees) don't need vobject
+    import vobject
+
+    try:
+        return parse_vcard(vobject.readOne(data))
+    except Exception:
+        # Skip problematic vcards
+        return None
@@ -0,0 +1,72 @@
+"""
+Request blocking for the headless-browser MCP server.
+
+Only the page's HTML reaches trafilatura, so images, fonts and video are pure
+cost, and ad and analytics scripts cost the most of all: they download, run,
+and pull in more of the same. block_heavy_resources() routes every request a
+page makes and aborts:
+
+    resource types   BLOCKED_TYPES (image, media, font by default;
+                     CLERK_BROWSER_BLOCK_TYPES overrides, comma-separated)
+    tracker hosts    TRACKER_DOMAINS and their subdomains, whatever the type
+
+The page itself always loads, as do the site's own scripts, stylesheets and
+XHR/fetch, so pages render their text as usual. Service workers are off in
+every context (browser_pool.CONTEXT_OPTIONS), so no request escapes the route.
+"""
+
+import os
+from urllib.parse import urlparse
+
+from playwright.async_api import Error as PlaywrightError, Page, Route
+
+BLOCKED_TYPES = frozenset(
+    kind.strip()
+    for kind in (os.environ.get("CLERK_BROWSER_BLOCK_TYPES") or "image,media,font").split(",")
+    if kind.strip()
+)
+
+# Ad and analytics networks (whole domains), plus the script and beacon hosts
+# of vendors whose main domains also serve readable pages
+TRACKER_DOMAINS = frozenset({
+    "doubleclick.net", "googlesyndication.com", "googleadservices.com",
+    "google-analytics.com", "googletagmanager.com", "googletagservices.com",
+    "adservice.google.com", "adnxs.com", "amazon-adsystem.com", "moatads.com",
+    "pubmatic.com", "rubiconproject.com", "casalemedia.com", "openx.net",
+    "adsrvr.org", "criteo.net", "scorecardresearch.com", "quantserve.com",
+    "nr-data.net", "clarity.ms", "hotjar.io", "heapanalytics.com", "ads-twitter.com",
+    "connect.facebook.net", "analytics.twitter.com", "bat.bing.com",
+    "stats.wp.com", "pixel.wp.com", "cdn.segment.com", "api.segment.io",
+    "cdn.mxpnl.com", "api-js.mixpanel.com", "cdn.amplitude.com", "api.amplitude.com",
+    "static.hotjar.com", "script.hotjar.com", "edge.fullstory.com", "rs.fullstory.com",
+    "cdn.optimizely.com", "logx.optimizely.com", "js-agent.newrelic.com",
+    "static.chartbeat.com", "ping.chartbeat.net", "cdn.parsely.com", "p1.parsely.com",
+    "cdn.taboola.com", "widgets.outbrain.com", "js.hs-scripts.com",
+    "js.hs-analytics.net", "cdn.cookielaw.org", "geolocation.onetrust.com",
+})
+
+
+def is_tracker(url: str) -> bool:
+    """Whether url is served by a TRACKER_DOMAINS host or one of its subdomains."""
+    labels = (urlparse(url).hostname or "").lower().split(".")
+    return any(".".join(labels[i:]) in TRACKER_DOMAINS for i in range(len(labels) - 1))
+
+
+async def _route(route: Route):
+    request = route.request
+    # The page itself always loads, whoever serves it; frames are fair game
+    page_load = request.is_navigation_request() and request.frame.parent_frame is None
+    if not page_load and (request.resource_type in BLOCKED_TYPES or is_tracker(request.url)):
+        action = route.abort("blockedbyclient")
+    else:
+        action = route.continue_()
+    try:
+        await action
+    except PlaywrightError:
+        # The page navigated away or closed while the request was pending
+        pass
+
+
+async def block_heavy_resources(page: Page) -> None:
+    """Abort heavy resource types and tracker requests for everything page loads."""
+    await page.route("**/*", _route)
@@ -0,0 +1,235 @@
+"""
+Warm Chromium pool for the headless-browser MCP server.
+
+Launching Chromium costs far more than loading most pages, so the server
+starts its browsers once and keeps them for its whole lifetime. Every fetch
+still gets a fresh browser context (its own cookies, storage and cache):
+
+    pool = BrowserPool()
+    await pool.start()
+    async with pool.page() as page:
+        await page.goto(url)
+    await pool.close()
+
+Each browser is checked before it is handed out and replaced when it has
+crashed or disconnected. After MAX_PAGES pages a browser is retired: it takes
+no new work, is closed once its open pages finish, and a fresh one takes its
+place, so slow leaks inside Chromium never build up.
+"""
+
+import asyncio
+import contextlib
+import logging
+import os
+from typing import AsyncIterator, Optional
+
+from playwright.async_api import Browser, BrowserContext, Error as PlaywrightError, Page, async_playwright
+
+logger = logging.getLogger("headless-browser")
+
+# Chromium processes kept warm
+BROWSERS = int(os.environ.get("CLERK_BROWSER_INSTANCES") or 1)
+
+# Pages a browser serves before it is replaced
+MAX_PAGES = int(os.environ.get("CLERK_BROWSER_MAX_PAGES") or 100)
+
+LAUNCH_ARGS = [
+    "--disable-blink-features=AutomationControlled",
+    "--no-sandbox",
+    "--disable-dev-shm-usage",
+    "--disable-infobars",
+    "--window-size=1920,1080",
+    "--headless=new",  # Use Chrome's newer headless mode
+]
+
+# Realistic settings for every context
+CONTEXT_OPTIONS = {
+    "viewport": {"width": 1920, "height": 1080},
+    "user_agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36",
+    "locale": "en-US",
+    "timezone_id": "America/New_York",
+    # Service worker requests would bypass request routing (see blocking.py)
+    "service_workers": "block",
+    "extra_http_headers": {
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8",
+        "Accept-Language": "en-US,en;q=0.9",
+        "Accept-Encoding": "gzip, deflate, br",
+        "DNT": "1",
+        "Upgrade-Insecure-Requests": "1",
+        "Sec-Fetch-Dest": "document",
+        "Sec-Fetch-Mode": "navigate",
+        "Sec-Fetch-Site": "none",
+        "Sec-Fetch-User": "?1",
+        "Cache-Control": "max-age=0",
+    },
+}
+
+# Stealth techniques to avoid bot detection, run before any page script
+STEALTH_SCRIPT = """
+    // Override navigator.webdriver
+    Object.defineProperty(navigator, 'webdriver', {
+        get: () => undefined
+    });
+
+    // Override navigator.plugins to look real
+    Object.defineProperty(navigator, 'plugins', {
+        get: () => [1, 2, 3, 4, 5]
+    });
+
+    // Override navigator.languages
+    Object.defineProperty(navigator, 'languages', {
+        get: () => ['en-US', 'en']
+    });
+
+    // Override chrome runtime
+    window.chrome = {
+        runtime: {}
+    };
+
+    // Override permissions
+    const originalQuery = window.navigator.permissions.query;
+    window.navigator.permissions.query = (parameters) => (
+        parameters.name === 'notifications' ?
+            Promise.resolve({ state: Notification.permission }) :
+            originalQuery(parameters)
+    );
+"""
+
+
+class _Slot:
+    """One pooled browser and its bookkeeping."""
+
+    def __init__(self, browser: Browser):
+        self.browser = browser
+        self.pages = 0      # pages handed out over the browser's lifetime
+        self.active = 0     # contexts currently open
+        self.retired = False
+        self.crashed = False
+        self.closing = False
+        browser.on("disconnected", lambda _: self._disconnected())
+
+    def _disconnected(self):
+        if not self.retired:
+            logger.warning("Browser disconnected; it will be replaced")
+        self.crashed = True
+
+    @property
+    def healthy(self) -> bool:
+        return not self.crashed and not self.retired and self.browser.is_connected()
+
+
+class BrowserPool:
+    """A fixed number of warm browsers handing out fresh contexts."""
+
+    def __init__(self, size: int = BROWSERS, max_pages: int = MAX_PAGES):
+        self.size = max(1, size)
+        self.max_pages = max(1, max_pages)
+        self._playwright = None
+        self._slots: list[Optional[_Slot]] = [None] * self.size
+        self._lock = asyncio.Lock()
+        self._closing: set[asyncio.Task] = set()
+
+    async def start(self):
+        """Start Playwright and launch every browser (also done lazily on first use)."""
+        async with self._lock:
+            for i in range(self.size):
+                await self._ensure(i)
+
+    async def close(self):
+        """Close every browser and stop Playwright."""
+        async with self._lock:
+            for slot in filter(None, self._slots):
+                slot.retired = True
+                with contextlib.suppress(PlaywrightError):
+                    await slot.browser.close()
+            self._slots = [None] * self.size
+            if self._closing:
+                await asyncio.gather(*self._closing, return_exceptions=True)
+            if self._playwright:
+                await self._playwright.stop()
+                self._playwright = None
+
+    async def _launch(self) -> _Slot:
+        if self._playwright is None:
+            self._playwright = await async_playwright().start()
+        browser = await self._playwright.chromium.launch(headless=True, args=LAUNCH_ARGS)
+        logger.info("Launched browser %s", browser.version)
+        return _Slot(browser)
+
+    async def _ensure(self, i: int) -> _Slot:
+        """The browser in slot i, replacing it first if it is unhealthy or used up."""
+        slot = self._slots[i]
+        if slot is not None and slot.healthy:
+            return slot
+        if slot is not None:
+            self._retire(slot)
+        self._slots[i] = await self._launch()
+        return self._slots[i]
+
+    def _retire(self, slot: _Slot):
+        """Take a browser out of rotation; close it once its open pages are done."""
+        slot.retired = True
+        if slot.active == 0 and not slot.closing:
+            slot.closing = True
+            task = asyncio.create_task(self._close_browser(slot))
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
+
+    async def _close_browser(self, slot: _Slot):
+        with contextlib.suppress(PlaywrightError):
+            await slot.browser.close()
+
+    async def _acquire(self) -> _Slot:
+        """Least-busy healthy browser, launching or replacing browsers as needed."""
+        async with self._lock:
+            for i in range(self.size):
+                await self._ensure(i)
+            slot = min(self._slots, key=lambda s: s.active)
+            slot.active += 1
+            slot.pages += 1
+            if slot.pages >= self.max_pages:
+                # Serve this page, then make way for a fresh browser
+                slot.retired = True
+            return slot
+
+    def _release(self, slot: _Slot):
+        slot.active -= 1
+        if slot.retired and slot.active == 0:
+            self._retire(slot)
+
+    async def _new_context(self, slot: _Slot) -> BrowserContext:
+        context = await slot.browser.new_context(**CONTEXT_OPTIONS)
+        await context.add_init_script(STEALTH_SCRIPT)
+        return context
+
+    async def _open(self) -> tuple[_Slot, BrowserContext]:
+        for attempt in range(2):
+            slot = await self._acquire()
+            try:
+                return slot, await self._new_context(slot)
+            except PlaywrightError:
+                self._release(slot)
+                if attempt or slot.browser.is_connected():
+                    raise
+                # The browser died between the health check and now: one more try on a new one
+                slot.crashed = True
+            except BaseException:
+                self._release(slot)
+                raise
+
+    @contextlib.asynccontextmanager
+    async def context(self) -> AsyncIterator[BrowserContext]:
+        """A fresh browser context, closed afterwards."""
+        slot, context = await self._open()
+        try:
+            yield context
+        finally:
+            with contextlib.suppress(PlaywrightError):
+                await context.close()
+            self._release(slot)
+
+    @contextlib.asynccontextmanager
+    async def page(self) -> AsyncIterator[Page]:
+        """A new page in a fresh browser context."""
+        async with self.context() as context:
+            yield await context.new_page()
@@ -0,0 +1,114 @@
+"""
+Content extraction for the headless-browser MCP server.
+
+trafilatura is CPU-bound: parsing and scoring one long article can take
+longer than loading it. Run on the event loop, one extraction stalls every
+other page in a fetch_urls batch. Extractor runs extract_content() in a pool
+of worker processes instead, so batches use every core while the loop keeps
+driving navigations:
+
+    extractor = Extractor()              # EXTRACT_WORKERS processes
+    result = await extractor.extract(html, url)
+    extractor.close()
+
+Each document is parsed once: metadata and content are both read from the same
+lxml tree. With workers=0, extraction runs in a thread of this process.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import trafilatura
+from trafilatura.utils import load_html
+
+logger = logging.getLogger("headless-browser")
+
+# Extraction processes (0: a thread in the server process)
+EXTRACT_WORKERS = int(os.environ.get("CLERK_EXTRACT_WORKERS") or min(4, os.cpu_count() or 1))
+
+
+def extract_content(html: str, url: str) -> dict:
+    """Extract article content and metadata from HTML using trafilatura."""
+    result = {
+        "content": "",
+        "title": "",
+        "author": "",
+        "date": "",
+        "description": "",
+    }
+
+    # Parse once; metadata first, since content extraction prunes the tree
+    tree = load_html(html)
+    if tree is None:
+        return result
+
+    # Extract metadata
+    metadata = trafilatura.extract_metadata(tree)
+
+    # Extract main content
+    text = trafilatura.extract(
+        tree,
+        include_links=True,
+        include_images=False,
+        include_tables=True,
+        output_format="markdown",
+        url=url,
+    )
+
+    result["content"] = text or ""
+    if metadata:
+        result["title"] = metadata.title or ""
+        result["author"] = metadata.author or ""
+        result["date"] = metadata.date or ""
+        result["description"] = metadata.description or ""
+
+    return result
+
+
+def _ready() -> bool:
+    """No-op run in each worker at startup (loading it imports trafilatura there)."""
+    return True
+
+
+class Extractor:
+    """Runs extract_content() off the event loop, in worker processes."""
+
+    def __init__(self, workers: int = EXTRACT_WORKERS):
+        self.workers = max(0, workers)
+        self._executor = None
+
+    def _pool(self) -> Executor:
+        if self._executor is None:
+            if self.workers:
+                # spawn, not fork: the server process runs Playwright's threads
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=1)
+        return self._executor
+
+    async def extract(self, html: str, url: str) -> dict:
+        """extract_content(html, url) in the pool."""
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._pool(), extract_content, html, url)
+        except BrokenProcessPool:
+            # A worker died (out of memory, a crash in lxml): start a new pool and try once more
+            logger.warning("Extraction worker died; restarting the pool")
+            self.close()
+            return await loop.run_in_executor(self._pool(), extract_content, html, url)
+
+    async def warm_up(self):
+        """Start every worker and import trafilatura in it, so the first pages don't wait."""
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self._pool(), _ready) for _ in range(max(1, self.workers))))
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,152 @@
+"""
+Plain-HTTP fetching for the headless-browser MCP server.
+
+Most links are static pages that a browser adds nothing to, so fetches try a
+plain GET first: one pooled keep-alive client for the server's lifetime,
+sending the same headers as the browser contexts (browser_pool.CONTEXT_OPTIONS).
+fetch_html() raises NeedsBrowser when the answer can't be used as it is:
+
+    bot wall        401/403/429/503, or a challenge page (Cloudflare, DataDome,
+                    PerimeterX, Incapsula, captchas)
+    JS-rendered     an empty app root (<div id="root"></div>, __next, ...) or a
+                    "please enable JavaScript" page with little text of its own
+    not a page      any other error status, a non-HTML body, or one over MAX_BYTES
+    no answer       connection errors and timeouts (some sites drop clients
+                    that don't look like a browser at the TLS level)
+
+The caller also escalates when extraction comes back empty (server.fetch_tiered).
+"""
+
+import re
+from typing import Optional
+
+import httpx
+
+from browser_pool import CONTEXT_OPTIONS
+
+# Largest body read before giving the page to the browser instead
+MAX_BYTES = 5 * 1024 * 1024
+
+# Chrome's headers, as the browser contexts send them
+HEADERS = {
+    **CONTEXT_OPTIONS["extra_http_headers"],
+    "User-Agent": CONTEXT_OPTIONS["user_agent"],
+    "Accept-Encoding": "gzip, deflate",
+    "Sec-CH-UA": '"Google Chrome";v="131", "Chromium";v="131", "Not_A Brand";v="24"',
+    "Sec-CH-UA-Mobile": "?0",
+    "Sec-CH-UA-Platform": '"macOS"',
+}
+
+BOT_WALL_STATUSES = {401, 403, 429, 503}
+
+# Found (lowercased) in the first BOT_WALL_SCAN characters of challenge pages
+BOT_WALL_MARKERS = (
+    "cf-browser-verification", "cf_chl_opt", "/cdn-cgi/challenge-platform/",
+    "<title>just a moment...</title>", "attention required! | cloudflare",
+    "captcha-delivery.com", "px-captcha", "_incapsula_resource",
+    "please verify you are a human", "access to this page has been denied",
+)
+BOT_WALL_SCAN = 20000
+
+_EMPTY_APP_ROOT = re.compile(
+    r'<div[^>]+id=["\'](?:root|app|__next|__nuxt|svelte|main-app)["\'][^>]*>\s*</div>', re.I
+)
+_NOSCRIPT = re.compile(r"<noscript\b[^>]*>(.*?)</noscript\s*>", re.I | re.S)
+_NEEDS_JAVASCRIPT = ("enable javascript", "javascript is required", "javascript is disabled",
+                     "javascript to run this app")
+_META_CHARSET = re.compile(rb"""<meta[^>]+charset=["']?([\w-]+)""", re.I)
+_NOT_TEXT = re.compile(r"<(script|style|noscript|template)\b.*?</\1\s*>|<[^>]+>", re.I | re.S)
+
+# Visible characters below which a "needs JavaScript" page counts as an app shell
+SHELL_TEXT = 1000
+
+client = httpx.AsyncClient(
+    headers=HEADERS,
+    follow_redirects=True,
+    timeout=httpx.Timeout(15.0, connect=10.0),
+    limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+)
+
+
+class NeedsBrowser(Exception):
+    """The plain-HTTP answer can't be used; the reason is the message."""
+
+
+def bot_wall(status: int, html: str) -> bool:
+    """Whether a response looks like a bot check rather than the page."""
+    head = html[:BOT_WALL_SCAN].lower()
+    return status in BOT_WALL_STATUSES or any(marker in head for marker in BOT_WALL_MARKERS)
+
+
+def visible_text_length(html: str) -> int:
+    """Rough count of the characters a reader would see (tags and scripts removed)."""
+    return len(" ".join(_NOT_TEXT.sub(" ", html).split()))
+
+
+def looks_js_rendered(html: str) -> bool:
+    """Whether the HTML is an app shell that only JavaScript fills in."""
+    if _EMPTY_APP_ROOT.search(html):
+        return True
+    asks_for_javascript = any(
+        phrase in " ".join(block.lower().split())
+        for block in _NOSCRIPT.findall(html)
+        for phrase in _NEEDS_JAVASCRIPT
+    )
+    return asks_for_javascript and visible_text_length(html) < SHELL_TEXT
+
+
+def _decode(body: bytes, content_type: str) -> str:
+    """Body as text, in the charset the headers or a <meta> tag name (UTF-8 otherwise)."""
+    charset = httpx.Response(200, headers={"content-type": content_type}).charset_encoding
+    if not charset:
+        match = _META_CHARSET.search(body[:4096])
+        charset = match.group(1).decode() if match else "utf-8"
+    try:
+        return body.decode(charset, errors="replace")
+    except LookupError:
+        return body.decode("utf-8", errors="replace")
+
+
+async def fetch_html(url: str) -> tuple[str, str, httpx.Headers]:
+    """
+    GET a page over plain HTTP; returns (html, final_url, headers).
+
+    Raises NeedsBrowser when the page should be loaded in the browser instead.
+    """
+    try:
+        async with client.stream("GET", url) as response:
+            content_type = response.headers.get("content-type", "")
+            if "html" not in content_type and "xml" not in content_type:
+                raise NeedsBrowser(f"not HTML ({content_type or 'no content type'})")
+            body = bytearray()
+            async for chunk in response.aiter_bytes():
+                body += chunk
+                if len(body) > MAX_BYTES:
+                    raise NeedsBrowser("page too large")
+            html = _decode(bytes(body), content_type)
+            status, final_url, headers = response.status_code, str(response.url), response.headers
+    except httpx.HTTPError as e:
+        raise NeedsBrowser(f"plain HTTP failed ({type(e).__name__})") from e
+
+    if bot_wall(status, html):
+        raise NeedsBrowser(f"bot wall (HTTP {status})")
+    if status >= 400:
+        raise NeedsBrowser(f"HTTP {status}")
+    if looks_js_rendered(html):
+        raise NeedsBrowser("rendered by JavaScript")
+    return html, final_url, headers
+
+
+async def conditional_get(url: str, etag: Optional[str], last_modified: Optional[str]) -> Optional[int]:
+    """Status of a conditional GET (304 when unchanged), None when the site can't be reached."""
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    try:
+        # Only the status matters, so the body is never read
+        async with client.stream("GET", url, headers=headers) as response:
+            return response.status_code
+    except httpx.HTTPError:
+        return None
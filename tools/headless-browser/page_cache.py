@@ -0,0 +1,221 @@
+"""
+Disk cache of extracted pages for the headless-browser MCP server.
+
+Triage often fetches the same link again minutes or hours later (from
+bookmarks.md, then from an _inbox/ note). The cache keeps what
+extract_content() produced, keyed by the page's normalized final URL:
+scheme and host lowercased, default port, fragment and tracking parameters
+(utm_*, fbclid, gclid, ...) dropped, remaining query parameters sorted. The
+URL that was asked for is recorded as an alias, so a redirecting link hits
+too.
+
+    fresh       entries younger than their TTL are served as they are
+    stale       entries with an ETag or Last-Modified are revalidated with a
+                conditional GET; a 304 renews them, anything else refetches
+    bounded     once the cache grows past MAX_BYTES, the least recently used
+                pages are dropped
+
+The same database remembers which sites need the browser rather than plain
+HTTP (see server.fetch_tiered), for ROUTE_TTL before plain HTTP gets another try.
+
+The cache lives next to this file (pages.db); CLERK_PAGE_CACHE points it
+elsewhere.
+"""
+
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+CACHE_PATH = Path(os.environ.get("CLERK_PAGE_CACHE") or Path(__file__).parent / "pages.db")
+
+# Seconds a page is served without asking the site again
+TTL = float(os.environ.get("CLERK_PAGE_CACHE_TTL") or 24 * 3600)
+
+# Total size of cached pages before the least recently used are dropped
+MAX_BYTES = int(float(os.environ.get("CLERK_PAGE_CACHE_MB") or 100) * 1024 * 1024)
+
+# Seconds a site stays routed to the browser after plain HTTP fell short
+ROUTE_TTL = 7 * 24 * 3600
+
+# Query parameters that only say where a click came from
+TRACKING_PARAMS = frozenset({
+    "fbclid", "gclid", "dclid", "gbraid", "wbraid", "msclkid", "yclid", "twclid",
+    "igshid", "mc_cid", "mc_eid", "_hsenc", "_hsmi", "_hsmkt", "mkt_tok", "vero_id",
+    "oly_anon_id", "oly_enc_id", "wickedid", "ref_src", "ref_url", "s_cid", "si",
+})
+TRACKING_PREFIXES = ("utm_", "pk_", "mtm_")
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT PRIMARY KEY,
+    result TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    fetched_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    used_at REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pages_by_use ON pages (used_at);
+CREATE TABLE IF NOT EXISTS aliases (
+    url TEXT PRIMARY KEY,
+    page TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS aliases_by_page ON aliases (page);
+CREATE TABLE IF NOT EXISTS routes (
+    host TEXT PRIMARY KEY,
+    tier TEXT NOT NULL,
+    decided_at REAL NOT NULL
+);
+"""
+
+
+def _tracking(param: str) -> bool:
+    param = param.lower()
+    return param in TRACKING_PARAMS or param.startswith(TRACKING_PREFIXES)
+
+
+def normalize_url(url: str) -> str:
+    """Cache key for a URL: same page, same key, whatever link it came from."""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    netloc = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        netloc += f":{parts.port}"
+    query = sorted(
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not _tracking(key)
+    )
+    return urlunsplit((scheme, netloc, parts.path or "/", urlencode(query), ""))
+
+
+class CachedPage:
+    """A cached extraction result and what is needed to revalidate it."""
+
+    def __init__(self, url: str, result: dict, etag: Optional[str], last_modified: Optional[str],
+                 fetched_at: float, expires_at: float):
+        self.url = url
+        self.result = result
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = fetched_at
+        self.expires_at = expires_at
+
+    @property
+    def fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+    @property
+    def revalidatable(self) -> bool:
+        return bool(self.etag or self.last_modified)
+
+
+class PageCache:
+    """SQLite-backed, size-bounded LRU cache of extracted pages."""
+
+    def __init__(self, path: Path = CACHE_PATH, ttl: float = TTL, max_bytes: int = MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        # One connection per operation so the cache can be used from worker threads
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, url: str) -> Optional[CachedPage]:
+        """
+        The cached page for a URL (as asked for, or as it ended up), fresh or not.
+
+        Stale pages that can't be revalidated are dropped and None is returned.
+        """
+        key = normalize_url(url)
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT url, result, etag, last_modified, fetched_at, expires_at FROM pages "
+                "WHERE url = COALESCE((SELECT page FROM aliases WHERE url = ?), ?)",
+                (key, key),
+            ).fetchone()
+            if row is None:
+                return None
+            page = CachedPage(row[0], json.loads(row[1]), *row[2:])
+            if not page.fresh and not page.revalidatable:
+                self._delete(conn, [page.url])
+                return None
+            conn.execute("UPDATE pages SET used_at = ? WHERE url = ?", (time.time(), page.url))
+        return page
+
+    def put(self, url: str, result: dict, etag: Optional[str] = None,
+            last_modified: Optional[str] = None) -> None:
+        """Store the extraction result for url (final URL taken from result["url"])."""
+        now = time.time()
+        key = normalize_url(result.get("url") or url)
+        data = json.dumps(result)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO pages "
+                "(url, result, etag, last_modified, fetched_at, expires_at, used_at, size) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, data, etag, last_modified, now, now + self.ttl, now, len(data)),
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO aliases (url, page) VALUES (?, ?)",
+                {(normalize_url(url), key), (key, key)},
+            )
+            self._evict(conn)
+
+    def renew(self, page: CachedPage) -> None:
+        """Start a page's TTL over (the site said it hasn't changed)."""
+        now = time.time()
+        page.expires_at = now + self.ttl
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE pages SET expires_at = ?, used_at = ? WHERE url = ?",
+                (page.expires_at, now, page.url),
+            )
+
+    def route(self, host: str, ttl: float = ROUTE_TTL) -> Optional[str]:
+        """Tier remembered for a host ("browser"), or None when nothing recent is known."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT tier FROM routes WHERE host = ? AND decided_at > ?", (host, time.time() - ttl)
+            ).fetchone()
+        return row[0] if row else None
+
+    def remember_route(self, host: str, tier: str) -> None:
+        """Send a host's future fetches straight to tier."""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO routes (host, tier, decided_at) VALUES (?, ?, ?)",
+                (host, tier, time.time()),
+            )
+
+    def _evict(self, conn) -> None:
+        """Drop least recently used pages until the cache fits in max_bytes."""
+        if conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0] <= self.max_bytes:
+            return
+        total, doomed = 0, []
+        for url, size in conn.execute("SELECT url, size FROM pages ORDER BY used_at DESC"):
+            total += size
+            if total > self.max_bytes:
+                doomed.append(url)
+        self._delete(conn, doomed)
+
+    def _delete(self, conn, urls: list[str]) -> None:
+        conn.executemany("DELETE FROM pages WHERE url = ?", [(url,) for url in urls])
+        conn.executemany("DELETE FROM aliases WHERE page = ?", [(url,) for url in urls])
@@ -0,0 +1,138 @@
+"""
+Page readiness detection for the headless-browser MCP server.
+
+Instead of sleeping a fixed time after DOMContentLoaded, fetches poll the page
+and stop waiting as soon as it looks settled:
+
+    network quiet   no request started or finished for NETWORK_QUIET seconds,
+                    with at most QUIET_IN_FLIGHT (long-polls, beacons) still open
+    DOM stable      no nodes or text changed for DOM_QUIET seconds
+    content         the main content (article, main or body) holds MIN_TEXT
+                    characters of visible text
+
+A page is ready once its network and DOM are both quiet, or once it has
+enough content and either of them is quiet (so a rendered article isn't held
+back by an analytics poll or a rotating carousel). Static pages are usually
+ready a few hundred milliseconds after DOMContentLoaded; the caller's wait is
+only an upper bound.
+
+dismiss_banners() clicks cookie banners and popups in a single page query.
+"""
+
+import asyncio
+import time
+
+from playwright.async_api import Error as PlaywrightError, Page
+
+# Seconds without network activity that count as quiet
+NETWORK_QUIET = 0.5
+
+# Requests that may stay open on a quiet page
+QUIET_IN_FLIGHT = 2
+
+# Seconds without DOM mutations that count as stable
+DOM_QUIET = 0.3
+
+# Characters of main-content text that count as loaded
+MIN_TEXT = 500
+
+# Seconds between polls
+POLL = 0.1
+
+# Installs a MutationObserver on first call; reports ms since the last
+# mutation and the length of the main content's visible text
+PROBE_SCRIPT = """
+() => {
+    if (!window.__clerkReadiness) {
+        const state = window.__clerkReadiness = {last: performance.now()};
+        new MutationObserver(() => { state.last = performance.now(); })
+            .observe(document, {subtree: true, childList: true, characterData: true});
+    }
+    const main = document.querySelector('article, main, [role="main"]') || document.body;
+    return {
+        quiet: performance.now() - window.__clerkReadiness.last,
+        text: main ? main.innerText.length : 0,
+    };
+}
+"""
+
+# Clicks the first visible match for each banner pattern; returns how many it clicked
+DISMISS_SCRIPT = """
+() => {
+    const visible = (el) => {
+        const box = el.getBoundingClientRect();
+        const style = getComputedStyle(el);
+        return box.width > 0 && box.height > 0 && style.visibility !== 'hidden' && style.display !== 'none';
+    };
+    const buttons = [...document.querySelectorAll('button')].filter(visible);
+    const targets = [
+        ...['accept', 'got it', 'close'].map(
+            (label) => buttons.find((b) => b.innerText.toLowerCase().includes(label))),
+        [...document.querySelectorAll('[aria-label="Close"]')].find(visible),
+    ];
+    let clicked = 0;
+    for (const el of new Set(targets)) {
+        if (el && el.isConnected) {
+            el.click();
+            clicked++;
+        }
+    }
+    return clicked;
+}
+"""
+
+
+class NetworkMonitor:
+    """Tracks a page's requests in flight and when the network last did anything."""
+
+    def __init__(self, page: Page):
+        self.in_flight = 0
+        self.last_activity = time.monotonic()
+        page.on("request", self._started)
+        page.on("requestfinished", self._ended)
+        page.on("requestfailed", self._ended)
+
+    def _started(self, _request):
+        self.in_flight += 1
+        self.last_activity = time.monotonic()
+
+    def _ended(self, _request):
+        self.in_flight = max(0, self.in_flight - 1)
+        self.last_activity = time.monotonic()
+
+    @property
+    def quiet(self) -> bool:
+        return (self.in_flight <= QUIET_IN_FLIGHT
+                and time.monotonic() - self.last_activity >= NETWORK_QUIET)
+
+
+async def _probe(page: Page) -> tuple[bool, bool]:
+    """(DOM stable, enough content); both False while the page is mid-navigation."""
+    try:
+        state = await page.evaluate(PROBE_SCRIPT)
+    except PlaywrightError:
+        # Execution context replaced by a redirect or reload: not settled yet
+        return False, False
+    return state["quiet"] >= DOM_QUIET * 1000, state["text"] >= MIN_TEXT
+
+
+async def wait_until_ready(page: Page, network: NetworkMonitor, timeout: float) -> bool:
+    """Wait until the page looks settled, at most timeout seconds; True if it did."""
+    deadline = time.monotonic() + timeout
+    while True:
+        dom_quiet, has_content = await _probe(page)
+        network_quiet = network.quiet
+        if (network_quiet and dom_quiet) or (has_content and (network_quiet or dom_quiet)):
+            return True
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        await asyncio.sleep(min(POLL, remaining))
+
+
+async def dismiss_banners(page: Page) -> int:
+    """Click visible cookie-banner and popup buttons (Accept, Got it, Close); how many were clicked."""
+    try:
+        return await page.evaluate(DISMISS_SCRIPT)
+    except PlaywrightError:
+        return 0
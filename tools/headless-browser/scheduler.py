@@ -0,0 +1,109 @@
+"""
+Bounded, host-aware scheduling for the headless-browser MCP server.
+
+Every fetch goes through one FetchScheduler shared by the whole server, so a
+30-link fetch_urls call (or several calls at once) never has more than
+CONCURRENCY pages loading:
+
+    scheduler = FetchScheduler()
+    results = await asyncio.gather(
+        *(scheduler.run(url, fetch_with_browser, wait_seconds) for url in urls),
+        return_exceptions=True,
+    )
+
+On top of the global cap, at most PER_HOST fetches run against one host at a
+time, and fetches to the same host start at least HOST_DELAY seconds apart.
+A fetch waiting for its host doesn't hold a global slot, so other hosts keep
+moving. Each fetch gets TIMEOUT seconds once it starts and then raises
+TimeoutError. Cancelling a run() releases its place in every queue, so
+cancelling the gather above stops every queued and running fetch.
+"""
+
+import asyncio
+import os
+import time
+from typing import Any, Awaitable, Callable, Optional
+from urllib.parse import urlparse
+
+# Pages loading at once, across all tool calls
+CONCURRENCY = int(os.environ.get("CLERK_FETCH_CONCURRENCY") or 4)
+
+# Pages loading at once from one host
+PER_HOST = int(os.environ.get("CLERK_FETCH_PER_HOST") or 2)
+
+# Minimum seconds between starting two fetches on the same host
+HOST_DELAY = float(os.environ.get("CLERK_FETCH_HOST_DELAY") or 1.0)
+
+# Seconds one fetch may take once it has started
+TIMEOUT = 60.0
+
+
+def host_of(url: str) -> str:
+    """Host a URL's fetch counts against (lowercased, without www.)."""
+    host = (urlparse(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+class _Host:
+    """Per-host limit and politeness clock."""
+
+    def __init__(self, per_host: int):
+        self.slots = asyncio.Semaphore(per_host)
+        self.lock = asyncio.Lock()
+        self.next_start = 0.0
+        self.users = 0
+
+
+class FetchScheduler:
+    """Runs fetches under a global cap, per-host limits and a per-fetch timeout."""
+
+    def __init__(self, concurrency: int = CONCURRENCY, per_host: int = PER_HOST,
+                 host_delay: float = HOST_DELAY, timeout: float = TIMEOUT):
+        self.per_host = max(1, per_host)
+        self.host_delay = max(0.0, host_delay)
+        self.timeout = timeout
+        self._slots = asyncio.Semaphore(max(1, concurrency))
+        self._hosts: dict[str, _Host] = {}
+
+    def _host(self, name: str) -> _Host:
+        host = self._hosts.get(name)
+        if host is None:
+            self._forget_idle()
+            host = self._hosts[name] = _Host(self.per_host)
+        host.users += 1
+        return host
+
+    def _forget_idle(self):
+        """Drop hosts nobody is waiting on and whose delay has passed."""
+        now = time.monotonic()
+        for name in [name for name, host in self._hosts.items() if not host.users and host.next_start <= now]:
+            del self._hosts[name]
+
+    async def _start(self, host: _Host):
+        """Take a global slot once HOST_DELAY has passed since the host's previous fetch started."""
+        async with host.lock:
+            delay = host.next_start - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await self._slots.acquire()
+            # Stamped only now: a gap that ran out while waiting for a global slot
+            # would let the host's next fetch go out right behind this one
+            host.next_start = time.monotonic() + self.host_delay
+
+    async def run(self, url: str, fetch: Callable[..., Awaitable[Any]], *args,
+                  timeout: Optional[float] = None, **kwargs) -> Any:
+        """fetch(url, *args, **kwargs) once the global and per-host limits allow it."""
+        timeout = timeout or self.timeout
+        name = host_of(url)
+        host = self._host(name)
+        try:
+            async with host.slots:
+                await self._start(host)
+                try:
+                    return await asyncio.wait_for(fetch(url, *args, **kwargs), timeout)
+                except asyncio.TimeoutError:
+                    raise TimeoutError(f"Timed out after {timeout:g}s") from None
+                finally:
+                    self._slots.release()
+        finally:
+            host.users -= 1
@@ -2,179 +2,195 @@
 """
 Headless Browser MCP Server
 
-Fetches web pages using a real browser (Playwright) and extracts
-clean article content using trafilatura. Bypasses bot detection
-that blocks simple HTTP requests.
+Fetches web pages with a plain HTTP request when that is enough, and
+with a real browser (Playwright) otherwise, and extracts clean article
+content using trafilatura. Bypasses bot detection that blocks simple
+HTTP requests.
 """
 
 import asyncio
 import json
 import logging
+import time
+from datetime import datetime
 from typing import Optional
 from urllib.parse import urlparse
 
 from mcp.server import Server
 from mcp.server.stdio import stdio_server
 from mcp.types import Tool, TextContent
-from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeout
-import trafilatura
+from playwright.async_api import TimeoutError as PlaywrightTimeout
+
+from blocking import block_heavy_resources
+from browser_pool import BrowserPool
+from extraction import Extractor
+from http_fetch import NeedsBrowser, conditional_get, fetch_html
+from http_fetch import client as http_client
+from page_cache import CachedPage, PageCache
+from readiness import NetworkMonitor, dismiss_banners, wait_until_ready
+from scheduler import TIMEOUT, FetchScheduler, host_of
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("headless-browser")
+logging.getLogger("httpx").setLevel(logging.WARNING)
 
 # Create the MCP server
 server = Server("headless-browser")
 
+# Warm browsers shared by every fetch for the server's lifetime
+pool = BrowserPool()
 
-def extract_content(html: str, url: str) -> dict:
-    """Extract article content from HTML using trafilatura."""
-
-    # Extract main content
-    text = trafilatura.extract(
-        html,
-        include_links=True,
-        include_images=False,
-        include_tables=True,
-        output_format="markdown",
-        url=url,
-    )
-
-    # Extract metadata
-    metadata = trafilatura.extract_metadata(html)
-
-    result = {
-        "content": text or "",
-        "title": "",
-        "author": "",
-        "date": "",
-        "description": "",
-    }
-
-    if metadata:
-        result["title"] = metadata.title or ""
-        result["author"] = metadata.author or ""
-        result["date"] = metadata.date or ""
-        result["description"] = metadata.description or ""
+# Caps pages loading at once, overall and per host, across all tool calls
+scheduler = FetchScheduler()
 
-    return result
+# trafilatura runs in worker processes, off the event loop
+extractor = Extractor()
+
+# Extracted pages kept on disk between fetches and server restarts
+page_cache = PageCache()
+
+CACHE_MODES = ["use", "refresh", "bypass"]
+
+# auto: plain HTTP first, the browser when that falls short (or the site is known to need it)
+TIERS = ["auto", "http", "browser"]
+
+# Longest a page may take to settle after DOMContentLoaded
+WAIT_SECONDS = 10.0
+
+# Longest to wait for a page to settle after dismissing a banner past the deadline
+BANNER_SETTLE = 0.5
 
 
-async def fetch_with_browser(url: str, wait_seconds: float = 2.0) -> dict:
+async def fetch_with_browser(url: str, wait_seconds: float = WAIT_SECONDS, block_resources: bool = True) -> dict:
     """
     Fetch a URL using a headless browser.
 
+    The page is loaded in a fresh context of one of the pool's warm browsers,
+    and read as soon as it has settled (see readiness.py).
+
     Args:
         url: The URL to fetch
-        wait_seconds: Time to wait for dynamic content to load
+        wait_seconds: Longest to wait for dynamic content to load
+        block_resources: Skip images, fonts, media and tracker requests
 
     Returns:
         Dict with extracted content and metadata
     """
-    async with async_playwright() as p:
-        # Launch browser (chromium is most compatible)
-        browser = await p.chromium.launch(
-            headless=True,
-            args=[
-                "--disable-blink-features=AutomationControlled",
-                "--no-sandbox",
-                "--disable-dev-shm-usage",
-                "--disable-infobars",
-                "--window-size=1920,1080",
-                "--headless=new",  # Use Chrome's newer headless mode
-            ]
-        )
-
-        # Create context with realistic settings
-        context = await browser.new_context(
-            viewport={"width": 1920, "height": 1080},
-            user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36",
-            locale="en-US",
-            timezone_id="America/New_York",
-            extra_http_headers={
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8",
-                "Accept-Language": "en-US,en;q=0.9",
-                "Accept-Encoding": "gzip, deflate, br",
-                "DNT": "1",
-                "Upgrade-Insecure-Requests": "1",
-                "Sec-Fetch-Dest": "document",
-                "Sec-Fetch-Mode": "navigate",
-                "Sec-Fetch-Site": "none",
-                "Sec-Fetch-User": "?1",
-                "Cache-Control": "max-age=0",
-            },
-        )
-
-        page = await context.new_page()
-
-        # Apply stealth techniques to avoid bot detection
-        await page.add_init_script("""
-            // Override navigator.webdriver
-            Object.defineProperty(navigator, 'webdriver', {
-                get: () => undefined
-            });
-
-            // Override navigator.plugins to look real
-            Object.defineProperty(navigator, 'plugins', {
-                get: () => [1, 2, 3, 4, 5]
-            });
-
-            // Override navigator.languages
-            Object.defineProperty(navigator, 'languages', {
-                get: () => ['en-US', 'en']
-            });
-
-            // Override chrome runtime
-            window.chrome = {
-                runtime: {}
-            };
-
-            // Override permissions
-            const originalQuery = window.navigator.permissions.query;
-            window.navigator.permissions.query = (parameters) => (
-                parameters.name === 'notifications' ?
-                    Promise.resolve({ state: Notification.permission }) :
-                    originalQuery(parameters)
-            );
-        """)
+    async with pool.page() as page:
+        if block_resources:
+            await block_heavy_resources(page)
 
-        try:
-            # Navigate to page
-            await page.goto(url, wait_until="domcontentloaded", timeout=30000)
+        network = NetworkMonitor(page)
 
-            # Wait for dynamic content
-            await asyncio.sleep(wait_seconds)
+        # Navigate to page
+        response = await page.goto(url, wait_until="domcontentloaded", timeout=30000)
+        headers = response.headers if response else {}
+        deadline = time.monotonic() + wait_seconds
 
-            # Try to dismiss cookie banners / popups (common blockers)
-            for selector in [
-                "button:has-text('Accept')",
-                "button:has-text('Got it')",
-                "button:has-text('Close')",
-                "[aria-label='Close']",
-            ]:
-                try:
-                    button = page.locator(selector).first
-                    if await button.is_visible(timeout=500):
-                        await button.click()
-                        await asyncio.sleep(0.5)
-                except:
-                    pass
+        # Wait for dynamic content, no longer than wait_seconds
+        await wait_until_ready(page, network, wait_seconds)
 
-            # Get the page HTML
-            html = await page.content()
+        # Dismiss cookie banners / popups (common blockers) and let the page settle again
+        if await dismiss_banners(page):
+            await wait_until_ready(page, network, max(deadline - time.monotonic(), BANNER_SETTLE))
 
-            # Get the final URL (in case of redirects)
-            final_url = page.url
+        # Get the page HTML
+        html = await page.content()
 
-        finally:
-            await browser.close()
+        # Get the final URL (in case of redirects)
+        final_url = page.url
+
+    # Extract content
+    result = await extractor.extract(html, final_url)
+    result["url"] = final_url
+    result["original_url"] = url
+    result["etag"] = headers.get("etag")
+    result["last_modified"] = headers.get("last-modified")
+
+    return result
 
-        # Extract content
-        result = extract_content(html, final_url)
-        result["url"] = final_url
-        result["original_url"] = url
 
-        return result
+async def revalidate(page: CachedPage, timeout: float) -> bool:
+    """Ask the site whether a stale cached page changed; True (and renewed) when it hasn't."""
+    # Scheduled like any other request to the site, so it keeps the politeness gap
+    try:
+        status = await scheduler.run(page.result["url"], conditional_get, page.etag, page.last_modified,
+                                     timeout=timeout)
+    except TimeoutError:
+        status = None
+    unchanged = status == 304
+    if unchanged:
+        await asyncio.to_thread(page_cache.renew, page)
+    return unchanged
+
+
+async def fetch_with_http(url: str) -> dict:
+    """
+    Fetch a URL over plain HTTP and extract its content.
+
+    Raises NeedsBrowser when the page needs the browser (see http_fetch.py) or
+    nothing could be extracted from it.
+    """
+    html, final_url, headers = await fetch_html(url)
+    result = await extractor.extract(html, final_url)
+    if not result["content"]:
+        raise NeedsBrowser("nothing extracted")
+    result["url"] = final_url
+    result["original_url"] = url
+    result["etag"] = headers.get("etag")
+    result["last_modified"] = headers.get("last-modified")
+    return result
+
+
+async def fetch_tiered(url: str, wait_seconds: float = WAIT_SECONDS, block_resources: bool = True,
+                       tier: str = "auto") -> dict:
+    """
+    Fetch a URL with plain HTTP when that is enough, the browser otherwise.
+
+    In auto mode, sites remembered as needing the browser go straight to it;
+    others try plain HTTP first and fall back to the browser. A site whose page
+    the browser could extract after plain HTTP fell short is remembered. The
+    result's tier says which one served it.
+    """
+    host = host_of(url)
+    if tier == "auto" and await asyncio.to_thread(page_cache.route, host) == "browser":
+        tier = "browser"
+
+    if tier != "browser":
+        try:
+            return {**await fetch_with_http(url), "tier": "http"}
+        except NeedsBrowser as e:
+            if tier == "http":
+                raise NeedsBrowser(f"needs the browser ({e})") from None
+            logger.info(f"Using the browser for {url}: {e}")
+            result = await fetch_with_browser(url, wait_seconds, block_resources)
+            if result["content"]:
+                await asyncio.to_thread(page_cache.remember_route, host, "browser")
+            return {**result, "tier": "browser"}
+
+    return {**await fetch_with_browser(url, wait_seconds, block_resources), "tier": "browser"}
+
+
+async def fetch_page(url: str, wait_seconds: float, timeout: float, cache: str = "use",
+                     block_resources: bool = True, tier: str = "auto") -> dict:
+    """
+    Fetch a URL through the page cache, fetching it (see fetch_tiered) when needed.
+
+    cache is "use" (serve fresh or revalidated copies), "refresh" (load the
+    page again and store it) or "bypass" (neither read nor write the cache).
+    Pages served from the cache carry cached_at (epoch seconds of the fetch).
+    """
+    if cache == "use":
+        page = await asyncio.to_thread(page_cache.get, url)
+        if page and (page.fresh or (page.revalidatable and await revalidate(page, timeout))):
+            return {**page.result, "original_url": url, "cached_at": page.fetched_at}
+
+    result = await scheduler.run(url, fetch_tiered, wait_seconds, block_resources, tier, timeout=timeout)
+    # Empty extractions are usually blocks or errors: worth trying again next time
+    if cache != "bypass" and result["content"]:
+        await asyncio.to_thread(page_cache.put, url, result, result["etag"], result["last_modified"])
+    return result
 
 
 @server.list_tools()
@@ -184,10 +200,10 @@ async def list_tools() -> list[Tool]:
         Tool(
             name="fetch_url",
             description=(
-                "Fetch a web page using a headless browser and extract its content. "
-                "Use this for URLs that block normal HTTP requests (e.g., Medium, "
-                "paywalled sites, JS-heavy pages). Returns article text in markdown "
-                "format along with metadata (title, author, date)."
+                "Fetch a web page and extract its content, using a headless browser "
+                "when a plain request isn't enough. Use this for URLs that block normal "
+                "HTTP requests (e.g., Medium, paywalled sites, JS-heavy pages). Returns "
+                "article text in markdown format along with metadata (title, author, date)."
             ),
             inputSchema={
                 "type": "object",
@@ -198,8 +214,43 @@ async def list_tools() -> list[Tool]:
                     },
                     "wait_seconds": {
                         "type": "number",
-                        "description": "Seconds to wait for dynamic content (default: 2.0)",
-                        "default": 2.0,
+                        "description": (
+                            "Longest to wait for dynamic content; pages are read as soon as "
+                            f"they settle (default: {WAIT_SECONDS:g})"
+                        ),
+                        "default": WAIT_SECONDS,
+                    },
+                    "timeout_seconds": {
+                        "type": "number",
+                        "description": f"Give up on a page after this many seconds (default: {TIMEOUT:g})",
+                        "default": TIMEOUT,
+                    },
+                    "cache": {
+                        "type": "string",
+                        "enum": CACHE_MODES,
+                        "description": (
+                            "'use' serves pages fetched recently from the local cache, "
+                            "'refresh' fetches again and updates the cache, "
+                            "'bypass' fetches without reading or writing the cache (default: use)"
+                        ),
+                        "default": "use",
+                    },
+                    "load_everything": {
+                        "type": "boolean",
+                        "description": (
+                            "Also load images, fonts, media and ad/analytics scripts, which are "
+                            "skipped by default; try this if a page comes back empty (default: false)"
+                        ),
+                        "default": False,
+                    },
+                    "tier": {
+                        "type": "string",
+                        "enum": TIERS,
+                        "description": (
+                            "'auto' tries a plain HTTP request first and uses the browser only "
+                            "when the page needs it; 'http' or 'browser' forces one (default: auto)"
+                        ),
+                        "default": "auto",
                     },
                 },
                 "required": ["url"],
@@ -208,8 +259,10 @@ async def list_tools() -> list[Tool]:
         Tool(
             name="fetch_urls",
             description=(
-                "Fetch multiple web pages in parallel using a headless browser. "
-                "More efficient than calling fetch_url multiple times."
+                "Fetch multiple web pages in parallel, using a headless browser where needed. "
+                "More efficient than calling fetch_url multiple times. Pages load a "
+                "few at a time, politely spaced per site; results come back in "
+                "input order."
             ),
             inputSchema={
                 "type": "object",
@@ -221,8 +274,43 @@ async def list_tools() -> list[Tool]:
                     },
                     "wait_seconds": {
                         "type": "number",
-                        "description": "Seconds to wait for dynamic content (default: 2.0)",
-                        "default": 2.0,
+                        "description": (
+                            "Longest to wait for dynamic content; pages are read as soon as "
+                            f"they settle (default: {WAIT_SECONDS:g})"
+                        ),
+                        "default": WAIT_SECONDS,
+                    },
+                    "timeout_seconds": {
+                        "type": "number",
+                        "description": f"Give up on a page after this many seconds (default: {TIMEOUT:g})",
+                        "default": TIMEOUT,
+                    },
+                    "cache": {
+                        "type": "string",
+                        "enum": CACHE_MODES,
+                        "description": (
+                            "'use' serves pages fetched recently from the local cache, "
+                            "'refresh' fetches again and updates the cache, "
+                            "'bypass' fetches without reading or writing the cache (default: use)"
+                        ),
+                        "default": "use",
+                    },
+                    "load_everything": {
+                        "type": "boolean",
+                        "description": (
+                            "Also load images, fonts, media and ad/analytics scripts, which are "
+                            "skipped by default; try this if a page comes back empty (default: false)"
+                        ),
+                        "default": False,
+                    },
+                    "tier": {
+                        "type": "string",
+                        "enum": TIERS,
+                        "description": (
+                            "'auto' tries a plain HTTP request first and uses the browser only "
+                            "when the page needs it; 'http' or 'browser' forces one (default: auto)"
+                        ),
+                        "default": "auto",
                     },
                 },
                 "required": ["urls"],
@@ -237,14 +325,22 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
 
     if name == "fetch_url":
         url = arguments.get("url")
-        wait_seconds = arguments.get("wait_seconds", 2.0)
+        wait_seconds = arguments.get("wait_seconds", WAIT_SECONDS)
+        timeout = arguments.get("timeout_seconds", TIMEOUT)
+        cache = arguments.get("cache", "use")
+        block_resources = not arguments.get("load_everything", False)
+        tier = arguments.get("tier", "auto")
 
         if not url:
             return [TextContent(type="text", text="Error: URL is required")]
+        if cache not in CACHE_MODES:
+            return [TextContent(type="text", text=f"Error: cache must be one of {', '.join(CACHE_MODES)}")]
+        if tier not in TIERS:
+            return [TextContent(type="text", text=f"Error: tier must be one of {', '.join(TIERS)}")]
 
         try:
             logger.info(f"Fetching URL: {url}")
-            result = await fetch_with_browser(url, wait_seconds)
+            result = await fetch_page(url, wait_seconds, timeout, cache, block_resources, tier)
 
             # Format output
             output_parts = []
@@ -259,6 +355,10 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
                 meta_parts.append(f"**Date:** {result['date']}")
             if result["url"] != result["original_url"]:
                 meta_parts.append(f"**Final URL:** {result['url']}")
+            meta_parts.append(f"**Fetched with:** {'plain HTTP' if result.get('tier') == 'http' else 'browser'}")
+            if result.get("cached_at"):
+                fetched = datetime.fromtimestamp(result["cached_at"]).strftime("%Y-%m-%d %H:%M")
+                meta_parts.append(f"**Cached:** {fetched}")
 
             if meta_parts:
                 output_parts.append("\n".join(meta_parts))
@@ -271,7 +371,7 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
 
             return [TextContent(type="text", text="\n\n".join(output_parts))]
 
-        except PlaywrightTimeout:
+        except (PlaywrightTimeout, TimeoutError):
             return [TextContent(type="text", text=f"Error: Timeout while loading {url}")]
         except Exception as e:
             logger.exception(f"Error fetching {url}")
@@ -279,17 +379,27 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
 
     elif name == "fetch_urls":
         urls = arguments.get("urls", [])
-        wait_seconds = arguments.get("wait_seconds", 2.0)
+        wait_seconds = arguments.get("wait_seconds", WAIT_SECONDS)
+        timeout = arguments.get("timeout_seconds", TIMEOUT)
+        cache = arguments.get("cache", "use")
+        block_resources = not arguments.get("load_everything", False)
+        tier = arguments.get("tier", "auto")
 
         if not urls:
             return [TextContent(type="text", text="Error: URLs list is required")]
+        if cache not in CACHE_MODES:
+            return [TextContent(type="text", text=f"Error: cache must be one of {', '.join(CACHE_MODES)}")]
+        if tier not in TIERS:
+            return [TextContent(type="text", text=f"Error: tier must be one of {', '.join(TIERS)}")]
 
         try:
             logger.info(f"Fetching {len(urls)} URLs")
 
-            # Fetch all URLs in parallel
-            tasks = [fetch_with_browser(url, wait_seconds) for url in urls]
-            results = await asyncio.gather(*tasks, return_exceptions=True)
+            # Fetch all URLs; cached pages return at once, the rest load a bounded number at a time
+            results = await asyncio.gather(
+                *(fetch_page(url, wait_seconds, timeout, cache, block_resources, tier) for url in urls),
+                return_exceptions=True,
+            )
 
             # Format output
             output_parts = []
@@ -305,6 +415,7 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
                         output_parts.append(f"**{result['title']}**")
                     if result["author"]:
                         output_parts.append(f"Author: {result['author']}")
+                    output_parts.append(f"Fetched with: {'plain HTTP' if result.get('tier') == 'http' else 'browser'}")
                     if result["content"]:
                         # Truncate for multi-URL fetches
                         content = result["content"]
@@ -326,11 +437,30 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
         return [TextContent(type="text", text=f"Unknown tool: {name}")]
 
 
+async def warm_up():
+    """Start the extraction workers and launch the browsers in the background, so the first fetch doesn't wait."""
+    try:
+        await extractor.warm_up()
+    except Exception:
+        logger.exception("Could not start the extraction workers; retrying on first fetch")
+    try:
+        await pool.start()
+    except Exception:
+        logger.exception("Could not launch the browser; retrying on first fetch")
+
+
 async def main():
     """Run the MCP server."""
     logger.info("Starting headless-browser MCP server")
-    async with stdio_server() as (read_stream, write_stream):
-        await server.run(read_stream, write_stream, server.create_initialization_options())
+    warming = asyncio.create_task(warm_up())
+    try:
+        async with stdio_server() as (read_stream, write_stream):
+            await server.run(read_stream, write_stream, server.create_initialization_options())
+    finally:
+        await warming
+        await pool.close()
+        await http_client.aclose()
+        extractor.close()
 
 
 if __name__ == "__main__":
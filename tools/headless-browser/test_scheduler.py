@@ -0,0 +1,63 @@
+"""Tests for scheduler.py (run with: python -m pytest tools/headless-browser)."""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from scheduler import FetchScheduler  # noqa: E402
+
+HOST_DELAY = 0.2
+
+
+def test_host_delay_holds_when_global_limit_is_saturated():
+    """Same-host fetches queued behind the global limit still start HOST_DELAY apart."""
+    starts = {}
+
+    async def fetch(url, seconds):
+        starts[url] = time.monotonic()
+        await asyncio.sleep(seconds)
+
+    async def main():
+        scheduler = FetchScheduler(concurrency=1, per_host=2, host_delay=HOST_DELAY)
+        # Holds the only global slot well past the first same-host gap
+        blocker = asyncio.create_task(scheduler.run("https://other.example/", fetch, 3 * HOST_DELAY))
+        await asyncio.sleep(0.01)
+        await asyncio.gather(
+            scheduler.run("https://site.example/a", fetch, 0),
+            scheduler.run("https://site.example/b", fetch, 0),
+        )
+        await blocker
+
+    asyncio.run(main())
+
+    first, second = sorted([starts["https://site.example/a"], starts["https://site.example/b"]])
+    assert first >= starts["https://other.example/"] + 3 * HOST_DELAY - 0.01
+    assert second - first >= HOST_DELAY - 0.01
+
+
+def test_global_limit_and_host_delay():
+    """At most concurrency fetches run at once; fetches to one host start HOST_DELAY apart."""
+    running, peak, starts = 0, 0, {}
+
+    async def fetch(url):
+        nonlocal running, peak
+        starts.setdefault(url.split("/")[2], []).append(time.monotonic())
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.05)
+        running -= 1
+
+    async def main():
+        scheduler = FetchScheduler(concurrency=2, per_host=2, host_delay=HOST_DELAY)
+        urls = [f"https://{host}.example/{i}" for host in ("a", "b", "c") for i in range(3)]
+        await asyncio.gather(*(scheduler.run(url, fetch) for url in urls))
+
+    asyncio.run(main())
+
+    assert peak == 2
+    for times in starts.values():
+        gaps = [later - earlier for earlier, later in zip(times, times[1:])]
+        assert min(gaps) >= HOST_DELAY - 0.01
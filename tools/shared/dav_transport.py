@@ -0,0 +1,103 @@
+"""
+Pooled HTTP transport shared by the calendar and contacts tools.
+
+session() builds a requests.Session for CalDAV/CardDAV traffic; mount() fits
+the same behaviour onto a session that already exists, from requests or from
+niquests (caldav.DAVClient's, which uses niquests when it is installed):
+
+    keep-alive      connections are pooled per host, sized for the tools' worker
+                    threads, and reused across calls while the tool runs resident
+    compression     gzip/deflate are requested and decoded transparently
+    retries         connection errors, timeouts and 5xx answers to read-only
+                    methods (GET, PROPFIND, REPORT, ...) are retried a bounded
+                    number of times with exponential backoff
+    timeouts        every request gets TIMEOUT unless the caller sets its own
+
+get() adds conditional requests: given the ETag of a cached copy, it sends
+If-None-Match and reports a 304 as "unchanged" without a body.
+"""
+
+import functools
+import importlib
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    import requests
+
+# Connections kept open per host (matches the tools' worker threads)
+POOL_SIZE = 8
+
+# Attempts after the first for a failed read-only request
+RETRIES = 3
+
+# Seconds before the first retry; doubled for each one after
+BACKOFF = 0.25
+
+# (connect, read) seconds for requests that don't set a timeout
+TIMEOUT = (10, 60)
+
+RETRY_STATUSES = (500, 502, 503, 504)
+
+# Safe to repeat: none of these change anything on the server
+READ_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PROPFIND", "REPORT"})
+
+
+@functools.cache
+def _with_timeout(base: type) -> type:
+    """Subclass of an HTTPAdapter that applies TIMEOUT to requests sent without one."""
+
+    class Adapter(base):
+        def send(self, request, **kwargs):
+            if kwargs.get("timeout") is None:
+                kwargs["timeout"] = TIMEOUT
+            return super().send(request, **kwargs)
+
+    return Adapter
+
+
+def mount(session, pool_size: int = POOL_SIZE, retries: int = RETRIES):
+    """Give an existing requests or niquests session pooling, compression, retries and default timeouts."""
+    # Adapters only fit sessions of their own library
+    adapters = importlib.import_module(type(session).__module__.partition(".")[0] + ".adapters")
+    retry = adapters.Retry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=BACKOFF,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=READ_METHODS,
+        raise_on_status=False,
+        respect_retry_after_header=True,
+    )
+    adapter = _with_timeout(adapters.HTTPAdapter)(pool_connections=4, pool_maxsize=max(1, pool_size), max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["Accept-Encoding"] = "gzip, deflate"
+    return session
+
+
+def session(auth: Optional[tuple[str, str]] = None, pool_size: int = POOL_SIZE,
+            retries: int = RETRIES) -> "requests.Session":
+    """New pooled requests session, authenticated with (username, password) when given."""
+    import requests  # only the contacts tool builds its own sessions
+
+    new = mount(requests.Session(), pool_size=pool_size, retries=retries)
+    new.auth = auth
+    return new
+
+
+def get(session, url: str, etag: Optional[str] = None, **kwargs):
+    """
+    GET url, conditionally when etag (of a cached copy) is given.
+
+    Returns None when the server answers 304 Not Modified; otherwise the response.
+    """
+    headers = dict(kwargs.pop("headers", None) or {})
+    if etag:
+        headers["If-None-Match"] = etag
+    response = session.get(url, headers=headers, **kwargs)
+    if etag and response.status_code == 304:
+        response.close()
+        return None
+    return response
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Resident server for the calendar and contacts tools.
+
+A tool started with --serve keeps running on a Unix socket with its modules
+imported and its DAV client, sessions and caches warm. The bash wrappers hand
+each call to the running server instead of starting Python cold, and fall back
+to a normal run when no server is listening.
+
+Server side (inside a tool script):
+    resident.serve(SOCKET_PATH, main)
+
+Client side (stdlib only, so it runs without the tool's venv):
+    python3 resident.py SOCKET [tool arguments...]
+
+Exits with the tool's exit code, or 75 (EX_TEMPFAIL) when no server answered.
+Calls run in the client's working directory; stdin is forwarded when one of
+the arguments is "-" (and is empty otherwise).
+
+Requests are handled one at a time: a call runs the tool's main() with sys.argv
+and stdout/stderr swapped, which is process-wide state. Output is returned when
+the call finishes, so --stream output arrives all at once.
+"""
+
+import io
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+from contextlib import redirect_stderr, redirect_stdout
+from typing import Callable, Optional
+
+# Exit code telling the wrapper to fall back to a normal (cold) run
+NO_SERVER = 75
+
+
+def _send(sock: socket.socket, message: dict) -> None:
+    sock.sendall(json.dumps(message).encode("utf-8") + b"\n")
+
+
+def _receive(sock: socket.socket) -> dict:
+    chunks = []
+    while True:
+        chunk = sock.recv(65536)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        if chunk.endswith(b"\n"):
+            break
+    return json.loads(b"".join(chunks).decode("utf-8"))
+
+
+def serve(
+    socket_path: str,
+    main: Callable[[], None],
+    before_request: Optional[Callable[[], None]] = None,
+) -> None:
+    """Run main() for every request on socket_path until interrupted."""
+    socket_path = str(socket_path)
+    if os.path.exists(socket_path):
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+                probe.connect(socket_path)
+            print(f"Error: a server is already listening on {socket_path}", file=sys.stderr)
+            sys.exit(1)
+        except OSError:
+            # Left behind by a server that didn't shut down cleanly
+            os.unlink(socket_path)
+
+    prog = sys.argv[0]
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            try:
+                request = json.loads(self.rfile.readline().decode("utf-8"))
+            except ValueError:
+                return
+
+            stdout, stderr = io.StringIO(), io.StringIO()
+            code = 0
+            saved_argv, saved_stdin, saved_cwd = sys.argv, sys.stdin, os.getcwd()
+            sys.argv = [prog] + list(request.get("argv", []))
+            sys.stdin = io.StringIO(request.get("stdin") or "")
+            try:
+                # Relative paths in arguments mean the caller's directory
+                os.chdir(request.get("cwd") or saved_cwd)
+                if before_request:
+                    before_request()
+                with redirect_stdout(stdout), redirect_stderr(stderr):
+                    main()
+            except SystemExit as e:
+                if isinstance(e.code, int):
+                    code = e.code
+                elif e.code is not None:
+                    stderr.write(f"{e.code}\n")
+                    code = 1
+            except Exception as e:
+                stderr.write(f"Error: {e}\n")
+                code = 1
+            finally:
+                sys.argv, sys.stdin = saved_argv, saved_stdin
+                os.chdir(saved_cwd)
+
+            _send(self.connection, {"stdout": stdout.getvalue(), "stderr": stderr.getvalue(), "code": code})
+
+    old_umask = os.umask(0o077)  # Socket readable by this user only
+    try:
+        server = socketserver.UnixStreamServer(socket_path, Handler)
+    finally:
+        os.umask(old_umask)
+
+    # Clean up the socket on `kill` as well as Ctrl-C
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+    print(f"Serving on {socket_path} (Ctrl-C to stop)", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+def call(socket_path: str, argv: list[str]) -> int:
+    """Run a tool call on the resident server and relay its output."""
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(str(socket_path))
+            # Only read stdin once a server answered, so a fallback run still gets it
+            stdin = sys.stdin.read() if "-" in argv else None
+            _send(sock, {"argv": argv, "cwd": os.getcwd(), "stdin": stdin})
+            response = _receive(sock)
+    except (OSError, ValueError):
+        return NO_SERVER
+
+    sys.stdout.write(response.get("stdout", ""))
+    sys.stderr.write(response.get("stderr", ""))
+    return response.get("code", 1)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: resident.py SOCKET [arguments...]", file=sys.stderr)
+        sys.exit(2)
+    sys.exit(call(sys.argv[1], sys.argv[2:]))